@@ -0,0 +1,120 @@
+"""Startup benchmark: import times and time to first paint, with cold and warm bytecode caches.
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--data path/to/data.json] [--core-only] [--output results.jsonl]
+
+Every measurement runs in a fresh interpreter, so nothing is shared between runs. Cold runs start with an empty
+bytecode cache (PYTHONPYCACHEPREFIX points to a new directory), warm runs reuse the cache written by the cold run just
+before them. Medians are printed, and each run can be appended as a JSON line (with commit and date) to track startup
+over time.
+
+Measured (seconds since the interpreter started running the script):
+    import_core: hportfolio data modules imported (no Qt).
+    import_gui: main window module imported (Qt, QtChart and generated UI).
+    skeleton_paint: main window shown and painted, before any data is loaded.
+    data_paint: data file and cached prices loaded and drawn (network fetch left running in background).
+    total: whole process, interpreter start-up and shutdown included (measured by the parent).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DATA_FILE = ROOT / "src" / "hportfolio" / "data" / "data.json"
+# Modules that should not be loaded before the window skeleton is painted
+HEAVY_MODULES = ("pandas", "yfinance")
+
+
+def measure(data_file: str, core_only: bool) -> dict:
+    """Measure startup of the application in the current (fresh) interpreter."""
+    start = time.perf_counter()
+    timings = {}
+    import hportfolio.tickers_data  # noqa: F401
+
+    timings["import_core"] = time.perf_counter() - start
+    if core_only:
+        timings["heavy_at_paint"] = [module for module in HEAVY_MODULES if module in sys.modules]
+        return timings
+
+    from PyQt5 import QtWidgets
+
+    from hportfolio import main_window
+
+    timings["import_gui"] = time.perf_counter() - start
+    app = QtWidgets.QApplication([])
+    window = main_window.MainWindow(data_file=data_file)
+    window.show()
+    app.processEvents()
+    timings["skeleton_paint"] = time.perf_counter() - start
+    timings["heavy_at_paint"] = [module for module in HEAVY_MODULES if module in sys.modules]
+    # Data is loaded from the event loop, right after the first paint
+    while window.tickers_data is None:
+        app.processEvents()
+    app.processEvents()
+    timings["data_paint"] = time.perf_counter() - start
+    window.scheduler.shutdown()
+    return timings
+
+
+def run_child(data_file: str, core_only: bool, pycache: str) -> dict:
+    """Run one measurement in a new interpreter, with its bytecode cache at pycache."""
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=pycache, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT / "src"), env.get("PYTHONPATH")]))
+    command = [sys.executable, __file__, "--child", "--data", data_file, *(["--core-only"] if core_only else [])]
+    start = time.perf_counter()
+    output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout  # noqa: S603
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+
+def git_commit() -> str | None:
+    """Current commit of the repository (None if not available)."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()  # noqa: S603, S607
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    """Run the benchmark and report medians of cold and warm startup."""
+    parser = argparse.ArgumentParser(description="hportfolio startup benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="number of cold (and warm) runs")
+    parser.add_argument("--data", default=str(DEFAULT_DATA_FILE), help="JSON data file")
+    parser.add_argument("--core-only", action="store_true", help="only measure imports of data modules (no Qt needed)")
+    parser.add_argument("--output", help="JSON lines file where results of each run are appended")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.data, args.core_only)))
+        return
+
+    results = {"cold": [], "warm": []}
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as pycache:
+            results["cold"].append(run_child(args.data, args.core_only, pycache))
+            results["warm"].append(run_child(args.data, args.core_only, pycache))
+
+    date = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    commit = git_commit()
+    for kind, runs in results.items():
+        metrics = [metric for metric in runs[0] if metric != "heavy_at_paint"]
+        medians = "  ".join(f"{metric} {statistics.median(run[metric] for run in runs) * 1000:7.1f} ms" for metric in metrics)
+        print(f"{kind:4}: {medians}  (loaded before paint: {', '.join(runs[0]['heavy_at_paint']) or 'none'})")
+    if args.output:
+        with Path(args.output).open("a", encoding="utf8") as output_fh:
+            for kind, runs in results.items():
+                for run in runs:
+                    output_fh.write(json.dumps({"date": date, "commit": commit, "kind": kind, **run}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
 #!/bin/env python
 """Module configuration file."""
 
+import argparse
 import logging
-
-from hportfolio import main_window
+from pathlib import Path
 
 # Constant definitions
 LOGGING_LEVEL = logging.INFO
+DEFAULT_DATA_FILE = str(Path(__file__).parent / "data" / "data.json")
 
 def configure_loggers(level:int):
     """Configure loggers."""
@@ -24,11 +25,93 @@ def configure_loggers(level:int):
 
 def launch_gui():
     """Launches Main GUI."""
+    from hportfolio import main_window  # Qt is only needed by the GUI
+
     main_window.launch_gui()
 
-if __name__ == "__main__":
+def import_statements(statements: list[str], data_file: str, fmt: str | None):
+    """Import broker statements into the data file."""
+    from hportfolio.importers import import_statements as import_statements_
+
+    results, first_affected_date = import_statements_(data_file, statements, fmt)
+    for result in results:
+        print(f"{result.path}: {result.new_rows} new rows, {result.duplicates} already imported")
+    if first_affected_date:
+        print(f"Portfolio updated from {first_affected_date}")
+
+def serve(data_file: str, host: str, port: int, refresh_interval: float):
+    """Serve portfolio numbers over HTTP/JSON."""
+    from hportfolio import server
+
+    server.serve(data_file, host, port, refresh_interval)
+
+def target_weight(target: str) -> tuple[str, float]:
+    """Parse a TICKER=WEIGHT rebalance target."""
+    ticker, _, weight = target.partition("=")
+    try:
+        return ticker, float(weight)
+    except ValueError:
+        msg = f"expected TICKER=WEIGHT, got {target!r}"
+        raise argparse.ArgumentTypeError(msg) from None
+
+def rebalance(data_file: str, targets: list[tuple[str, float]], scenarios_file: str | None, tolerance: float, minimize_gains: bool):
+    """Print the trades that bring the portfolio to target weights, for one or many scenarios."""
+    import json
+
+    from hportfolio.rebalance import Rebalancer
+    from hportfolio.tickers_data import TickersData
+
+    scenarios = [dict(targets)] if targets else []
+    if scenarios_file:
+        with Path(scenarios_file).open(encoding="utf8") as input_fh:
+            scenarios += json.load(input_fh)
+    tickers_data = TickersData(data_file)
+    # Target tickers not held yet need their prices
+    tickers_data.get_tickers_value([ticker for scenario in scenarios for ticker in scenario])
+    with tickers_data.pinned_snapshot() as snapshot:
+        rebalancer = Rebalancer.from_history(tickers_data.get_portfolio_history())
+        weights = rebalancer.target_matrix(scenarios, snapshot.prices)
+    plan = rebalancer.plan(weights, tolerance, minimize_gains)
+    for scenario, target in enumerate(scenarios):
+        print(f"Scenario {scenario + 1}: {target}")
+        for order in plan.orders(scenario):
+            print(f"  {'BUY ' if order['shares'] > 0 else 'SELL'} {abs(order['shares']):>6} {order['ticker']}")
+        print(f"  fees ${plan.fees[scenario]:.2f}, turnover ${plan.turnover[scenario]:.2f}, "
+              f"realized gains ${plan.realized_gains[scenario]:.2f}, cash left ${plan.cash_after[scenario]:.2f}")
+
+def main(argv: list[str] | None = None):
+    """Command line entry point. Without command, launches the GUI."""
+    parser = argparse.ArgumentParser(prog="hportfolio", description="Historic Portfolio Tracker")
+    subparsers = parser.add_subparsers(dest="command")
+    import_parser = subparsers.add_parser("import", help="import broker statements (CSV/OFX) into the data file")
+    import_parser.add_argument("statements", nargs="+", help="statement files")
+    import_parser.add_argument("--format", choices=["csv", "ofx"], help="format of the statements (detected if omitted)")
+    import_parser.add_argument("--data", default=DEFAULT_DATA_FILE, help="JSON data file")
+    serve_parser = subparsers.add_parser("serve", help="serve positions, history and P&L over HTTP/JSON (no GUI)")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    serve_parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    serve_parser.add_argument("--data", default=DEFAULT_DATA_FILE, help="JSON data file")
+    serve_parser.add_argument("--refresh", type=float, default=900, help="seconds between price refreshes (0 disables them)")
+    rebalance_parser = subparsers.add_parser("rebalance", help="compute trades to reach target weights")
+    rebalance_parser.add_argument("--target", action="append", default=[], type=target_weight, metavar="TICKER=WEIGHT", help="target weight (0 to 1) of a ticker, rest is cash")
+    rebalance_parser.add_argument("--scenarios", help="JSON file with a list of target allocations to compare")
+    rebalance_parser.add_argument("--tolerance", type=float, default=0.02, help="band around target weights where no trade is needed")
+    rebalance_parser.add_argument("--minimize-gains", action="store_true", help="sell appreciated shares only down to the band edge")
+    rebalance_parser.add_argument("--data", default=DEFAULT_DATA_FILE, help="JSON data file")
+    args = parser.parse_args(argv)
+
     #Configure loggers according to desired level
     configure_loggers(LOGGING_LEVEL)
 
-    #Launch GUI
-    launch_gui()
+    if args.command == "import":
+        import_statements(args.statements, args.data, args.format)
+    elif args.command == "rebalance":
+        rebalance(args.data, args.target, args.scenarios, args.tolerance, args.minimize_gains)
+    elif args.command == "serve":
+        serve(args.data, args.host, args.port, args.refresh)
+    else:
+        #Launch GUI
+        launch_gui()
+
+if __name__ == "__main__":
+    main()
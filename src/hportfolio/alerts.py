@@ -0,0 +1,194 @@
+"""Price alerts rule engine."""
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+
+# Pseudo ticker used by rules on the whole portfolio
+PORTFOLIO = "PORTFOLIO"
+
+# Supported rule types: (metric evaluated, direction). Direction is +1 if rule fires above threshold, -1 if below.
+METRIC_PRICE = 0
+METRIC_DAILY_MOVE = 1
+METRIC_DRAWDOWN = 2
+METRIC_PNL = 3
+RULE_TYPES = {
+    "price_above": (METRIC_PRICE, 1),
+    "price_below": (METRIC_PRICE, -1),
+    "daily_move": (METRIC_DAILY_MOVE, 1),
+    "drawdown_from_cost": (METRIC_DRAWDOWN, 1),
+    "pnl_above": (METRIC_PNL, 1),
+    "pnl_below": (METRIC_PNL, -1),
+}
+
+
+@dataclass(frozen=True)
+class AlertEvent:
+    """Alert fired by a rule."""
+
+    rule: int
+    ticker: str
+    rule_type: str
+    value: float
+    threshold: float
+    timestamp: float
+
+    def __str__(self) -> str:
+        """Human readable description."""
+        return f"{self.ticker}: {self.rule_type} {self.value:.2f} (threshold {self.threshold:g})"
+
+
+def log_sink(events: list[AlertEvent]):
+    """Alert sink writing fired alerts to the log."""
+    logger = logging.getLogger("Alerts")
+    for event in events:
+        logger.warning(f"Alert {event}")
+
+
+class AlertEngine:
+    """Evaluates many alert rules compiled into arrays.
+
+    Rules are sorted by ticker, so a price batch only evaluates the rules of tickers whose values changed. Each
+    rule fires when its threshold is crossed, then it is disarmed until the value moves back beyond the threshold by
+    its hysteresis, and it does not fire again before its cooldown expires.
+
+    Rules are dictionaries like {"ticker": "NVDA", "type": "price_above", "value": 130, "hysteresis": 1, "cooldown": 3600}.
+    Supported types are price_above, price_below, daily_move (%), drawdown_from_cost (% below unit cost),
+    pnl_above and pnl_below (portfolio P&L, ticker "PORTFOLIO").
+    """
+
+    # Set-up logger
+    logger = logging.getLogger("AlertEngine")
+
+    def __init__(self, rules: list[dict] | None = None):
+        """Constructor.
+
+        Args:
+            rules: Optional list of rule dictionaries.
+        """
+        self.sinks: list[Callable] = []
+        self.compile(rules or [])
+
+    def compile(self, rules: list[dict]):
+        """Compile rules into arrays. State (armed, last fired) of every rule is reset.
+
+        Args:
+            rules: List of rule dictionaries. Invalid rules are logged and skipped.
+        """
+        valid_rules = []
+        for rule in rules:
+            if rule.get("type") not in RULE_TYPES or "ticker" not in rule or "value" not in rule:
+                self.__class__.logger.error(f"Invalid alert rule {rule}")
+                continue
+            valid_rules.append(rule)
+        self.rules = valid_rules
+        self.tickers = list(dict.fromkeys(rule["ticker"] for rule in valid_rules))
+        self.ticker_index = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+        column = np.array([self.ticker_index[rule["ticker"]] for rule in valid_rules], dtype=np.intp)
+        # Rules sorted by ticker column, offsets[c]:offsets[c + 1] are the rules of column c
+        self.order = np.argsort(column, kind="stable")
+        self.offsets = np.searchsorted(column[self.order], np.arange(len(self.tickers) + 1))
+        self.column = column
+        self.metric = np.array([RULE_TYPES[rule["type"]][0] for rule in valid_rules], dtype=np.int8)
+        self.direction = np.array([RULE_TYPES[rule["type"]][1] for rule in valid_rules], dtype=np.float64)
+        self.threshold = np.array([rule["value"] for rule in valid_rules], dtype=np.float64)
+        self.hysteresis = np.array([rule.get("hysteresis", 0) for rule in valid_rules], dtype=np.float64)
+        self.cooldown = np.array([rule.get("cooldown", 0) for rule in valid_rules], dtype=np.float64)
+        self.armed = np.ones(len(valid_rules), dtype=bool)
+        self.last_fired = np.full(len(valid_rules), -np.inf)
+        # Last values seen per ticker column: price, daily move, unit cost and portfolio P&L
+        self.inputs = np.full((len(self.tickers), 4), np.nan)
+
+    def add_sink(self, sink: Callable):
+        """Add a function called with the list of fired alerts (i.e. log_sink or a GUI notification)."""
+        self.sinks.append(sink)
+
+    def rules_of(self, columns: np.ndarray) -> np.ndarray:
+        """Get indexes of the rules of the given ticker columns, without a Python loop over tickers."""
+        starts = self.offsets[columns]
+        lengths = self.offsets[columns + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.intp)
+        # For each output position: start of its group + position inside the group
+        group_first = np.cumsum(lengths) - lengths
+        positions = np.repeat(starts - group_first, lengths) + np.arange(total)
+        return self.order[positions]
+
+    def on_prices(self, tickers: list[str], prices, daily_move=None, unit_cost=None, pnl: float | None = None, now: float | None = None) -> list[AlertEvent]:
+        """Evaluate a batch of new values. Only rules of tickers whose values changed are evaluated.
+
+        Args:
+            tickers: List with name of the tickers of the batch.
+            prices: Last price of each ticker.
+            daily_move: Optional daily change (%) of each ticker.
+            unit_cost: Optional cost basis per share of each ticker.
+            pnl: Optional portfolio P&L.
+            now: Optional timestamp of the batch (seconds). Defaults to current time.
+
+        Returns:
+            List of fired alerts (already sent to the sinks).
+        """
+        n_tickers = len(tickers)
+        batch = np.full((n_tickers, 4), np.nan)
+        batch[:, 0] = prices
+        if daily_move is not None:
+            batch[:, 1] = daily_move
+        if unit_cost is not None:
+            batch[:, 2] = unit_cost
+        batch_cols = np.array([self.ticker_index.get(ticker, -1) for ticker in tickers], dtype=np.intp)
+        known = batch_cols >= 0
+        batch_cols = batch_cols[known]
+        batch = batch[known]
+        if pnl is not None and PORTFOLIO in self.ticker_index:
+            batch_cols = np.append(batch_cols, self.ticker_index[PORTFOLIO])
+            batch = np.vstack([batch, [np.nan, np.nan, np.nan, pnl]])
+
+        previous = self.inputs[batch_cols]
+        changed = ~((batch == previous) | (np.isnan(batch) & np.isnan(previous))).all(axis=1)
+        self.inputs[batch_cols] = batch
+        return self.evaluate(batch_cols[changed], time.time() if now is None else now)
+
+    def evaluate(self, columns: np.ndarray, now: float) -> list[AlertEvent]:
+        """Evaluate rules of the given ticker columns against last values seen.
+
+        Args:
+            columns: Array with ticker columns to evaluate.
+            now: Timestamp of the evaluation (seconds).
+
+        Returns:
+            List of fired alerts (already sent to the sinks).
+        """
+        rules = self.rules_of(columns)
+        if rules.size == 0:
+            return []
+        inputs = self.inputs[self.column[rules]]
+        metric = self.metric[rules]
+        price = inputs[:, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.select(
+                [metric == METRIC_PRICE, metric == METRIC_DAILY_MOVE, metric == METRIC_DRAWDOWN],
+                [price, np.abs(inputs[:, 1]), (1 - price / inputs[:, 2]) * 100],
+                inputs[:, 3],
+            )
+        # Distance beyond threshold in the direction of the rule (NaN values never trigger nor re-arm)
+        distance = self.direction[rules] * (values - self.threshold[rules])
+        armed = self.armed[rules]
+        fire = armed & (distance > 0) & (now - self.last_fired[rules] >= self.cooldown[rules])
+        rearm = ~armed & (distance < -self.hysteresis[rules])
+        self.armed[rules[rearm]] = True
+        fired = rules[fire]
+        self.armed[fired] = False
+        self.last_fired[fired] = now
+
+        events = [
+            AlertEvent(int(rule), self.rules[rule]["ticker"], self.rules[rule]["type"], float(value), float(self.threshold[rule]), now)
+            for rule, value in zip(fired, values[fire], strict=True)
+        ]
+        if events:
+            for sink in self.sinks:
+                sink(events)
+        return events
@@ -0,0 +1,112 @@
+"""P&L attribution: contribution of each ticker to the daily change of the portfolio."""
+from dataclasses import dataclass
+
+import numpy as np
+
+from hportfolio.portfolio import PortfolioHistory, forward_fill
+from hportfolio.tickers_data import TickersData
+
+# Name of the group adding up every ticker out of the top ones
+OTHER = "Other"
+# Tickers listed in the breakdown of a day
+BREAKDOWN_TICKERS = 6
+
+
+@dataclass
+class Attribution:
+    """Per-ticker contributions to the market P&L of each day.
+
+    Contribution of a ticker on day t is the quantity held at the end of day t - 1 times its price change on day t,
+    plus the dividends it paid that day. Summed over tickers it is the change of the portfolio value, minus deposits
+    and trades of that day (cash flows do not create P&L).
+
+    Attributes:
+        dates: Array with one date (datetime64[D]) per day.
+        tickers: List with name of the tickers (columns).
+        daily: Array (dates x tickers) with contribution of each ticker each day.
+        cumulative: Array (dates x tickers) with contribution of each ticker since first day.
+    """
+
+    dates: np.ndarray
+    tickers: list[str]
+    daily: np.ndarray
+    cumulative: np.ndarray
+
+    @classmethod
+    def from_history(cls, history: PortfolioHistory) -> "Attribution":
+        """Compute contributions of every ticker for every day in a single vectorized pass."""
+        # Last known price is carried over gaps of any length, so missing days do not lose P&L
+        prices = forward_fill(history.prices)
+        price_change = np.diff(prices, axis=0, prepend=prices[:1])
+        held = np.vstack([np.zeros((1, len(history.tickers))), history.holdings[:-1]])
+        daily = np.nan_to_num(held * price_change) + history.dividends
+        return cls(history.dates, history.tickers, daily, np.cumsum(daily, axis=0))
+
+    def row_of(self, date: str) -> int:
+        """Get row of a date (-1 if out of range)."""
+        row = int((np.datetime64(date, "D") - self.dates[0]).astype(np.int64))
+        return row if 0 <= row < len(self.dates) else -1
+
+    def top_groups(self, top_n: int, first: int = 0, last: int | None = None) -> tuple[list[str], np.ndarray]:
+        """Cumulative contribution over a range of the tickers that moved the portfolio the most, plus the rest.
+
+        Args:
+            top_n: Number of tickers shown individually. Rest are added up into the "Other" group.
+            first: First row of the range. Contributions are accumulated from it.
+            last: Optional last row of the range (inclusive). Defaults to last day.
+
+        Returns:
+            List with name of each group, and array (groups x rows) with cumulative contribution of each one.
+        """
+        rows = slice(first, len(self.dates) if last is None else last + 1)
+        cumulative = np.cumsum(self.daily[rows], axis=0)
+        # Tickers ranked by largest absolute cumulative contribution reached in the range
+        reach = np.abs(cumulative).max(axis=0, initial=0)
+        order = np.argsort(-reach, kind="stable")
+        top = order[:top_n][reach[order[:top_n]] > 0]
+        others = np.setdiff1d(np.arange(len(self.tickers)), top)
+        names = [self.tickers[col] for col in top]
+        groups = cumulative[:, top].T
+        if others.size and reach[others].any():
+            names.append(OTHER)
+            groups = np.vstack([groups, cumulative[:, others].sum(axis=1)])
+        return names, groups
+
+    def breakdown(self, row: int, top_n: int = 5) -> list[tuple[str, float, float]]:
+        """Get the tickers that contributed the most to the change of a day.
+
+        Args:
+            row: Row of the day.
+            top_n: Maximum number of tickers returned.
+
+        Returns:
+            List of (ticker, contribution of the day, cumulative contribution), largest absolute daily move first.
+        """
+        daily = self.daily[row]
+        order = np.argsort(-np.abs(daily), kind="stable")[:top_n]
+        return [(self.tickers[col], float(daily[col]), float(self.cumulative[row, col])) for col in order if daily[col] != 0]
+
+
+def stack_bands(groups: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Stack groups for a stacked-area chart. Positive values stack upwards from 0, negative ones downwards.
+
+    Args:
+        groups: Array (groups x rows) of values.
+
+    Returns:
+        Arrays (groups x rows) with lower and upper bound of the band of each group.
+    """
+    positive = np.cumsum(np.clip(groups, 0, None), axis=0)
+    negative = np.cumsum(np.clip(groups, None, 0), axis=0)
+    upper = np.where(groups >= 0, positive, negative - groups)
+    lower = np.where(groups >= 0, positive - groups, negative)
+    return lower, upper
+
+
+def breakdown_html(attribution: Attribution, row: int, top_n: int = BREAKDOWN_TICKERS) -> str:
+    """HTML breakdown of the portfolio change of a day, by ticker."""
+    lines = [f"<b>{attribution.dates[row]}</b> &nbsp; day ${attribution.daily[row].sum():+.0f}"]
+    for ticker, daily, cumulative in attribution.breakdown(row, top_n):
+        color = TickersData.get_price_color(daily)
+        lines.append(f"{ticker}: <span style='color: {color};'>${daily:+.0f}</span> (total ${cumulative:+.0f})")
+    return "<br>".join(lines)
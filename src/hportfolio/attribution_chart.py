@@ -0,0 +1,82 @@
+"""Stacked-area chart of the P&L attribution."""
+import numpy as np
+from PyQt5 import QtCore, QtGui
+from PyQt5.QtChart import QAreaSeries, QChart, QChartView, QDateTimeAxis, QLineSeries, QValueAxis
+from PyQt5.QtCore import QPointF, Qt
+from PyQt5.QtGui import QPainter
+from PyQt5.QtWidgets import QToolTip
+
+from hportfolio.attribution import Attribution, breakdown_html, stack_bands
+
+ONE_DAY_IN_MSECS = 86400000
+# Tickers shown individually, the rest are added up as "Other"
+TOP_TICKERS = 8
+
+
+class AttributionChartView(QChartView):
+    """Cumulative contribution of the top tickers as stacked areas (gains above zero, losses below).
+
+    Hovering the chart shows the breakdown of the day under the cursor.
+    """
+
+    def __init__(self, parent: QtCore.QObject | None = None):
+        """Constructor."""
+        chart = QChart()
+        chart.setTitle("P&L attribution")
+        super().__init__(chart, parent)
+        self.setRenderHint(QPainter.Antialiasing)
+        self.setMouseTracking(True)  # noqa: FBT003
+        self.attribution: Attribution | None = None
+        self.msecs = np.empty(0)
+
+        self.axis_x = QDateTimeAxis()
+        self.axis_x.setTickCount(24)
+        self.axis_x.setFormat("MM-dd-yyyy")
+        self.axis_x.setLabelsAngle(-90)
+        self.axis_y = QValueAxis()
+        self.axis_y.setTitleText("Cumulative P&L")
+        self.axis_y.setLabelFormat("%d")
+        chart.addAxis(self.axis_x, Qt.AlignBottom)
+        chart.addAxis(self.axis_y, Qt.AlignLeft)
+
+    def set_attribution(self, attribution: Attribution, top_n: int = TOP_TICKERS):
+        """Draw the stacked areas of an attribution."""
+        self.attribution = attribution
+        chart = self.chart()
+        chart.removeAllSeries()
+        names, groups = attribution.top_groups(top_n)
+        if not names:
+            return
+        # Local midnight of each date. Days are not all 24 hours long across DST changes, so they are not evenly spaced.
+        self.msecs = np.array([QtCore.QDateTime(QtCore.QDate.fromString(date, "yyyy-MM-dd")).toMSecsSinceEpoch() for date in attribution.dates.astype(str).tolist()], dtype=np.float64)
+        msecs = self.msecs.tolist()
+        lower, upper = stack_bands(groups)
+        for name, group_lower, group_upper in zip(names, lower, upper, strict=True):
+            lower_series = QLineSeries()
+            lower_series.replace([QPointF(x, y) for x, y in zip(msecs, group_lower.tolist(), strict=True)])
+            upper_series = QLineSeries()
+            upper_series.replace([QPointF(x, y) for x, y in zip(msecs, group_upper.tolist(), strict=True)])
+            area = QAreaSeries(upper_series, lower_series)
+            # Line series are owned by the area series
+            upper_series.setParent(area)
+            lower_series.setParent(area)
+            area.setName(name)
+            area.setPen(QtGui.QPen(Qt.NoPen))
+            chart.addSeries(area)
+            area.attachAxis(self.axis_x)
+            area.attachAxis(self.axis_y)
+        self.axis_x.setRange(QtCore.QDateTime.fromMSecsSinceEpoch(int(msecs[0])), QtCore.QDateTime.fromMSecsSinceEpoch(int(msecs[-1])))
+        margin = max(float(upper.max() - lower.min()) * 0.05, 1)
+        self.axis_y.setRange(float(lower.min()) - margin, float(upper.max()) + margin)
+
+    def mouseMoveEvent(self, event: QtGui.QMouseEvent) -> None:  # noqa: N802
+        """Show breakdown of the day under the cursor."""
+        super().mouseMoveEvent(event)
+        if self.attribution is None or not self.chart().plotArea().contains(event.pos()):
+            QToolTip.hideText()
+            return
+        msecs = self.chart().mapToValue(event.pos()).x()
+        # Nearest day: dates are half a day before and after the point of their local midnight
+        row = int(np.searchsorted(self.msecs, msecs + ONE_DAY_IN_MSECS / 2)) - 1
+        if 0 <= row < len(self.attribution.dates):
+            QToolTip.showText(event.globalPos(), breakdown_html(self.attribution, row), self)
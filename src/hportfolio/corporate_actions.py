@@ -0,0 +1,151 @@
+"""Corporate actions (splits and dividends) of each symbol, cached next to the close prices."""
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from hportfolio.price_store import PriceMatrix
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+# Kinds of actions
+SPLITS = "splits"
+DIVIDENDS = "dividends"
+
+
+def split_factors(splits: PriceMatrix, tickers: list[str], dates) -> np.ndarray:
+    """Cumulative ratio of the splits after each date, for every ticker at once.
+
+    Quantities held at a date times its factor are in units of the current (split adjusted) prices.
+
+    Args:
+        splits: Matrix with the ratio (new shares per old share) of each split at its ex-date, NaN on other days.
+        tickers: List with name of the tickers. Tickers without splits get a factor of 1.
+        dates: Array (or list) of dates.
+
+    Returns:
+        Array (dates x tickers) of factors.
+    """
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    factors = np.ones((len(dates), len(tickers)))
+    cols = np.array([splits.columns.get(ticker, -1) for ticker in tickers], dtype=np.intp)
+    known = np.flatnonzero(cols >= 0)
+    if splits.last_day < 0 or known.size == 0:
+        return factors
+    ratios = np.nan_to_num(splits.data[:splits.last_day + 1, cols[known]], nan=1.0)
+    # Product of the ratios of each row and the ones after it. Last row (one past the matrix) has no splits left.
+    after = np.ones((ratios.shape[0] + 1, known.size))
+    after[:-1] = np.cumprod(ratios[::-1], axis=0)[::-1]
+    # Split on the ex-date itself is already reflected in the quantity held that day
+    rows = np.clip(splits.day_index(dates) + 1, 0, ratios.shape[0])
+    factors[:, known] = after[rows]
+    return factors
+
+
+class CorporateActions:
+    """Table of splits and dividends by symbol and ex-date, kept in a JSON file.
+
+    Actions arrive with the price downloads (same request), so the table is refreshed incrementally along with the
+    close prices. Dividends are amounts per share in the currency of the symbol, adjusted for later splits like the
+    close prices are. Recording a split that happened after the previous downloads also adjusts the dividends before
+    it, as the provider does.
+    """
+
+    # Set-up logger
+    logger = logging.getLogger("CorporateActions")
+
+    def __init__(self, path: str | Path | None = None):
+        """Constructor.
+
+        Args:
+            path: Optional path of the JSON file. If it exists, cached actions are loaded from it.
+        """
+        self.path = Path(path) if path is not None else None
+        self.actions: dict[str, dict[str, dict[str, float]]] = {SPLITS: {}, DIVIDENDS: {}}
+        if self.path is not None and self.path.exists():
+            with self.path.open(encoding="utf8") as input_fh:
+                self.actions.update(json.load(input_fh))
+        self.dirty = False
+
+    @property
+    def splits(self) -> dict[str, dict[str, float]]:
+        """Ratio of each split, by symbol and ex-date (format YYYY-MM-DD)."""
+        return self.actions[SPLITS]
+
+    @property
+    def dividends(self) -> dict[str, dict[str, float]]:
+        """Amount per share of each dividend, by symbol and ex-date (format YYYY-MM-DD)."""
+        return self.actions[DIVIDENDS]
+
+    def record(self, splits_df: DataFrame, dividends_df: DataFrame, last_fetched: dict[str, str | None] | None = None) -> list[tuple[str, str, float]]:
+        """Record the actions of a download. Cells with zero or NaN mean no action.
+
+        Args:
+            splits_df: Dataframe indexed by (timezone naive) date with the split ratio of each symbol.
+            dividends_df: Dataframe indexed by (timezone naive) date with the dividend per share of each symbol.
+            last_fetched: Optional dictionary with the last date of the previous downloads of each symbol, in format
+                YYYY-MM-DD. Data of a symbol downloaded up to then is not adjusted for its splits on or after it.
+                Symbols left out (or None) have no previous data.
+
+        Returns:
+            List of (symbol, ex-date, ratio) of the new splits on or after the last fetched date of their symbol,
+            sorted by ex-date.
+        """
+        last_fetched = last_fetched or {}
+        new_splits = []
+        for kind, actions_df in ((SPLITS, splits_df), (DIVIDENDS, dividends_df)):
+            values = actions_df.to_numpy(dtype=float, na_value=np.nan)
+            dates = actions_df.index.strftime("%Y-%m-%d")
+            rows, cols = np.nonzero(values > 0)
+            for row, col in zip(rows.tolist(), cols.tolist(), strict=True):
+                symbol, date, value = actions_df.columns[col], dates[row], float(values[row, col])
+                by_date = self.actions[kind].setdefault(symbol, {})
+                symbol_last_fetched = last_fetched.get(symbol)
+                if kind == SPLITS and date not in by_date and symbol_last_fetched is not None and date >= symbol_last_fetched:
+                    new_splits.append((symbol, date, value))
+                self.dirty |= by_date.get(date) != value
+                by_date[date] = value
+        new_splits.sort(key=lambda split: split[1])
+        for symbol, ex_date, ratio in new_splits:
+            self.__class__.logger.info(f"New {ratio:g}:1 split of {symbol} on {ex_date}")
+            dividends = self.dividends.get(symbol, {})
+            # Dividends of this same download are already adjusted
+            recorded = set(dividends_df.index[dividends_df[symbol] > 0].strftime("%Y-%m-%d")) if symbol in dividends_df else set()
+            for date in dividends:
+                if date < ex_date and date not in recorded:
+                    dividends[date] /= ratio
+                    self.dirty = True
+        return new_splits
+
+    def to_frame(self, kind: str, tickers) -> DataFrame:
+        """Get actions of some tickers as a dataframe.
+
+        Args:
+            kind: SPLITS or DIVIDENDS.
+            tickers: Iterable with name of the tickers.
+
+        Returns:
+            A dataframe indexed by ex-date with one column per ticker that has actions (NaN on days without action).
+        """
+        from pandas import DataFrame, to_datetime
+
+        by_ticker = {ticker: self.actions[kind][ticker] for ticker in sorted(tickers) if self.actions[kind].get(ticker)}
+        actions_df = DataFrame(by_ticker, dtype=float)
+        actions_df.index = to_datetime(actions_df.index)
+        return actions_df.sort_index()
+
+    def flush(self):
+        """Write the table to its file, if it changed."""
+        if self.path is None or not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf8") as output_fh:
+            json.dump(self.actions, output_fh, indent=1, sort_keys=True)
+        tmp_path.replace(self.path)
+        self.dirty = False
@@ -1,16 +1,17 @@
 """Graphic enhancement items."""
-from PyQt5.QtChart import QAbstractSeries, QChart
+from PyQt5.QtChart import QChart
 from PyQt5.QtCore import QDateTime, QLineF, QPointF
 from PyQt5.QtGui import QColor, QPen
 from PyQt5.QtWidgets import QGraphicsLineItem, QGraphicsScene, QGraphicsTextItem
 
-from hportfolio.tickers_data import TickersData
+from hportfolio.attribution import Attribution, breakdown_html
+from hportfolio.portfolio import PortfolioHistory
 
 
 class Crosshairs:
     """Class to implement dynamic crosshair on top of qchartview."""
 
-    def __init__(self, chart: QChart, scene: QGraphicsScene, tickers_data: TickersData):
+    def __init__(self, chart: QChart, scene: QGraphicsScene):
         """Constructor."""
         self.m_x_line = QGraphicsLineItem()
         self.m_y_line = QGraphicsLineItem()
@@ -31,8 +32,15 @@ class Crosshairs:
             text_item.setDefaultTextColor(QColor("white"))
             scene.addItem(text_item)
 
-        # Tickers data
-        self.tickers_data = tickers_data
+        # Per-ticker breakdown of the day (shown if an attribution is set)
+        self.attribution: Attribution | None = None
+        self.m_breakdown_text = QGraphicsTextItem()
+        self.m_breakdown_text.setZValue(11)
+        self.m_breakdown_text.setDefaultTextColor(QColor("black"))
+        scene.addItem(self.m_breakdown_text)
+
+        # Portfolio history the values under the cursor are taken from (crosshair is disabled until it is set)
+        self.history: PortfolioHistory | None = None
 
         # add lines and text to scene
         scene.addItem(self.m_x_line)
@@ -42,13 +50,6 @@ class Crosshairs:
         # Hysteresis for horizontal snap
         self.hyst = 1.0
 
-    def get_y_value_of_series(self, series: QAbstractSeries, x: float | int) -> float:
-        """Get Y value of a Q Line Series."""
-        for qpoint in series.pointsVector():
-            if qpoint.x() == x:
-                return qpoint.y()
-        return 0.0
-
     def update_position(self, position: float | int):
         """Update position based on mouse event."""
         # print(f'updating to : {position} for {self.m_chart}')
@@ -69,14 +70,14 @@ class Crosshairs:
         self.m_x_line.setLine(x_line)
         self.m_y_line.setLine(y_line)
 
-        portfolio_series: QAbstractSeries = self.m_chart.series()[1]
         x_date = QDateTime()
         x_date.setMSecsSinceEpoch(int(x_))
         x_date_str = x_date.toString("MM-dd-yy")
         x_date_str_2 = x_date.toString("yyyy-MM-dd")
 
-        portfolio_value = round(self.get_y_value_of_series(portfolio_series, x_))
-        invested_value = round(self.tickers_data.get_invested_cash(x_date_str_2))
+        state = self.history.at(x_date_str_2)
+        portfolio_value = round(float(state.total[0]))
+        invested_value = round(float(state.invested[0]))
 
         x_text = f"{x_date_str}"
         self.m_x_text.setHtml(f"<div style='background-color: #ff0000;'> {x_text} </div>")
@@ -88,6 +89,7 @@ class Crosshairs:
             self.m_y_line.hide()
             for obj in self.m_y_text_list:
                 obj.hide()
+            self.m_breakdown_text.hide()
         else:
             self.m_x_line.show()
             self.m_x_text.show()
@@ -100,3 +102,18 @@ class Crosshairs:
                 obj.setHtml(f"<div style='background-color: #ff0000;'> {y_labels[i]} </div>")
                 obj.setPos(self.m_chart.plotArea().right(), position.y() - obj.boundingRect().height() / 2.0 + i * 20)
                 obj.show()
+            self.update_breakdown(x_date_str_2, position_x)
+
+    def update_breakdown(self, date: str, position_x: float):
+        """Show which tickers drove the change of the day, next to the vertical line."""
+        row = self.attribution.row_of(date) if self.attribution else -1
+        if row < 0:
+            self.m_breakdown_text.hide()
+            return
+        self.m_breakdown_text.setHtml(f"<div style='background-color: rgba(255, 255, 255, 200);'>{breakdown_html(self.attribution, row)}</div>")
+        # Keep the breakdown inside the plot area, at the side of the line with more room
+        plot_area = self.m_chart.plotArea()
+        width = self.m_breakdown_text.boundingRect().width()
+        x_pos = position_x + 10 if position_x + 10 + width < plot_area.right() else position_x - 10 - width
+        self.m_breakdown_text.setPos(x_pos, plot_area.top())
+        self.m_breakdown_text.show()
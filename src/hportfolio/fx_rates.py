@@ -0,0 +1,145 @@
+"""Foreign exchange rates handling."""
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+# Currency of listings whose ticker suffix identifies the exchange (Yahoo Finance convention)
+SUFFIX_CURRENCIES = {
+    "AS": "EUR",
+    "PA": "EUR",
+    "DE": "EUR",
+    "F": "EUR",
+    "MI": "EUR",
+    "MC": "EUR",
+    "BR": "EUR",
+    "L": "GBp",
+    "SW": "CHF",
+    "TO": "CAD",
+    "V": "CAD",
+    "TW": "TWD",
+    "TWO": "TWD",
+    "T": "JPY",
+    "HK": "HKD",
+    "KS": "KRW",
+    "AX": "AUD",
+    "SA": "BRL",
+    "BA": "ARS",
+    "MX": "MXN",
+}
+
+# Currencies quoted in minor units: (major currency, multiplier to major currency)
+MINOR_UNITS = {
+    "GBp": ("GBP", 0.01),
+    "GBX": ("GBP", 0.01),
+    "ILA": ("ILS", 0.01),
+    "ZAc": ("ZAR", 0.01),
+}
+
+
+class FxRateStore:
+    """Class for keeping currency metadata and FX rate history of the tickers."""
+
+    # Set-up logger
+    logger = logging.getLogger("FxRateStore")
+
+    def __init__(self, base_currency: str = "USD", currencies: dict | None = None):
+        """Constructor.
+
+        Args:
+            base_currency: Currency every price is converted to (same as LIQUIDITY and deposits).
+            currencies: Dictionary with explicit currency of each ticker. Overrides suffix inference.
+        """
+        self.base_currency = base_currency
+        self.currencies = dict(currencies or {})
+        # Pandas is only loaded once rates are merged (not at startup)
+        self.rates_df: DataFrame | None = None
+
+    def get_currency(self, ticker: str) -> str:
+        """Get the currency in which a ticker is quoted.
+
+        Args:
+            ticker: String with name of the ticker.
+
+        Returns:
+            Currency code. Explicit metadata first, then exchange suffix, otherwise base currency.
+        """
+        if ticker in self.currencies:
+            return self.currencies[ticker]
+        if ticker == "LIQUIDITY" or "." not in ticker:
+            return self.base_currency
+        return SUFFIX_CURRENCIES.get(ticker.rsplit(".", 1)[1], self.base_currency)
+
+    def pair_symbol(self, currency: str) -> str | None:
+        """Get Yahoo Finance symbol of the rate from a currency to the base currency.
+
+        Args:
+            currency: Currency code (minor units are resolved to their major currency).
+
+        Returns:
+            Symbol like "EURUSD=X", or None if the currency is the base currency.
+        """
+        major = MINOR_UNITS.get(currency, (currency, 1.0))[0]
+        if major == self.base_currency:
+            return None
+        return f"{major}{self.base_currency}=X"
+
+    def required_pairs(self, tickers) -> set[str]:
+        """Get the FX pair symbols needed to convert the given tickers to base currency."""
+        pairs = {self.pair_symbol(self.get_currency(ticker)) for ticker in tickers}
+        pairs.discard(None)
+        return pairs
+
+    def update(self, rates_df: DataFrame):
+        """Merge new FX rate history into the store.
+
+        Args:
+            rates_df: Dataframe with one column per pair symbol. New values take precedence over stored ones.
+        """
+        if rates_df.empty:
+            return
+        self.rates_df = rates_df.combine_first(self.rates_df) if self.rates_df is not None else rates_df.copy()
+
+    def convert(self, prices_df: DataFrame) -> DataFrame:
+        """Convert a whole price matrix to base currency in a single vectorized pass.
+
+        Args:
+            prices_df: Dataframe of prices with one column per ticker, each in its own currency.
+
+        Returns:
+            A dataframe with the same shape containing prices in base currency.
+        """
+        from pandas import DataFrame
+
+        tickers = list(prices_df.columns)
+        pairs = []
+        factors = np.ones(len(tickers))
+        for i, ticker in enumerate(tickers):
+            currency = self.get_currency(ticker)
+            factors[i] = MINOR_UNITS.get(currency, (currency, 1.0))[1]
+            pairs.append(self.pair_symbol(currency))
+        used_pairs = sorted({pair for pair in pairs if pair is not None})
+        if not used_pairs:
+            if np.all(factors == 1.0):
+                return prices_df
+            return prices_df * factors
+
+        rates_df = DataFrame() if self.rates_df is None else self.rates_df
+        available = [pair for pair in used_pairs if pair in rates_df]
+        missing = [pair for pair in used_pairs if pair not in rates_df]
+        if missing:
+            self.__class__.logger.error(f"Missing FX rates for {missing}. Prices in those currencies are left unconverted.")
+        # Rates aligned to price dates. Last column of ones is used by tickers in base currency or without rates.
+        rates = np.ones((len(prices_df.index), len(available) + 1))
+        if available:
+            aligned = rates_df[available].sort_index().ffill().reindex(prices_df.index, method="ffill").bfill()
+            rates[:, :-1] = aligned.to_numpy(dtype=float, na_value=1.0)
+        column_of_pair = {pair: i for i, pair in enumerate(available)}
+        rate_idx = np.array([column_of_pair.get(pair, len(available)) for pair in pairs], dtype=np.intp)
+        converted = prices_df.to_numpy(dtype=float) * rates[:, rate_idx] * factors
+        return DataFrame(converted, index=prices_df.index, columns=prices_df.columns)
@@ -0,0 +1,19 @@
+"""Importers of broker statements."""
+
+from hportfolio.importers.base import PARSERS, StatementParser, Transaction, get_parser, register_parser
+from hportfolio.importers.csv_statement import CsvStatementParser
+from hportfolio.importers.ledger import ImportResult, StatementImporter, import_statements
+from hportfolio.importers.ofx_statement import OfxStatementParser
+
+__all__ = [
+    "PARSERS",
+    "CsvStatementParser",
+    "ImportResult",
+    "OfxStatementParser",
+    "StatementImporter",
+    "StatementParser",
+    "Transaction",
+    "get_parser",
+    "import_statements",
+    "register_parser",
+]
@@ -0,0 +1,169 @@
+"""Base classes of broker statement parsers."""
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+# Kinds of transactions found in statements
+TRADE = "trade"
+DEPOSIT = "deposit"
+WITHDRAWAL = "withdrawal"
+
+# Date formats found in broker exports
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%Y%m%d", "%d-%b-%Y", "%Y/%m/%d")
+
+
+@dataclass(frozen=True)
+class Transaction:
+    """One row of a broker statement.
+
+    Attributes:
+        date: String with date of the transaction, in format YYYY-MM-DD.
+        kind: One of "trade", "deposit" or "withdrawal".
+        ticker: Name of the ticker (empty for cash transactions).
+        qty: Number of shares, positive for buys and negative for sells.
+        price: Unit price of the trade.
+        fees: Fees and commissions (positive).
+        amount: Cash amount of deposits and withdrawals (positive).
+        ref: Identifier given by the broker (if any).
+    """
+
+    date: str
+    kind: str
+    ticker: str = ""
+    qty: float = 0
+    price: float = 0
+    fees: float = 0
+    amount: float = 0
+    ref: str = ""
+
+    @property
+    def cash_delta(self) -> float:
+        """Change of LIQUIDITY caused by the transaction."""
+        if self.kind == TRADE:
+            return -self.qty * self.price - self.fees
+        if self.kind == DEPOSIT:
+            return self.amount
+        return -self.amount
+
+    def content_key(self) -> str:
+        """Canonical content of the transaction, used to detect rows already imported."""
+        return f"{self.date}|{self.kind}|{self.ticker}|{self.qty:.6f}|{self.price:.6f}|{self.fees:.6f}|{self.amount:.6f}|{self.ref}"
+
+
+def content_hash(key: str) -> int:
+    """Get a 64 bits hash of a transaction content.
+
+    Identical rows (i.e. two identical trades the same day) have the same hash, they are told apart by counting them.
+
+    Args:
+        key: Canonical content of the transaction.
+
+    Returns:
+        Unsigned 64 bits integer.
+    """
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value: str) -> str:
+    """Parse a date in any of the known broker formats.
+
+    Args:
+        value: String with the date (time part, if any, is ignored).
+
+    Returns:
+        String with the date in format YYYY-MM-DD.
+    """
+    value = value.strip().split(" ")[0].split("T")[0]
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).strftime("%Y-%m-%d")  # noqa: DTZ007
+        except ValueError:
+            continue
+    msg = f"Unknown date format: {value}"
+    raise ValueError(msg)
+
+
+def parse_number(value: str) -> float:
+    """Parse a number as written by brokers ("$1,234.50", "(12.3)", "-4")."""
+    value = value.strip().replace("$", "").replace(",", "")
+    if not value:
+        return 0.0
+    if value.startswith("(") and value.endswith(")"):
+        return -float(value[1:-1])
+    return float(value)
+
+
+class StatementParser(ABC):
+    """Base class of statement parsers. Parsers yield transactions one by one, never loading a whole file."""
+
+    # Name of the format, used to select a parser explicitly
+    name = ""
+
+    # Set-up logger
+    logger = logging.getLogger("StatementParser")
+
+    @classmethod
+    @abstractmethod
+    def can_parse(cls, path: Path, head: str) -> bool:
+        """Check if the parser understands a file.
+
+        Args:
+            path: Path of the statement.
+            head: First characters of the file.
+
+        Returns:
+            True if the file looks like a statement of this format.
+        """
+
+    @abstractmethod
+    def transactions(self, path: Path) -> Iterator[Transaction]:
+        """Stream transactions of a statement.
+
+        Args:
+            path: Path of the statement.
+
+        Yields:
+            Each transaction, in file order.
+        """
+
+
+PARSERS: list[type[StatementParser]] = []
+
+
+def register_parser(parser: type[StatementParser]) -> type[StatementParser]:
+    """Class decorator registering a statement parser."""
+    PARSERS.append(parser)
+    return parser
+
+
+def get_parser(path: str | Path, name: str | None = None) -> StatementParser:
+    """Get a parser for a statement.
+
+    Args:
+        path: Path of the statement.
+        name: Optional name of the format. If None, format is detected from file content.
+
+    Returns:
+        Parser instance.
+    """
+    path = Path(path)
+    if name:
+        for parser in PARSERS:
+            if parser.name == name:
+                return parser()
+        msg = f"Unknown statement format {name}"
+        raise ValueError(msg)
+    with path.open(encoding="utf8", errors="replace") as input_fh:
+        head = input_fh.read(4096)
+    for parser in PARSERS:
+        if parser.can_parse(path, head):
+            return parser()
+    msg = f"No parser found for {path}"
+    raise ValueError(msg)
@@ -0,0 +1,107 @@
+"""Parser of broker CSV exports."""
+import csv
+from collections.abc import Iterator
+from pathlib import Path
+
+from hportfolio.importers.base import DEPOSIT, TRADE, WITHDRAWAL, StatementParser, Transaction, parse_date, parse_number, register_parser
+
+# Column names of each known export. "qty_signed" means sells already have negative quantities.
+CSV_PROFILES = {
+    "generic": {
+        "date": "date", "action": "action", "ticker": "ticker", "qty": "quantity", "price": "price",
+        "fees": "fees", "amount": "amount", "ref": "id", "qty_signed": False,
+    },
+    "schwab": {
+        "date": "Date", "action": "Action", "ticker": "Symbol", "qty": "Quantity", "price": "Price",
+        "fees": "Fees & Comm", "amount": "Amount", "ref": None, "qty_signed": False,
+    },
+    "ibkr": {
+        "date": "TradeDate", "action": "Buy/Sell", "ticker": "Symbol", "qty": "Quantity", "price": "TradePrice",
+        "fees": "IBCommission", "amount": None, "ref": "TradeID", "qty_signed": True,
+    },
+}
+
+# Action names found in exports, by transaction kind
+BUY_ACTIONS = {"buy", "bought", "buy to open", "reinvest shares"}
+SELL_ACTIONS = {"sell", "sold", "sell to close"}
+DEPOSIT_ACTIONS = {"deposit", "moneylink deposit", "wire funds received", "journal in"}
+WITHDRAWAL_ACTIONS = {"withdrawal", "moneylink transfer", "wire funds", "journal out"}
+
+
+@register_parser
+class CsvStatementParser(StatementParser):
+    """Parser of CSV statements. Columns are mapped with one of the known profiles (detected from header)."""
+
+    name = "csv"
+
+    def __init__(self, profile: str | None = None):
+        """Constructor.
+
+        Args:
+            profile: Optional name of the profile (see CSV_PROFILES). If None, it is detected from the header.
+        """
+        self.profile = profile
+
+    @staticmethod
+    def detect_profile(header: list[str]) -> str | None:
+        """Get name of the profile whose mandatory columns are all in the header."""
+        for name, profile in CSV_PROFILES.items():
+            if all(profile[column] in header for column in ("date", "ticker", "qty", "price")):
+                return name
+        return None
+
+    @classmethod
+    def can_parse(cls, path: Path, head: str) -> bool:
+        """Check extension and header of the file."""
+        if path.suffix.lower() != ".csv" or not head:
+            return False
+        header = next(csv.reader([head.splitlines()[0]]))
+        return cls.detect_profile([column.strip() for column in header]) is not None
+
+    def transactions(self, path: Path) -> Iterator[Transaction]:
+        """Stream transactions of a CSV statement, one row at a time."""
+        with Path(path).open(encoding="utf8", newline="") as input_fh:
+            reader = csv.DictReader(input_fh)
+            reader.fieldnames = [column.strip() for column in reader.fieldnames or []]
+            profile = CSV_PROFILES[self.profile or self.detect_profile(reader.fieldnames)]
+            for line, row in enumerate(reader, start=2):
+                try:
+                    transaction = self.parse_row(row, profile)
+                except ValueError:
+                    self.__class__.logger.exception(f"{path}:{line} skipped")
+                    continue
+                if transaction:
+                    yield transaction
+
+    @staticmethod
+    def parse_row(row: dict, profile: dict) -> Transaction | None:
+        """Convert a CSV row into a transaction.
+
+        Args:
+            row: Dictionary with the columns of the row.
+            profile: Column mapping of the export.
+
+        Returns:
+            A transaction, or None for rows that do not change positions nor cash (i.e. totals, dividends).
+        """
+        def column(name: str) -> str:
+            return (row.get(profile[name]) or "").strip() if profile[name] else ""
+
+        action = column("action").lower()
+        date = parse_date(column("date"))
+        ref = column("ref")
+        if action in DEPOSIT_ACTIONS or action in WITHDRAWAL_ACTIONS:
+            kind = DEPOSIT if action in DEPOSIT_ACTIONS else WITHDRAWAL
+            return Transaction(date, kind, amount=abs(parse_number(column("amount"))), ref=ref)
+        ticker = column("ticker")
+        if not ticker or not column("qty"):
+            return None
+        qty = parse_number(column("qty"))
+        if not profile["qty_signed"]:
+            if action in SELL_ACTIONS:
+                qty = -abs(qty)
+            elif action in BUY_ACTIONS:
+                qty = abs(qty)
+            else:
+                return None
+        return Transaction(date, TRADE, ticker, qty, parse_number(column("price")), abs(parse_number(column("fees"))), ref=ref)
@@ -0,0 +1,225 @@
+"""Merge of broker statements into the portfolio data."""
+import json
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from hportfolio.importers.base import DEPOSIT, TRADE, WITHDRAWAL, Transaction, content_hash, get_parser
+
+# Transactions processed at once. Memory used while importing depends on this, not on the statement size.
+CHUNK_ROWS = 10000
+
+
+@dataclass
+class ImportResult:
+    """Summary of an imported statement."""
+
+    path: str
+    rows: int = 0
+    new_rows: int = 0
+    duplicates: int = 0
+    first_affected_date: str | None = None
+
+
+def hashes_path_of(data_file: str | Path) -> Path:
+    """Get path of the file keeping hashes of the transactions already imported into a data file."""
+    data_file = Path(data_file)
+    return data_file.with_name(data_file.stem + "_imported.bin")
+
+
+def json_number(value: float) -> int | float:
+    """Get a number as written in data file (integers without decimals)."""
+    value = round(float(value), 6)
+    return int(value) if value.is_integer() else value
+
+
+class StatementImporter:
+    """Imports broker statements into the portfolio data.
+
+    Statements are streamed in chunks of rows. Rows already imported (same content hash) are skipped, and new rows
+    are aggregated per date and ticker, so besides the hashes of the rows already imported, memory depends on the
+    chunk size and the number of trading dates, not on the number of rows.
+    Hashes are kept as a multiset: identical rows of the same day have the same hash, and a statement row is only a
+    duplicate while the statement has no more copies of it than were imported before. Identical rows can be anywhere
+    in the statement (statements do not need to be sorted by date).
+    """
+
+    # Set-up logger
+    logger = logging.getLogger("StatementImporter")
+
+    def __init__(self, data_content: dict, hashes_path: str | Path | None = None):
+        """Constructor.
+
+        Args:
+            data_content: Portfolio data (content of data file). It is modified in place by merge().
+            hashes_path: Optional file with hashes of transactions already imported (64 bits each).
+        """
+        self.data_content = data_content
+        self.hashes_path = Path(hashes_path) if hashes_path else None
+        hashes = np.fromfile(self.hashes_path, dtype=np.uint64) if self.hashes_path and self.hashes_path.is_file() else np.empty(0, dtype=np.uint64)
+        # Sorted distinct hashes already imported, with the number of rows of each one
+        self.known_hashes, self.known_counts = np.unique(hashes, return_counts=True)
+        self.new_hashes: list[np.ndarray] = []
+        self.position_deltas: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.cash_deltas: dict[str, float] = defaultdict(float)
+        self.deposits: dict[str, float] = defaultdict(float)
+        self.withdrawals: dict[str, float] = defaultdict(float)
+
+    def import_statement(self, path: str | Path, fmt: str | None = None) -> ImportResult:
+        """Stream a statement and aggregate its new transactions. Call merge() to apply them.
+
+        Args:
+            path: Path of the statement.
+            fmt: Optional name of the format ("csv", "ofx"). If None, it is detected.
+
+        Returns:
+            Summary of the statement.
+        """
+        result = ImportResult(str(path))
+        # Copies of each known hash already matched by rows of this statement
+        matched = np.zeros(len(self.known_hashes), dtype=np.int64)
+        first_new = len(self.new_hashes)
+        chunk: list[Transaction] = []
+        for transaction in get_parser(path, fmt).transactions(Path(path)):
+            chunk.append(transaction)
+            if len(chunk) >= CHUNK_ROWS:
+                self._process_chunk(chunk, matched, result)
+                chunk = []
+        self._process_chunk(chunk, matched, result)
+        # New rows are known for the next statements (i.e. overlapping statements imported together)
+        if len(self.new_hashes) > first_new:
+            hashes = np.concatenate([np.repeat(self.known_hashes, self.known_counts), *self.new_hashes[first_new:]])
+            self.known_hashes, self.known_counts = np.unique(hashes, return_counts=True)
+        self.__class__.logger.info(f"{path}: {result.rows} rows, {result.new_rows} new, {result.duplicates} already imported")
+        return result
+
+    def _process_chunk(self, chunk: list[Transaction], matched: np.ndarray, result: ImportResult):
+        """Skip known transactions of a chunk and aggregate the new ones.
+
+        Args:
+            chunk: List of transactions.
+            matched: Array with copies of each known hash matched by previous rows of the statement. Updated in place.
+            result: Summary of the statement. Updated in place.
+        """
+        if not chunk:
+            return
+        hashes = np.array([content_hash(transaction.content_key()) for transaction in chunk], dtype=np.uint64)
+        # Rank of each row among the identical rows of the chunk (0 for the first one)
+        order = np.argsort(hashes, kind="stable")
+        sorted_hashes = hashes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_hashes[1:] != sorted_hashes[:-1]])
+        ranks = np.empty(len(chunk), dtype=np.int64)
+        ranks[order] = np.arange(len(chunk)) - np.repeat(starts, np.diff(np.r_[starts, len(chunk)]))
+        # A row is known while previous imports have more copies of it than were matched by the statement so far
+        positions = np.minimum(np.searchsorted(self.known_hashes, hashes), max(len(self.known_hashes) - 1, 0))
+        known = np.zeros(len(chunk), dtype=bool)
+        if len(self.known_hashes):
+            found = self.known_hashes[positions] == hashes
+            known = found & (matched[positions] + ranks < self.known_counts[positions])
+            np.add.at(matched, positions[known], 1)
+        result.rows += len(chunk)
+        result.duplicates += int(known.sum())
+        new_idx = np.flatnonzero(~known)
+        for i in new_idx:
+            transaction = chunk[i]
+            if transaction.kind == TRADE:
+                self.position_deltas[transaction.date][transaction.ticker] += transaction.qty
+            elif transaction.kind == DEPOSIT:
+                self.deposits[transaction.date] += transaction.amount
+            elif transaction.kind == WITHDRAWAL:
+                self.withdrawals[transaction.date] += transaction.amount
+            self.cash_deltas[transaction.date] += transaction.cash_delta
+            if result.first_affected_date is None or transaction.date < result.first_affected_date:
+                result.first_affected_date = transaction.date
+        result.new_rows += len(new_idx)
+        self.new_hashes.append(hashes[new_idx])
+
+    def merge(self) -> str | None:
+        """Apply aggregated transactions to status snapshots, deposits and withdrawals.
+
+        Snapshots before the first new transaction are left untouched. A snapshot is created at each new trading
+        date, starting from the positions of the previous snapshot.
+
+        Returns:
+            String with first date affected by the merge (recompute is only needed from there), or None.
+        """
+        new_dates = sorted(set(self.cash_deltas) | set(self.position_deltas))
+        if not new_dates:
+            return None
+        status = self.data_content.setdefault("status", {})
+        last_stocks = status.get("last", {}).get("stocks", {})
+        snapshot_dates = sorted(date for date in status if date != "last")
+        all_dates = sorted(set(snapshot_dates) | set(new_dates))
+        tickers = list(dict.fromkeys([ticker for date in snapshot_dates for ticker in status[date]["stocks"]] + list(last_stocks)))
+        tickers += [ticker for date in new_dates for ticker in self.position_deltas.get(date, {}) if ticker not in tickers]
+        tickers = list(dict.fromkeys([*tickers, "LIQUIDITY"]))
+        column = {ticker: i for i, ticker in enumerate(tickers)}
+        row = {date: i for i, date in enumerate(all_dates)}
+
+        positions = np.zeros((len(all_dates), len(tickers)))
+        is_snapshot = np.zeros(len(all_dates), dtype=bool)
+        for date in snapshot_dates:
+            is_snapshot[row[date]] = True
+            for ticker, qty in status[date]["stocks"].items():
+                positions[row[date], column[ticker]] = qty
+        # New dates start from positions of previous snapshot
+        source = np.where(is_snapshot, np.arange(len(all_dates)), -1)
+        np.maximum.accumulate(source, out=source)
+        positions = np.where(source[:, None] >= 0, positions[np.maximum(source, 0)], 0)
+
+        deltas = np.zeros_like(positions)
+        for date in new_dates:
+            for ticker, qty in self.position_deltas.get(date, {}).items():
+                deltas[row[date], column[ticker]] += qty
+            deltas[row[date], column["LIQUIDITY"]] += self.cash_deltas.get(date, 0)
+        positions += np.cumsum(deltas, axis=0)
+        last = np.array([last_stocks.get(ticker, 0) for ticker in tickers], dtype=float) + deltas.sum(axis=0)
+
+        merged = {"last": {**status.get("last", {}), "stocks": {ticker: json_number(qty) for ticker, qty in zip(tickers, last, strict=True)}}}
+        for date in reversed(all_dates):
+            merged[date] = {**status.get(date, {}), "stocks": {ticker: json_number(qty) for ticker, qty in zip(tickers, positions[row[date]], strict=True)}}
+        status.clear()
+        status.update(merged)
+
+        operations = self.data_content.setdefault("operations", {})
+        for name, amounts in (("deposit", self.deposits), ("withdrawal", self.withdrawals)):
+            current = operations.setdefault(name, {})
+            for date, amount in amounts.items():
+                current[date] = json_number(current.get(date, 0) + amount)
+            operations[name] = dict(sorted(current.items()))
+        return new_dates[0]
+
+    def save_hashes(self):
+        """Append hashes of the merged transactions to the hashes file."""
+        if not self.hashes_path or not self.new_hashes:
+            return
+        with self.hashes_path.open("ab") as output_fh:
+            for hashes in self.new_hashes:
+                hashes.tofile(output_fh)
+        self.new_hashes = []
+
+
+def import_statements(data_file: str | Path, paths: list, fmt: str | None = None) -> tuple[list[ImportResult], str | None]:
+    """Import statements into a data file.
+
+    Args:
+        data_file: Path of the JSON data file.
+        paths: List of statements paths.
+        fmt: Optional name of the format of every statement. If None, it is detected per file.
+
+    Returns:
+        Summary of each statement, and first date affected (None if there were no new transactions).
+    """
+    with Path(data_file).open(encoding="utf8") as input_fh:
+        data_content = json.load(input_fh)
+    importer = StatementImporter(data_content, hashes_path_of(data_file))
+    results = [importer.import_statement(path, fmt) for path in paths]
+    first_affected_date = importer.merge()
+    if first_affected_date:
+        with Path(data_file).open("w", encoding="utf8") as output_fh:
+            json.dump(data_content, output_fh, indent=4)
+        importer.save_hashes()
+    return results, first_affected_date
@@ -0,0 +1,104 @@
+"""Parser of OFX (Open Financial Exchange) investment statements."""
+import re
+from collections.abc import Iterator
+from pathlib import Path
+
+from hportfolio.importers.base import DEPOSIT, TRADE, WITHDRAWAL, StatementParser, Transaction, parse_date, parse_number, register_parser
+
+# Opening tag, closing tag or value of a SGML/XML OFX file
+TAG_PATTERN = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+# Size of the chunks read from file
+CHUNK_SIZE = 1 << 16
+# Aggregates of transactions
+TRADE_AGGREGATES = {"BUYSTOCK", "SELLSTOCK", "BUYMF", "SELLMF", "BUYOTHER", "SELLOTHER"}
+CASH_AGGREGATE = "INVBANKTRAN"
+
+
+def iter_tags(path: Path) -> Iterator[tuple[bool, str, str]]:
+    """Stream tags of an OFX file, reading it in chunks (OFX files may be a single huge line).
+
+    Args:
+        path: Path of the file.
+
+    Yields:
+        Tuples (closing, tag name, value).
+    """
+    with Path(path).open(encoding="utf8", errors="replace") as input_fh:
+        pending = ""
+        while True:
+            chunk = input_fh.read(CHUNK_SIZE)
+            pending += chunk
+            # Last tag could be incomplete, keep it for next chunk
+            cut = max(pending.rfind("<"), 0) if chunk else len(pending)
+            for match in TAG_PATTERN.finditer(pending, 0, cut):
+                yield match.group(1) == "/", match.group(2).upper(), match.group(3).strip()
+            pending = pending[cut:]
+            if not chunk:
+                return
+
+
+@register_parser
+class OfxStatementParser(StatementParser):
+    """Parser of OFX investment statements (buy/sell of stocks and funds, cash transfers).
+
+    Securities list (ticker of each CUSIP) comes after the transactions in OFX files, so files are streamed twice.
+    """
+
+    name = "ofx"
+
+    @classmethod
+    def can_parse(cls, path: Path, head: str) -> bool:
+        """Check extension or OFX header."""
+        return path.suffix.lower() in {".ofx", ".qfx"} or "OFXHEADER" in head or "<OFX>" in head
+
+    @staticmethod
+    def read_securities(path: Path) -> dict[str, str]:
+        """Get ticker of each security identifier of the securities list."""
+        securities = {}
+        unique_id = ""
+        for closing, tag, value in iter_tags(path):
+            if closing:
+                continue
+            if tag == "UNIQUEID":
+                unique_id = value
+            elif tag == "TICKER" and unique_id:
+                securities[unique_id] = value
+        return securities
+
+    def transactions(self, path: Path) -> Iterator[Transaction]:
+        """Stream transactions of an OFX statement."""
+        securities = self.read_securities(path)
+        fields: dict[str, str] = {}
+        aggregate = None
+        for closing, tag, value in iter_tags(path):
+            if tag in TRADE_AGGREGATES or tag == CASH_AGGREGATE:
+                if not closing:
+                    aggregate, fields = tag, {}
+                    continue
+                if aggregate == tag:
+                    transaction = self.build(aggregate, fields, securities, path)
+                    aggregate = None
+                    if transaction:
+                        yield transaction
+                continue
+            if aggregate and not closing and value:
+                # First value wins (i.e. UNITPRICE of the trade, not of a nested element)
+                fields.setdefault(tag, value)
+
+    def build(self, aggregate: str, fields: dict, securities: dict, path: Path) -> Transaction | None:
+        """Build a transaction from the fields of an aggregate."""
+        try:
+            date = parse_date((fields.get("DTTRADE") or fields.get("DTPOSTED", ""))[:8])
+            ref = fields.get("FITID", "")
+            if aggregate == CASH_AGGREGATE:
+                amount = parse_number(fields.get("TRNAMT", "0"))
+                return Transaction(date, DEPOSIT if amount >= 0 else WITHDRAWAL, amount=abs(amount), ref=ref)
+            ticker = securities.get(fields.get("UNIQUEID", ""), fields.get("UNIQUEID", ""))
+            qty = abs(parse_number(fields.get("UNITS", "0")))
+            if aggregate.startswith("SELL"):
+                qty = -qty
+            fees = parse_number(fields.get("COMMISSION", "0")) + parse_number(fields.get("FEES", "0"))
+            return Transaction(date, TRADE, ticker, qty, parse_number(fields.get("UNITPRICE", "0")), abs(fees), ref=ref)
+        except ValueError:
+            self.__class__.logger.exception(f"{path}: {aggregate} skipped")
+            return None
@@ -1,43 +1,65 @@
 """Classes related with main graphic interface."""
 import logging
 import sys
-from collections.abc import Callable
-from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING
 
+import numpy as np
 from PyQt5 import QtCore, QtGui, QtWidgets
-from PyQt5.QtChart import QChart, QChartView, QDateTimeAxis, QLineSeries, QValueAxis
-from PyQt5.QtCore import Qt, QThread
+from PyQt5.QtChart import QChart, QChartView, QDateTimeAxis, QLineSeries, QScatterSeries, QValueAxis
+from PyQt5.QtCore import QSortFilterProxyModel, Qt
 from PyQt5.QtGui import QKeyEvent, QPainter
-from PyQt5.QtWidgets import QLabel, QSizePolicy, QTableWidget, QTableWidgetItem
+from PyQt5.QtWidgets import QAbstractItemView, QHeaderView, QSizePolicy, QTabBar, QTableView, QTableWidget, QTableWidgetItem
 
+from hportfolio.alerts import AlertEngine, AlertEvent, log_sink
+from hportfolio.attribution import Attribution
 from hportfolio.crosshair import Crosshairs
 from hportfolio.gui import main_window
-from hportfolio.tickers_data import TickerObject, TickersData
+from hportfolio.period_changes import compute_period_changes
+from hportfolio.portfolio import PortfolioHistory
+from hportfolio.tickers_data import TickersData
+from hportfolio.watchlist import WatchlistModel
+from hportfolio.workers import TaskScheduler
+
+if TYPE_CHECKING:
+    from hportfolio.attribution_chart import AttributionChartView
+    from hportfolio.ticker_chart import TickerChartView
 
 # Constants definition
 BASEPATH = str(Path(__file__ + "/../").resolve())
 RES_PATH = BASEPATH + "/res"
 DATA_PATH = BASEPATH + "/data"
 ONE_DAY_IN_SECONDS = 86400
+# Zoomed ranges up to this span (days) are drawn with intraday prices too
+INTRADAY_MAX_DAYS = 10
+# Days of older history loaded at once when the chart shows dates before the loaded window
+HISTORY_PAGE_DAYS = 365
 
 class CustomChartView(QChartView):
     """Custom chart view for adding additional features like hotkeys and crosshair."""
 
-    def __init__(self, chart: QChart, tickers_data: TickersData):
+    def __init__(self, chart: QChart):
         """Constructor."""
         super().__init__(chart)
-        self.crosshair = Crosshairs(chart, self.scene(), tickers_data)
+        self.crosshair = Crosshairs(chart, self.scene())
 
     def mouseMoveEvent(self, event: QtGui.QMouseEvent) -> None:  # noqa: N802
         """Mouse move event override."""
         super().mouseMoveEvent(event)
-        self.crosshair.update_position(event.pos())
+        if self.crosshair.history is not None:
+            self.crosshair.update_position(event.pos())
 
     def keyPressEvent(self, event: QKeyEvent) -> None:  # noqa: N802
         """Hotkeys implementation."""
         if event.key() == ord("F"):
             self.chart().zoomReset()
+        elif event.key() == Qt.Key_Minus:
+            self.chart().zoomOut()
+        elif event.key() in (Qt.Key_Plus, Qt.Key_Equal):
+            self.chart().zoomIn()
+        elif event.key() in (Qt.Key_Left, Qt.Key_Right):
+            step = self.chart().plotArea().width() / 10
+            self.chart().scroll(-step if event.key() == Qt.Key_Left else step, 0)
 
         return super().keyPressEvent(event)
 
@@ -45,24 +67,38 @@ class CustomChartView(QChartView):
 class MainWindow(QtWidgets.QMainWindow, main_window.Ui_MainWindow):
     """Main app window class."""
 
-    def __init__(self, *args, **kwargs):
-        """Main Window Constructor."""
+    def __init__(self, *args, data_file: str = DATA_PATH + "/data.json", **kwargs):
+        """Main Window Constructor.
+
+        Only the skeleton of the window is built here, so it can be painted right away. Data (and the heavy modules
+        it needs) is loaded by load_data once the event loop starts.
+
+        Args:
+            *args: Arguments of QMainWindow.
+            data_file: String with path of JSON data file.
+            **kwargs: Keyword arguments of QMainWindow.
+        """
         QtWidgets.QMainWindow.__init__(self, *args, **kwargs)
         self.setupUi(self)
+        self.data_file = data_file
 
         # Connections
         self.plot_status_reload_BTN.clicked.connect(self.reload_stock_data)
         self.data_reload_BTN.clicked.connect(self.reload_stock_data)
 
-        # Tickers data
-        self.tickers_data = TickersData(DATA_PATH + "/data.json",self.update_gui)
+        # Background tasks (shared bounded thread pool)
+        self.scheduler = TaskScheduler(max_threads=2, parent=self)
+        self.scheduler.task_failed.connect(self.on_task_failed)
+
+        # Tickers data (loaded after first paint)
+        self.tickers_data: TickersData | None = None
 
         # Create QChart
         self.plot_chart = QChart()
         # self.plot_chart.setAnimationOptions(QChart.AllAnimations)
 
         # Create the plot widget and add it to the plot tab
-        self.chart_view = CustomChartView(self.plot_chart, self.tickers_data)
+        self.chart_view = CustomChartView(self.plot_chart)
         self.chart_view.setRenderHint(QPainter.Antialiasing)
         self.chart_view.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
 
@@ -78,8 +114,18 @@ class MainWindow(QtWidgets.QMainWindow, main_window.Ui_MainWindow):
         self.series_initial_investment.setPointLabelsFormat("@yPoint")
         self.series_portfolio_total = QLineSeries()
         self.series_portfolio_total.setPointsVisible(True)  # noqa: FBT003
+        # Days valued with stale prices (gaps in price data) are flagged instead of dropping to zero
+        self.series_missing_prices = QScatterSeries()
+        self.series_missing_prices.setMarkerShape(QScatterSeries.MarkerShapeRectangle)
+        self.series_missing_prices.setMarkerSize(7)
+        self.series_missing_prices.setColor(QtGui.QColor("#ff9900"))
+        # Intraday value of the portfolio, only drawn when zoomed into a few days
+        self.series_portfolio_intraday = QLineSeries()
+        self.series_portfolio_intraday.setColor(QtGui.QColor("#3b7dd8"))
         self.plot_chart.addSeries(self.series_initial_investment)
         self.plot_chart.addSeries(self.series_portfolio_total)
+        self.plot_chart.addSeries(self.series_portfolio_intraday)
+        self.plot_chart.addSeries(self.series_missing_prices)
 
         # X axis configuration
         self.axis_x = QDateTimeAxis()
@@ -104,49 +150,124 @@ class MainWindow(QtWidgets.QMainWindow, main_window.Ui_MainWindow):
         self.series_portfolio_total.attachAxis(self.axis_y)
         self.series_initial_investment.attachAxis(self.axis_x)
         self.series_initial_investment.attachAxis(self.axis_y)
+        self.series_missing_prices.attachAxis(self.axis_x)
+        self.series_missing_prices.attachAxis(self.axis_y)
+        self.series_portfolio_intraday.attachAxis(self.axis_x)
+        self.series_portfolio_intraday.attachAxis(self.axis_y)
 
         # Configure name of each series
         self.series_portfolio_total.setName("Portfolio")
         self.series_initial_investment.setName("Investment")
+        self.series_missing_prices.setName("Missing prices")
+        self.series_portfolio_intraday.setName("Intraday")
+        self.axis_x.rangeChanged.connect(self.on_plot_range_changed)
+
+        # Market overview (watchlist). The view only paints visible rows and reuses them while scrolling
+        self.watchlist_model = WatchlistModel(self)
+        self.watchlist_proxy = QSortFilterProxyModel(self)
+        self.watchlist_proxy.setSourceModel(self.watchlist_model)
+        self.watchlist_proxy.setSortRole(Qt.UserRole)
+        self.watchlist_view = QTableView()
+        self.watchlist_view.setModel(self.watchlist_proxy)
+        self.watchlist_view.setSortingEnabled(True)  # noqa: FBT003
+        self.watchlist_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.watchlist_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.watchlist_view.verticalHeader().hide()
+        self.watchlist_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.watchlist_view.verticalHeader().setDefaultSectionSize(18)
+        self.watchlist_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.watchlist_view.setMinimumHeight(120)
+        watchlist_font = QtGui.QFont()
+        watchlist_font.setPointSize(8)
+        self.watchlist_view.setFont(watchlist_font)
+        self.plot_status_stocks_container.addWidget(self.watchlist_view, 0, 0)
+
+        # Alerts defined in the "alerts" list of the data file
+        self.alert_rules = []
+        self.alert_engine = AlertEngine(self.alert_rules)
+        self.alert_engine.add_sink(log_sink)
+        self.alert_engine.add_sink(self.notify_alerts)
+
+        # P&L attribution tab (stacked contribution of each ticker). Its chart is built the first time it is shown
+        self.attribution: Attribution | None = None
+        self.attribution_view: AttributionChartView | None = None
+        self.attribution_tab = QtWidgets.QWidget()
+        QtWidgets.QVBoxLayout(self.attribution_tab).setContentsMargins(0, 0, 0, 0)
+        self.tabWidget.addTab(self.attribution_tab, "Attribution")
+        self.tabWidget.currentChanged.connect(self.on_tab_changed)
+
+        # Drill-down tabs (one per ticker), opened by double-clicking a row of the data table
+        self.portfolio_history: PortfolioHistory | None = None
+        self.ticker_tabs: dict[str, TickerChartView] = {}
+        self.data_TABLE.cellDoubleClicked.connect(self.open_ticker_tab)
+        self.tabWidget.setTabsClosable(True)  # noqa: FBT003
+        for index in range(self.tabWidget.count()):
+            self.tabWidget.tabBar().setTabButton(index, QTabBar.RightSide, None)
+        self.tabWidget.tabCloseRequested.connect(self.close_ticker_tab)
 
         # Initialize variables used for summary view
-        self.stock_labels = []
         self.current_money = 0
         self.initial_investment = 0
         self.pandl = 0
+        QtCore.QTimer.singleShot(0, self.load_data)
+
+    def load_data(self):
+        """Load data file and cached prices, draw them, and fetch new prices in background."""
+        self.tickers_data = TickersData(self.data_file, self.update_gui, fetch_prices=False)
+        self.alert_rules = self.tickers_data.data_content.get("alerts", [])
+        self.alert_engine.compile(self.alert_rules)
         self.load_line_chart(self.tickers_data)
+        self.tickers_data.load_current_portfolio(blocking=False, callback=self.update_gui, scheduler=self.scheduler)
+
+    def on_tab_changed(self, index: int):
+        """Build the attribution chart the first time its tab is shown."""
+        if self.tabWidget.widget(index) is not self.attribution_tab or self.attribution_view is not None:
+            return
+        from hportfolio.attribution_chart import AttributionChartView
+
+        self.attribution_view = AttributionChartView(self.attribution_tab)
+        self.attribution_tab.layout().addWidget(self.attribution_view)
+        if self.attribution is not None:
+            self.attribution_view.set_attribution(self.attribution)
 
     def reload_stock_table(self):
         """Reload table on Data tab of GUI."""
         self.data_TABLE.setRowCount(0)
         tickers_data: TickersData = self.tickers_data
-        historic_data = tickers_data.data_content["status"]
-        stocks_ = historic_data["last"]["stocks"]
+        history = self.portfolio_history
+        # Yesterday and today of every ticker, in a single query
+        state = history.at([tickers_data.yesterday(), tickers_data.today()])
+        pnl, pnl_percentage = state.pnl[1], state.pnl_percentage[1]
         total_sum = total_pandl = total_cost_basis = total_sum_yesterday = 0
-        for ticker, qty in stocks_.items():
+        for ticker, col in history.columns.items():
+            qty = state.holdings[1, col]
             if qty<=0:
                 continue
-            value_ = tickers_data.get_price(ticker, tickers_data.today())
-            value_yesterday = tickers_data.get_price(ticker, tickers_data.yesterday())
+            value_ = state.values[1, col] / qty
+            value_yesterday = value_ if np.isnan(state.prices[0, col]) else state.prices[0, col]
             daily_pandl = value_*qty-value_yesterday*qty
-            ticker_obj = TickerObject.get_ticker_object(ticker)
+            cost = state.cost[1, col]
             row_count = self.data_TABLE.rowCount()
             self.data_TABLE.insertRow(row_count)
-            self.data_TABLE.setItem(row_count, 0, QTableWidgetItem(f"{ticker} ({qty})"))
+            self.data_TABLE.setItem(row_count, 0, QTableWidgetItem(f"{ticker} ({qty:g})"))
             self.data_TABLE.setItem(row_count, 1, QTableWidgetItem(f"${value_:.2f}"))
             self.data_TABLE.setItem(row_count, 2, QTableWidgetItem(f"${value_*qty:.2f}"))
-            self.data_TABLE.setItem(row_count, 3, QTableWidgetItem(f"${ticker_obj.cost}"))
-            self.data_TABLE.setItem(row_count, 4, QTableWidgetItem(f"${ticker_obj.cost/ticker_obj.qty:.2f}"))
-            self.data_TABLE.setItem(row_count, 5, QTableWidgetItem(f"${ticker_obj.get_pandl():.1f}"))
-            self.data_TABLE.setItem(row_count, 6, QTableWidgetItem(f"{ticker_obj.get_pandl_percentage()}%"))
+            self.data_TABLE.setItem(row_count, 3, QTableWidgetItem(f"${cost:.2f}"))
+            self.data_TABLE.setItem(row_count, 4, QTableWidgetItem(f"${cost/qty:.2f}"))
+            self.data_TABLE.setItem(row_count, 5, QTableWidgetItem(f"${pnl[col]:.1f}"))
+            if cost <= 0:
+                logging.error(f"Error with Ticker {ticker}. Cost not valid (cost={cost})")
+                self.data_TABLE.setItem(row_count, 6, QTableWidgetItem(f"{cost}%"))
+            else:
+                self.data_TABLE.setItem(row_count, 6, QTableWidgetItem(f"{pnl_percentage[col]:.2f}%"))
             self.data_TABLE.setItem(row_count, 7, QTableWidgetItem(f"${daily_pandl:.1f}"))
             if ticker=="LIQUIDITY":
                     continue
             total_sum += qty*value_
             total_sum_yesterday += qty*value_yesterday
-            total_cost_basis += ticker_obj.cost
-            total_pandl += ticker_obj.get_pandl()
-            color = TickersData.get_price_color(ticker_obj.get_pandl())
+            total_cost_basis += cost
+            total_pandl += pnl[col]
+            color = TickersData.get_price_color(pnl[col])
             for column in range(self.data_TABLE.columnCount()-1):
                     self.data_TABLE.item(row_count, column).setBackground(QtGui.QColor(color))
             self.data_TABLE.item(row_count, 7).setBackground(QtGui.QColor(TickersData.get_price_color(daily_pandl)))
@@ -169,61 +290,152 @@ class MainWindow(QtWidgets.QMainWindow, main_window.Ui_MainWindow):
         self.data_TABLE.resizeColumnsToContents()
         self.data_TABLE.setSelectionBehavior(QTableWidget.SelectRows)
 
+    def open_ticker_tab(self, row: int, _column: int = 0):
+        """Open (or focus) the drill-down tab of the ticker of a data table row."""
+        item = self.data_TABLE.item(row, 0)
+        ticker = item.text().split(" (")[0] if item else ""
+        if self.portfolio_history is None or ticker == "LIQUIDITY" or ticker not in self.portfolio_history.columns:
+            return
+        view = self.ticker_tabs.get(ticker)
+        if view is None:
+            from hportfolio.ticker_chart import TickerChartView
+
+            view = TickerChartView(ticker, self.tabWidget)
+            view.set_history(self.portfolio_history)
+            self.ticker_tabs[ticker] = view
+            self.tabWidget.addTab(view, ticker)
+        self.tabWidget.setCurrentWidget(view)
+
+    def close_ticker_tab(self, index: int):
+        """Close a drill-down tab."""
+        view = self.tabWidget.widget(index)
+        if view in self.ticker_tabs.values():
+            self.tabWidget.removeTab(index)
+            del self.ticker_tabs[view.ticker]
+            view.deleteLater()
+
+    def update_attribution(self):
+        """Recompute P&L attribution and show it in its tab and in the crosshair of the historic chart."""
+        self.attribution = Attribution.from_history(self.portfolio_history)
+        if self.attribution_view is not None:
+            self.attribution_view.set_attribution(self.attribution)
+        self.chart_view.crosshair.attribution = self.attribution
+
+    def update_ticker_tabs(self):
+        """Refresh open drill-down tabs with the portfolio history just computed."""
+        for ticker, view in list(self.ticker_tabs.items()):
+            if ticker in self.portfolio_history.columns:
+                view.set_history(self.portfolio_history)
+            else:
+                self.close_ticker_tab(self.tabWidget.indexOf(view))
+
     def reload_stock_data(self):
         """Reload stock data in background (not blocking)."""
+        if self.tickers_data is None:
+            return
         self.tickers_data.reload_data_file()
-        self.tickers_data.load_current_portfolio(blocking=False,callback=self.update_gui)
+        self.tickers_data.load_current_portfolio(blocking=False,callback=self.update_gui,scheduler=self.scheduler)
+
+    def on_task_failed(self, key: str, message: str):
+        """Report a background task that failed."""
+        logging.error(f"Background task {key} failed: {message}")
+
+    def closeEvent(self, event: QtGui.QCloseEvent) -> None:  # noqa: N802
+        """Cancel background tasks before closing."""
+        self.scheduler.shutdown()
+        return super().closeEvent(event)
+
+    def on_plot_range_changed(self, min_date: QtCore.QDateTime, max_date: QtCore.QDateTime):
+        """Page in older history, or load intraday value of the portfolio when zoomed into a few days (in background)."""
+        if self.tickers_data is None:
+            return
+        window_start = QtCore.QDateTime(QtCore.QDate.fromString(self.tickers_data.window_start, "yyyy-MM-dd"))
+        if min_date < window_start and self.tickers_data.window_start > self.tickers_data.start_date:
+            start = min(min_date, window_start.addDays(-HISTORY_PAGE_DAYS)).toString("yyyy-MM-dd")
+            self.scheduler.submit(f"history:{start}", self.tickers_data.extend_window, start, group="history", callback=self.on_history_extended)
+        if self.portfolio_history is None or min_date.daysTo(max_date) > INTRADAY_MAX_DAYS:
+            self.series_portfolio_intraday.clear()
+            return
+        start = min_date.toUTC().toString("yyyy-MM-ddTHH:mm")
+        end = max_date.toUTC().toString("yyyy-MM-ddTHH:mm")
+        self.scheduler.submit(
+            f"intraday:{start}:{end}", self.load_intraday_value, self.portfolio_history, start, end, group="intraday", callback=self.plot_intraday_value,
+        )
+
+    def on_history_extended(self, extended: bool):
+        """Redraw once older history was loaded."""
+        if extended:
+            self.update_gui()
+
+    def load_intraday_value(self, history: PortfolioHistory, start: str, end: str) -> tuple[list[float], list[float]]:
+        """Get time (msecs since epoch) and intraday value of the portfolio in a range. Runs in background."""
+        tickers = [ticker for ticker in history.tickers if ticker != "LIQUIDITY"]
+        interval, prices_df = self.tickers_data.get_intraday_prices(tickers, start, end)
+        if interval == "1d" or prices_df.empty:
+            return [], []
+        times = prices_df.index.to_numpy(dtype="datetime64[ms]")
+        values = history.value_at(times, prices_df.to_numpy(dtype=float), list(prices_df.columns))
+        return times.astype(np.int64).astype(float).tolist(), values.tolist()
+
+    def plot_intraday_value(self, result: tuple[list[float], list[float]]):
+        """Draw intraday value of the portfolio."""
+        msecs, values = result
+        self.series_portfolio_intraday.replace([QtCore.QPointF(x, y) for x, y in zip(msecs, values, strict=True)])
 
     def update_gui(self):
         """Update GUI once all the data was obtained from yFinance and files."""
-        TickerObject.reset_all()
-        self.plot_historic_portfolio(self.tickers_data)
-        self.update_headers_stock_info(self.tickers_data)
-        self.reload_stock_table()
+        # Same prices for the whole redraw, even if a background refresh publishes new ones meanwhile
+        with self.tickers_data.pinned_snapshot():
+            self.portfolio_history = self.tickers_data.get_portfolio_history()
+            self.plot_historic_portfolio()
+            self.update_headers_stock_info(self.tickers_data)
+            self.reload_stock_table()
+        self.update_attribution()
+        self.update_ticker_tabs()
 
     def load_line_chart(self, tickers_data: TickersData):
         """Loads line chart."""
         if tickers_data:
             self.plot_initial_investment(tickers_data.data_content["operations"]["deposit"])
             self.plot_status_iinvest_LBL.setText(f"Initial investment: ${tickers_data.total_invested}")
-            self.plot_historic_portfolio(tickers_data)
-            self.update_headers_stock_info(tickers_data)
+            with tickers_data.pinned_snapshot():
+                self.portfolio_history = tickers_data.get_portfolio_history()
+                self.plot_historic_portfolio()
+                self.update_headers_stock_info(tickers_data)
+            self.update_attribution()
 
     def update_headers_stock_info(self, tickers_data: TickersData):
         """Loads stock data."""
         current_portfolio = tickers_data.current_portfolio
-        for my_lbl in self.stock_labels:
-            self.plot_status_stocks_container.removeWidget(my_lbl)
-            my_lbl.deleteLater()
-            my_lbl = None  # noqa: PLW2901
-        self.stock_labels = []
-
-        cnt = 0
-        for ticker in current_portfolio:
-            lbl = QLabel()
-            my_font = QtGui.QFont()
-            my_font.setPointSize(8)
-            lbl.setFont(my_font)
-            lbl.setObjectName(f"plot_stock_lbl_{ticker}")
-            self.plot_status_stocks_container.addWidget(lbl, int(cnt / 5), cnt % 5)
-            self.stock_labels.append(lbl)
-            past_ticker_price = tickers_data.get_price(ticker, tickers_data.yesterday())
-            current_ticker_price = tickers_data.get_price(ticker, tickers_data.today())
-            ticker_increase_percentage = round(((current_ticker_price - past_ticker_price) / past_ticker_price) * 100, 2)
-            if ticker_increase_percentage > 0:
-                str_modif = "+"
-                color_modif = "0ec43e"
-            elif ticker_increase_percentage < 0:
-                str_modif = ""
-                color_modif = "de0700"
-            else:
-                str_modif = ""
-                color_modif = "000000"
-            lbl.setText(f"<p style='color:#{color_modif}'>{ticker}({current_portfolio[ticker]['qty']}): ${round(current_ticker_price,1)} ({str_modif}{ticker_increase_percentage}%)</p>")
-            cnt += 1
+        tickers = tickers_data.get_watchlist_tickers()
+        last_prices, changes = compute_period_changes(tickers_data.price_matrix, tickers, tickers_data.today())
+        qty = np.array([current_portfolio.get(ticker, {}).get("qty", 0) for ticker in tickers], dtype=float)
+        self.watchlist_model.update(tickers, np.column_stack([qty, last_prices, changes]))
+        self.evaluate_alerts(tickers, last_prices, changes[:, 0])
         self.plot_status_total_LBL.setText(f"Total: ${int(tickers_data.current_portfolio_value)}")
         self.plot_status_pl_LBL.setText(f"P&L: ${int(tickers_data.pandl)} ({tickers_data.pandl_percentage}%)")
 
+    def evaluate_alerts(self, tickers: list[str], last_prices: np.ndarray, daily_changes: np.ndarray):
+        """Feed last prices to the alerts engine. Only rules of tickers whose values changed are evaluated."""
+        rules = self.tickers_data.data_content.get("alerts", [])
+        if rules != self.alert_rules:
+            self.alert_rules = rules
+            self.alert_engine.compile(rules)
+        history = self.portfolio_history
+        state = history.at(history.dates[-1:])
+        cols = np.array([history.columns.get(ticker, -1) for ticker in tickers], dtype=np.intp)
+        held = np.flatnonzero(cols >= 0)
+        qty, cost = state.holdings[0, cols[held]], state.cost[0, cols[held]]
+        unit_cost = np.full(len(tickers), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            unit_cost[held] = np.where(qty > 0, cost / qty, np.nan)
+        self.alert_engine.on_prices(tickers, last_prices, daily_changes, unit_cost, pnl=self.tickers_data.pandl)
+
+    def notify_alerts(self, events: list[AlertEvent]):
+        """Show fired alerts in the status bar and request user attention."""
+        self.statusBar().showMessage("Alert: " + " | ".join(str(event) for event in events))
+        QtWidgets.QApplication.alert(self)
+
     def plot_initial_investment(self, deposits_dict: dict):
         """Load initial investment data."""
         min_ = 1e20
@@ -240,65 +452,30 @@ class MainWindow(QtWidgets.QMainWindow, main_window.Ui_MainWindow):
             self.series_initial_investment.append(qdate.toMSecsSinceEpoch(), accum)
         qcurrent_date = QtCore.QDateTime(QtCore.QDate().currentDate())
         self.series_initial_investment.append(qcurrent_date.toMSecsSinceEpoch(), accum)
-        self.axis_x.setRange(min_date, qcurrent_date)
+        # Only the loaded window is shown at startup. Zooming out or scrolling back loads older history
+        window_start = QtCore.QDateTime(QtCore.QDate.fromString(self.tickers_data.window_start, "yyyy-MM-dd"))
+        self.axis_x.setRange(max(min_date, window_start), qcurrent_date)
         self.axis_y.setRange(0, accum * 1.10)
 
-    def plot_historic_portfolio(self, tickers_data: TickersData):
-        """Line plot of historical value of portfolio over time."""
-        self.series_portfolio_total.clear()
-        historic_data = tickers_data.data_content["status"]
-        for date_in_seconds in range(tickers_data.start_date_int(), tickers_data.today_int() + ONE_DAY_IN_SECONDS, ONE_DAY_IN_SECONDS):
-            date_ = datetime.fromtimestamp(date_in_seconds).strftime("%Y-%m-%d")
-            position_changed = False
-            if date_ in historic_data or date_ == tickers_data.today():
-                stocks_ = historic_data["last"]["stocks"] if date_ == tickers_data.today() else historic_data[date_]["stocks"]
-                position_changed = True
-            tickers_data.get_tickers_value(stocks_.keys())
-            total_value = 0
-            for ticker, qty in stocks_.items():
-                value_ = tickers_data.get_price(ticker, date_)
-                if position_changed:
-                    ticker_obj = TickerObject.get_ticker_object(ticker)
-                    ret_stat = ticker_obj.update_qty(qty, value_)  # noqa: F841
-                total_value += value_ * qty
-            q_date = QtCore.QDate.fromString(date_, "yyyy-MM-dd")
-            qdate = QtCore.QDateTime(q_date)
-            self.series_portfolio_total.append(qdate.toMSecsSinceEpoch(), total_value)
+    def plot_historic_portfolio(self):
+        """Line plot of historical value of portfolio over time (whole loaded window in a single batch)."""
+        history = self.portfolio_history
+        self.chart_view.crosshair.history = history
+        # Local midnight of each date. Days are not all 24 hours long across DST changes, so they are not evenly spaced.
+        msecs = np.array([QtCore.QDateTime(QtCore.QDate.fromString(date, "yyyy-MM-dd")).toMSecsSinceEpoch() for date in history.dates.astype(str).tolist()], dtype=np.float64)
+        self.series_portfolio_total.replace([QtCore.QPointF(x, y) for x, y in zip(msecs.tolist(), history.total.tolist(), strict=True)])
 
-        if len(tickers_data.data_content["force_cost_basis"]) > 1:
-            force_vals = tickers_data.data_content["force_cost_basis"]
-            for ticker in historic_data["last"]["stocks"]:
-                if ticker == "LIQUIDITY":
-                    continue
-                ticker_obj = TickerObject.get_ticker_object(ticker)
-                if ticker in force_vals:
-                    ticker_obj.cost = force_vals[ticker][1]
-
-        for ticker in TickerObject.tickers_index:
-            ticker_obj = TickerObject.get_ticker_object(ticker)
-            ticker_obj.value = ticker_obj.qty * tickers_data.get_price(ticker, tickers_data.today())
-            if ticker_obj.qty > 0:
-                logging.info(f"-{ticker_obj.name}({ticker_obj.qty}) cost: {ticker_obj.cost:.2f}, {ticker_obj.value:.2f} (${ticker_obj.get_pandl():.2f} / {ticker_obj.get_pandl_percentage()}%)")
-
-    def launch_worker(self, name: str, worker: Callable, finish_cb: Callable, progress_cb: Callable | None, *args, **kwargs):  # noqa: ANN002, ANN003
-        """Generic function to launch a worker."""
-        if name not in self.threads_dict or (self.threads_dict[name] and not self.threads_dict[name].isRunning()):
-            qthread_ = QThread()
-            qworker_ = worker(*args, **kwargs)
-            qworker_.moveToThread(qthread_)
-            qthread_.started.connect(worker.run_function)
-            if progress_cb:
-                qworker_.progress.connect(progress_cb)
-            qworker_.finished.connect(finish_cb)
-            qworker_.finished.connect(qthread_.quit)
-            qworker_.finished.connect(qworker_.deleteLater)
-            self.threads_dict[name] = qthread_
-            self.workers_dict[name] = qworker_
-            qthread_.start()
+        # Flag days where some position had no recent price (valued at its last known price)
+        rows = history.flagged_rows
+        self.series_missing_prices.replace([QtCore.QPointF(x, y) for x, y in zip(msecs[rows].tolist(), history.total[rows].tolist(), strict=True)])
+
+        for position in history.positions():
+            if position["ticker"] != "LIQUIDITY":
+                logging.info(f"-{position['ticker']}({position['qty']:g}) cost: {position['cost']:.2f}, {position['value']:.2f} (${position['pnl']:.2f} / {position['pnl_percentage'] or 0:.2f}%)")
 
 
 def launch_gui():
-    """Launches GUI."""
+    """Launches GUI. The window skeleton is shown before data (and pandas, yfinance) is loaded."""
     app = QtWidgets.QApplication([])
     window = MainWindow()
     window.show()
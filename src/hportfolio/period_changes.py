@@ -0,0 +1,58 @@
+"""Day, week, month and YTD changes of many tickers at once (no GUI dependencies)."""
+import numpy as np
+
+from hportfolio.price_store import PriceMatrix
+
+# Periods of the change columns and their length in days (YTD is computed from last close of previous year)
+PERIODS = ("Day", "Week", "Month", "YTD")
+WEEK_DAYS = 7
+MONTH_DAYS = 30
+# Extra days read before the oldest reference date, to find a close when it falls on a weekend or holiday
+LOOKBACK_DAYS = 7
+
+
+def compute_period_changes(prices: PriceMatrix, tickers: list[str], asof: str) -> tuple[np.ndarray, np.ndarray]:
+    """Compute last price and day/week/month/YTD change of all tickers in a single pass over the price matrix.
+
+    Args:
+        prices: Price matrix with one column per ticker.
+        tickers: List with name of the tickers. Tickers without prices get NaN values.
+        asof: String with date of the overview, in format YYYY-MM-DD.
+
+    Returns:
+        Array with last price of each ticker, and (tickers x periods) array of changes in percentage.
+    """
+    n_tickers = len(tickers)
+    last = np.full(n_tickers, np.nan)
+    changes = np.full((n_tickers, len(PERIODS)), np.nan)
+    if prices.last_day < 0 or not n_tickers:
+        return last, changes
+    asof_row = min(int(prices.day_index(asof)), prices.last_day)
+    ytd_row = int(prices.day_index(f"{asof[:4]}-01-01")) - 1
+    first_row = max(0, min(ytd_row, asof_row - MONTH_DAYS) - LOOKBACK_DAYS)
+    if asof_row < first_row:
+        return last, changes
+
+    cols = np.array([prices.columns.get(ticker, -1) for ticker in tickers], dtype=np.intp)
+    window = prices.data[first_row:asof_row + 1, np.maximum(cols, 0)] if prices.tickers else np.full((asof_row + 1 - first_row, n_tickers), np.nan)
+    window[:, cols < 0] = np.nan
+    # Row of last valid price at or before each row, per ticker (-1 if none)
+    n_rows = window.shape[0]
+    last_valid = np.where(np.isnan(window), -1, np.arange(n_rows)[:, None])
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+
+    columns = np.arange(n_tickers)
+    last_idx = last_valid[-1]
+    # Previous trading day is the last valid row before the last valid one
+    prev_idx = np.where(last_idx > 0, last_valid[np.maximum(last_idx - 1, 0), columns], -1)
+    ref_idx = np.full((len(PERIODS), n_tickers), -1)
+    ref_idx[0] = prev_idx
+    for i, row in enumerate((asof_row - WEEK_DAYS, asof_row - MONTH_DAYS, ytd_row), start=1):
+        if row >= first_row:
+            ref_idx[i] = last_valid[row - first_row]
+
+    last = np.where(last_idx >= 0, window[np.maximum(last_idx, 0), columns], np.nan)
+    ref = np.where(ref_idx >= 0, window[np.maximum(ref_idx, 0), columns], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        changes = ((last / ref - 1) * 100).T
+    return last, changes
@@ -0,0 +1,393 @@
+"""Vectorized valuation of the portfolio over time (no GUI dependencies)."""
+import copy
+from dataclasses import dataclass
+
+import numpy as np
+
+from hportfolio.corporate_actions import split_factors
+from hportfolio.price_store import PRICE_LOOKBACK_DAYS, PriceMatrix
+
+# Most brokers charge $1 per transaction
+TRANSACTION_FEE = 1
+# Arrays of PortfolioHistory with one row per day
+DAILY_ATTRIBUTES = ("holdings", "prices", "values", "missing", "total", "invested", "cost_history", "dividends", "accrued_dividends")
+
+
+def forward_fill(values: np.ndarray, limit: int | None = None) -> np.ndarray:
+    """Forward fill NaN values along first axis.
+
+    Args:
+        values: 2D array (rows x columns).
+        limit: Optional maximum number of rows a value is propagated.
+
+    Returns:
+        A new array with NaN replaced by previous valid value of the same column.
+    """
+    n_rows = values.shape[0]
+    rows = np.arange(n_rows)[:, None]
+    last_valid = np.where(np.isnan(values), -1, rows)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    filled = np.take_along_axis(values, np.maximum(last_valid, 0), axis=0)
+    stale = last_valid < 0
+    if limit is not None:
+        stale |= rows - last_valid > limit
+    filled[stale] = np.nan
+    return filled
+
+
+@dataclass
+class PortfolioState:
+    """State of the portfolio at some dates, one row per date (see PortfolioHistory.at).
+
+    Attributes:
+        dates: Array of dates (datetime64[D]).
+        tickers: List with name of the tickers (columns).
+        holdings: Array (dates x tickers) with quantity held.
+        prices: Array (dates x tickers) with price (NaN if not available).
+        values: Array (dates x tickers) with value of each position.
+        cost: Array (dates x tickers) with cost basis of each position. LIQUIDITY costs its own value.
+        total: Array with total value of the portfolio.
+        invested: Array with cash deposited up to each date.
+    """
+
+    dates: np.ndarray
+    tickers: list[str]
+    holdings: np.ndarray
+    prices: np.ndarray
+    values: np.ndarray
+    cost: np.ndarray
+    total: np.ndarray
+    invested: np.ndarray
+
+    @property
+    def pnl(self) -> np.ndarray:
+        """Array (dates x tickers) with P&L of each position (0 if not held)."""
+        return np.where(self.holdings != 0, self.values - self.cost, 0)
+
+    @property
+    def pnl_percentage(self) -> np.ndarray:
+        """Array (dates x tickers) with P&L of each position in percentage of its cost (NaN if cost is not positive)."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.cost > 0, self.pnl / self.cost * 100, np.nan)
+
+    @property
+    def total_pnl(self) -> np.ndarray:
+        """Array with P&L of the whole portfolio (value minus invested cash)."""
+        return self.total - self.invested
+
+
+class PortfolioHistory:
+    """Holdings, prices and value of every ticker for every day, computed in a single vectorized pass.
+
+    Attributes:
+        dates: Array with one date (datetime64[D]) per day, from start to end.
+        tickers: List with name of every ticker that appears in the status snapshots (LIQUIDITY included).
+        holdings: Array (dates x tickers) with quantity held each day, in units of the (split adjusted) prices.
+        prices: Array (dates x tickers) with price of each day (NaN if not available).
+        values: Array (dates x tickers) with value of each position. Positions without a recent price are valued at
+            their last known price (0 if there is none). LIQUIDITY includes the dividends accrued.
+        missing: Array (dates x tickers) with True for held positions without a recent price (flagged in charts).
+        total: Array with total value of the portfolio each day.
+        invested: Array with cash deposited up to each day.
+        cost: Array with cost basis of each ticker at end date.
+        cost_history: Array (dates x tickers) with cost basis of each ticker each day.
+        trade_deltas: Array (change rows x tickers) with quantity bought (> 0) or sold (< 0) at each change row.
+        dated_rows: Array with rows of the dated snapshots (i.e. change rows except the "last" one).
+        opening: Array with quantity of each ticker held before start (snapshots older than start).
+        opening_cost: Array with cost basis of the opening quantities, from prices of the days they were traded.
+        dividends: Array (dates x tickers) with dividends paid on each ex-date, for the quantity held the day before.
+        accrued_dividends: Array with dividends paid since the last dated snapshot (which already records the
+            previous ones in LIQUIDITY).
+    """
+
+    def __init__(self, data_content: dict, prices: PriceMatrix, start: str, end: str, splits: PriceMatrix | None = None, dividends: PriceMatrix | None = None):  # noqa: PLR0913
+        """Constructor.
+
+        Args:
+            data_content: Portfolio data (content of data file).
+            prices: Price matrix (base currency) of the tickers, adjusted for splits.
+            start: String with first date, in format YYYY-MM-DD.
+            end: String with last date (today), in format YYYY-MM-DD. Positions at end are the "last" ones.
+            splits: Optional matrix with the ratio of each split at its ex-date. Quantities of the data file (shares
+                actually held at each date) are converted to units of the split adjusted prices.
+            dividends: Optional matrix with the dividend per share (base currency, split adjusted) at each ex-date.
+        """
+        self.start = np.datetime64(start, "D")
+        self.dates = np.arange(self.start, np.datetime64(end, "D") + 1)
+        n_days = len(self.dates)
+        status = data_content["status"]
+        snapshot_dates = sorted(date for date in status if date != "last")
+        self.tickers = list(dict.fromkeys(ticker for date in [*snapshot_dates, "last"] for ticker in status[date]["stocks"]))
+        self.columns = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+        # Quantities of each snapshot times the splits after it, so a split does not look like a trade
+        factors = np.ones((len(snapshot_dates) + 1, len(self.tickers)))
+        if splits is not None:
+            factors = split_factors(splits, self.tickers, [*snapshot_dates, end])
+
+        # Holdings: each snapshot applies from its date (or start, if earlier) until next one, "last" applies at end
+        holdings = np.full((n_days, len(self.tickers)), np.nan)
+        self.change_rows = []
+        dated_rows = []
+        for i, date in enumerate([*snapshot_dates, "last"]):
+            row = n_days - 1 if date == "last" else max(0, self.row_of(date))
+            if row >= n_days:
+                continue
+            holdings[row] = 0
+            for ticker, qty in status[date]["stocks"].items():
+                holdings[row, self.columns[ticker]] = qty * factors[i, self.columns[ticker]]
+            self.change_rows.append(row)
+            if date != "last":
+                dated_rows.append(row)
+        self.change_rows = np.unique(self.change_rows)
+        self.dated_rows = np.unique(dated_rows)
+        self.holdings = np.nan_to_num(forward_fill(holdings))
+
+        # Snapshots older than start only set the opening position and its cost (prices of those days only)
+        self.opening = np.zeros(len(self.tickers))
+        self.opening_cost = np.zeros(len(self.tickers))
+        earlier = [date for date in snapshot_dates if date < start]
+        if earlier:
+            earlier_holdings = np.zeros((len(earlier), len(self.tickers)))
+            for i, date in enumerate(earlier):
+                for ticker, qty in status[date]["stocks"].items():
+                    earlier_holdings[i, self.columns[ticker]] = qty
+            # Earlier snapshots are the first ones (dates are sorted)
+            earlier_holdings *= factors[:len(earlier)]
+            deltas = np.diff(earlier_holdings, axis=0, prepend=0)
+            trade_prices = np.nan_to_num(self._prices_at(prices, earlier))
+            self.opening = earlier_holdings[-1]
+            self.opening_cost = (deltas * trade_prices + (deltas != 0) * TRANSACTION_FEE).sum(axis=0)
+
+        # Prices: same lookback as single price lookups (weekends and holidays)
+        raw_prices = self._daily(prices)
+        if "LIQUIDITY" in self.columns:
+            raw_prices[:, self.columns["LIQUIDITY"]] = 1
+        self.prices = forward_fill(raw_prices, limit=PRICE_LOOKBACK_DAYS)
+        self.missing = np.isnan(self.prices) & (self.holdings != 0)
+        valuation_prices = np.where(self.missing, forward_fill(raw_prices), self.prices) if self.missing.any() else self.prices
+        self.values = self.holdings * np.nan_to_num(valuation_prices)
+
+        # Dividends are cash from their ex-date until the next dated snapshot, which records them in LIQUIDITY
+        held = np.vstack([self.opening[None], self.holdings[:-1]])
+        self.dividends = held * np.nan_to_num(self._daily(dividends)) if dividends is not None else np.zeros_like(self.holdings)
+        received = np.cumsum(self.dividends.sum(axis=1))
+        last_dated = np.full(n_days, -1)
+        last_dated[dated_rows] = dated_rows
+        np.maximum.accumulate(last_dated, out=last_dated)
+        self.accrued_dividends = received - np.where(last_dated >= 0, received[np.maximum(last_dated, 0)], 0)
+        if "LIQUIDITY" in self.columns:
+            self.values[:, self.columns["LIQUIDITY"]] += self.accrued_dividends
+            self.total = self.values.sum(axis=1)
+        else:
+            self.total = self.values.sum(axis=1) + self.accrued_dividends
+
+        deposits = data_content["operations"]["deposit"]
+        deposit_rows = np.array([self.row_of(date) for date in deposits], dtype=np.int64)
+        deposit_amounts = np.array(list(deposits.values()), dtype=float)
+        self.invested = self._cumulative(deposit_rows, deposit_amounts)
+
+        self.trade_deltas = np.diff(self.holdings[self.change_rows], axis=0, prepend=self.opening[None])
+        self.cost_history = self._cost_history()
+        self.cost = self._cost_basis(data_content.get("force_cost_basis", {}))
+
+    def recompute_from(self, data_content: dict, prices: PriceMatrix, from_date: str, splits: PriceMatrix | None = None, dividends: PriceMatrix | None = None) -> "PortfolioHistory":  # noqa: PLR0913
+        """Get the history of changed data, reusing the rows of this one before the first changed date.
+
+        Only rows from from_date on are computed again (i.e. after a statement import). Data before from_date (snapshots,
+        deposits and prices) must be the same this history was computed from.
+
+        Args:
+            data_content: Changed portfolio data.
+            prices: Same price matrix this history was computed from.
+            from_date: String with first date whose snapshots or deposits changed, in format YYYY-MM-DD.
+            splits: Same split ratios this history was computed from.
+            dividends: Same dividends this history was computed from.
+
+        Returns:
+            A new history, for the same range of dates.
+        """
+        start, end = str(self.start), str(self.dates[-1])
+        row = min(self.row_of(from_date), len(self.dates) - 1)
+        # Recompute starts at a snapshot, where accrued dividends are reset, and early enough to carry prices of the
+        # days before the first changed row (weekends and holidays)
+        candidates = self.dated_rows[self.dated_rows <= row - PRICE_LOOKBACK_DAYS]
+        first_row = int(candidates[-1]) if candidates.size else 0
+        if first_row <= 0:
+            return PortfolioHistory(data_content, prices, start, end, splits, dividends)
+        recent = PortfolioHistory(data_content, prices, str(self.dates[first_row]), end, splits, dividends)
+        if recent.tickers != self.tickers:
+            return PortfolioHistory(data_content, prices, start, end, splits, dividends)
+        skipped = row - first_row
+        history = copy.copy(recent)
+        history.start, history.dates = self.start, self.dates
+        history.opening, history.opening_cost = self.opening, self.opening_cost
+        for name in DAILY_ATTRIBUTES:
+            setattr(history, name, np.concatenate([getattr(self, name)[:row], getattr(recent, name)[skipped:]]))
+        kept, recomputed = self.change_rows < row, recent.change_rows >= skipped
+        history.change_rows = np.concatenate([self.change_rows[kept], recent.change_rows[recomputed] + first_row])
+        history.trade_deltas = np.concatenate([self.trade_deltas[kept], recent.trade_deltas[recomputed]])
+        history.dated_rows = np.concatenate([self.dated_rows[self.dated_rows < row], recent.dated_rows[recent.dated_rows >= skipped] + first_row])
+        return history
+
+    @property
+    def flagged_rows(self) -> np.ndarray:
+        """Rows where the value of the portfolio is not reliable (some position has no recent price)."""
+        return np.flatnonzero(self.missing.any(axis=1))
+
+    def row_of(self, date: str) -> int:
+        """Get row of a date (can be out of bounds)."""
+        return int((np.datetime64(date, "D") - self.start).astype(np.int64))
+
+    def rows_of(self, dates) -> np.ndarray:
+        """Get row of each date, clipped to the history bounds."""
+        rows = (np.asarray(dates, dtype="datetime64[D]") - self.start).astype(np.int64)
+        return np.clip(rows, 0, len(self.dates) - 1)
+
+    def _daily(self, matrix: PriceMatrix) -> np.ndarray:
+        """Value of a matrix (i.e. prices) for every day and ticker (NaN if not available)."""
+        daily = np.full((len(self.dates), len(self.tickers)), np.nan)
+        rows = matrix.day_index(self.dates)
+        in_matrix = (rows >= 0) & (rows <= matrix.last_day)
+        cols = np.array([matrix.columns.get(ticker, -1) for ticker in self.tickers], dtype=np.intp)
+        known = np.flatnonzero(cols >= 0)
+        daily[np.ix_(np.flatnonzero(in_matrix), known)] = matrix.data[np.ix_(rows[in_matrix], cols[known])]
+        return daily
+
+    def _cumulative(self, rows: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+        """Cumulative sum per day of amounts placed at rows (rows before start count from the first day)."""
+        daily = np.zeros(len(self.dates))
+        valid = rows < len(self.dates)
+        np.add.at(daily, np.maximum(rows[valid], 0), amounts[valid])
+        return np.cumsum(daily)
+
+    def _cost_history(self) -> np.ndarray:
+        """Cost basis of each ticker each day: each change of quantity adds its value at that day's price, plus a fee."""
+        deltas = self.trade_deltas
+        daily = np.zeros_like(self.holdings)
+        daily[self.change_rows] = deltas * np.nan_to_num(self.prices[self.change_rows]) + (deltas != 0) * TRANSACTION_FEE
+        return np.cumsum(daily, axis=0) + self.opening_cost
+
+    def _prices_at(self, prices: PriceMatrix, dates: list[str]) -> np.ndarray:
+        """Price of every ticker at some dates, or the last one in the previous lookback days.
+
+        Args:
+            prices: Price matrix (base currency) of the tickers.
+            dates: List of dates, in format YYYY-MM-DD.
+
+        Returns:
+            Array (dates x tickers) of prices (NaN if not available).
+        """
+        found = np.full((len(dates), len(self.tickers)), np.nan)
+        if "LIQUIDITY" in self.columns:
+            found[:, self.columns["LIQUIDITY"]] = 1
+        cols = np.array([prices.columns.get(ticker, -1) for ticker in self.tickers], dtype=np.intp)
+        known = np.flatnonzero(cols >= 0)
+        rows = prices.day_index(np.array(dates, dtype="datetime64[D]"))
+        for offset in range(PRICE_LOOKBACK_DAYS + 1):
+            lookup_rows = rows - offset
+            in_matrix = np.flatnonzero((lookup_rows >= 0) & (lookup_rows <= prices.last_day))
+            block = np.ix_(in_matrix, known)
+            found[block] = np.where(np.isnan(found[block]), prices.data[np.ix_(lookup_rows[in_matrix], cols[known])], found[block])
+        return found
+
+    def _cost_basis(self, force_cost_basis: dict) -> np.ndarray:
+        """Cost basis of each ticker at end date (forced values of data file override computed ones)."""
+        cost = self.cost_history[-1].copy()
+        if len(force_cost_basis) > 1:
+            for ticker, (_qty, forced_cost) in force_cost_basis.items():
+                if ticker in self.columns and ticker != "LIQUIDITY":
+                    cost[self.columns[ticker]] = forced_cost
+        return cost
+
+    def trades(self, ticker: str) -> tuple[np.ndarray, np.ndarray]:
+        """Get rows where quantity of a ticker changed, and quantity bought (> 0) or sold (< 0) in each one."""
+        deltas = self.trade_deltas[:, self.columns[ticker]]
+        traded = deltas != 0
+        return self.change_rows[traded], deltas[traded]
+
+    def at(self, dates) -> PortfolioState:
+        """Get the state of the portfolio at many dates in a single vectorized pass (no per-date Python work).
+
+        Args:
+            dates: A date string, or a sequence (or datetime64 array) of dates. Dates out of the history are clipped to
+                its first or last day.
+
+        Returns:
+            Holdings, prices, values, cost basis, total value and invested cash at each date.
+        """
+        rows = self.rows_of(np.atleast_1d(np.asarray(dates, dtype="datetime64[D]")))
+        cost = self.cost_history[rows]
+        # Forced cost basis of the data file only applies to current positions
+        cost[rows == len(self.dates) - 1] = self.cost
+        values = self.values[rows]
+        if "LIQUIDITY" in self.columns:
+            cost[:, self.columns["LIQUIDITY"]] = values[:, self.columns["LIQUIDITY"]]
+        return PortfolioState(self.dates[rows], self.tickers, self.holdings[rows], self.prices[rows], values, cost, self.total[rows], self.invested[rows])
+
+    def positions(self) -> list[dict]:
+        """Current positions (quantity > 0) with value, cost basis and P&L."""
+        state = self.at(self.dates[-1:])
+        pnl, pnl_percentage = state.pnl[0], state.pnl_percentage[0]
+        positions = []
+        for ticker, col in self.columns.items():
+            qty = state.holdings[0, col]
+            if qty <= 0:
+                continue
+            cost = state.cost[0, col]
+            positions.append({
+                "ticker": ticker,
+                "qty": qty,
+                "price": state.prices[0, col],
+                "value": state.values[0, col],
+                "cost": cost,
+                "pnl": pnl[col],
+                "pnl_percentage": pnl_percentage[col] if cost > 0 else None,
+            })
+        return positions
+
+    def value_at(self, times: np.ndarray, prices: np.ndarray, tickers: list[str]) -> np.ndarray:
+        """Value of the portfolio at intraday times, holding the quantities of each day.
+
+        Bars without price carry the last bar before them. Tickers without any bar yet are valued at the daily price.
+
+        Args:
+            times: Array of times (datetime64), sorted.
+            prices: Array (times x tickers) of prices in base currency.
+            tickers: List with name of the tickers (columns of prices).
+
+        Returns:
+            Array with the value of the portfolio at each time.
+        """
+        rows = self.rows_of(np.asarray(times).astype("datetime64[D]"))
+        cols = np.array([self.columns.get(ticker, -1) for ticker in tickers], dtype=np.intp)
+        known = cols >= 0
+        bars = forward_fill(np.asarray(prices, dtype=float)[:, known])
+        # Value of the day, with the positions that have a bar revalued at it
+        values = self.values[np.ix_(rows, cols[known])]
+        revalued = np.where(np.isnan(bars), values, self.holdings[np.ix_(rows, cols[known])] * bars)
+        return self.total[rows] + (revalued - values).sum(axis=1)
+
+    def resample(self, start: str | None = None, end: str | None = None, resolution: str = "D") -> np.ndarray:
+        """Get rows of a date range at a resolution.
+
+        Args:
+            start: Optional first date, in format YYYY-MM-DD.
+            end: Optional last date, in format YYYY-MM-DD.
+            resolution: "D" (every day), "W" (last day of each week) or "M" (last day of each month).
+
+        Returns:
+            Array with selected rows.
+        """
+        first = self.rows_of(start) if start else 0
+        last = self.rows_of(end) if end else len(self.dates) - 1
+        rows = np.arange(first, last + 1)
+        if resolution == "D" or rows.size == 0:
+            return rows
+        dates = self.dates[rows]
+        if resolution == "W":
+            # Numpy weeks start on Thursday (1970-01-01), shift them so they start on Monday
+            dates = dates - np.timedelta64(4, "D")
+        periods = dates.astype(f"datetime64[{resolution}]")
+        keep = np.append(periods[1:] != periods[:-1], True)
+        return rows[keep]
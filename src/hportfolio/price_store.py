@@ -0,0 +1,418 @@
+"""Columnar storage of daily and intraday prices."""
+from __future__ import annotations
+
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+# Days reserved after the last written date, so daily updates never require a relayout of the matrix
+DAYS_HEADROOM = 366
+# Numpy unit of the rows of each supported interval
+INTERVAL_UNITS = {"1d": "D", "1h": "h", "1m": "m"}
+# Rows reserved after the last written row, per interval (a year of days, a month of hours, two days of minutes)
+HEADROOM_ROWS = {"1d": DAYS_HEADROOM, "1h": 24 * 31, "1m": 2 * 1440}
+# Initial number of columns reserved by in-memory matrices
+INITIAL_COLUMNS = 16
+# Days to look back for a price when there is none at the requested date (weekends and holidays)
+PRICE_LOOKBACK_DAYS = 4
+
+
+class PriceMatrix:
+    """Contiguous date x ticker matrix of prices.
+
+    There is one row per calendar day (or per hour or minute of the calendar for intraday matrices). Names like n_days
+    and last_day refer to rows.
+
+    Data is stored column-major, so each ticker is a contiguous run of days and a new ticker is a new column
+    written after the existing ones. When backed by a file, the matrix is memory-mapped: appending tickers only
+    grows the file, reads only touch the pages they need and several processes can map the same file.
+    Metadata (origin date, dtype, tickers) is kept in a JSON header next to the data file.
+    """
+
+    # Set-up logger
+    logger = logging.getLogger("PriceMatrix")
+
+    def __init__(self, origin: str, dtype: str = "float64", path: str | Path | None = None, readonly: bool = False, interval: str = "1d"):  # noqa: PLR0913
+        """Constructor.
+
+        Args:
+            origin: String with date (or time) of first row, in format YYYY-MM-DD[THH:MM]. Ignored if path points to an
+                existing matrix.
+            dtype: Data type of the prices, "float64" or "float32". Ignored if path points to an existing matrix.
+            path: Optional path of the file backing the matrix. If None, matrix lives in memory.
+            readonly: If True, an existing file is mapped read-only (i.e. for processes that only consume prices).
+            interval: Interval of the rows, "1d", "1h" or "1m". Ignored if path points to an existing matrix.
+        """
+        self.path = Path(path) if path else None
+        self.readonly = readonly
+        self.interval = interval
+        self.unit = INTERVAL_UNITS[interval]
+        self.origin = np.datetime64(origin, self.unit)
+        self.dtype = np.dtype(dtype)
+        self.n_days = HEADROOM_ROWS[interval]
+        self.last_day = -1
+        self.columns: dict[str, int] = {}
+        self.tickers: list[str] = []
+        # First date fetched of each ticker (prices before it were never requested)
+        self.coverage: dict[str, str] = {}
+        self._buffer = None
+        self._data = np.empty((self.n_days, 0), dtype=self.dtype, order="F")
+        if self.path and self.header_path.is_file():
+            self.refresh()
+        elif not self.path:
+            self._buffer = np.empty((self.n_days, INITIAL_COLUMNS), dtype=self.dtype, order="F")
+            self._data = self._buffer[:, :0]
+
+    @property
+    def header_path(self) -> Path:
+        """Path of JSON header of a file backed matrix."""
+        return self.path.with_name(self.path.name + ".json")
+
+    @property
+    def data(self) -> np.ndarray:
+        """Raw days x tickers matrix. Row 0 is origin date."""
+        return self._data
+
+    def refresh(self) -> bool:
+        """Re-read header and re-map file, to see tickers and days appended by another process.
+
+        Returns:
+            True if the matrix changed since last refresh. False otherwise.
+        """
+        with self.header_path.open(encoding="utf8") as input_fh:
+            header = json.load(input_fh)
+        changed = header["tickers"] != self.tickers or header["last_day"] != self.last_day or header["n_days"] != self.n_days
+        self.interval = header.get("interval", "1d")
+        self.unit = INTERVAL_UNITS[self.interval]
+        self.origin = np.datetime64(header["origin"], self.unit)
+        self.dtype = np.dtype(header["dtype"])
+        self.n_days = header["n_days"]
+        self.last_day = header["last_day"]
+        self.tickers = [sys.intern(ticker) for ticker in header["tickers"]]
+        self.columns = {ticker: i for i, ticker in enumerate(self.tickers)}
+        # Tickers written before coverage was tracked were fetched since origin
+        self.coverage = header.get("coverage", dict.fromkeys(self.tickers, str(self.origin)))
+        self._map_file()
+        return changed
+
+    def _map_file(self):
+        """Memory-map the data file with current shape."""
+        if not self.tickers:
+            self._data = np.empty((self.n_days, 0), dtype=self.dtype, order="F")
+            return
+        mode = "r" if self.readonly else "r+"
+        self._data = np.memmap(self.path, dtype=self.dtype, mode=mode, shape=(self.n_days, len(self.tickers)), order="F")
+
+    def _save_header(self):
+        """Atomically write header of a file backed matrix."""
+        header = {
+            "origin": str(self.origin),
+            "interval": self.interval,
+            "dtype": self.dtype.name,
+            "n_days": self.n_days,
+            "last_day": self.last_day,
+            "tickers": self.tickers,
+            "coverage": self.coverage,
+        }
+        tmp_path = self.header_path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf8") as output_fh:
+            json.dump(header, output_fh)
+        tmp_path.replace(self.header_path)
+
+    def flush(self):
+        """Write pending changes of a file backed matrix to disk."""
+        if self.path is None or self.readonly:
+            return
+        if isinstance(self._data, np.memmap):
+            self._data.flush()
+        self._save_header()
+
+    def copy(self) -> PriceMatrix:
+        """Get a writable in-memory copy of the matrix (with the same spare column capacity)."""
+        matrix = PriceMatrix(str(self.origin), dtype=self.dtype.name, interval=self.interval)
+        matrix.n_days = self.n_days
+        matrix.last_day = self.last_day
+        matrix.tickers = list(self.tickers)
+        matrix.columns = dict(self.columns)
+        matrix.coverage = dict(self.coverage)
+        n_cols = len(self.tickers)
+        capacity = self._buffer.shape[1] if self._buffer is not None else max(INITIAL_COLUMNS, n_cols)
+        matrix._buffer = np.empty((self.n_days, capacity), dtype=self.dtype, order="F")  # noqa: SLF001
+        matrix._buffer[:, :n_cols] = self._data  # noqa: SLF001
+        matrix._data = matrix._buffer[:, :n_cols]  # noqa: SLF001
+        return matrix
+
+    def freeze(self) -> PriceMatrix:
+        """Make the matrix immutable. Any later write raises an error.
+
+        Returns:
+            The matrix itself, to allow chaining.
+        """
+        self.readonly = True
+        self._data.flags.writeable = False
+        if self._buffer is not None:
+            self._buffer.flags.writeable = False
+        return self
+
+    def day_index(self, dates) -> np.ndarray:
+        """Get row index of each date (vectorized). Times are floored to the interval of the matrix.
+
+        Args:
+            dates: A date string, a list of date strings, a datetime64 array or a DatetimeIndex.
+
+        Returns:
+            Array of integer row indexes. They can be out of the matrix bounds.
+        """
+        if hasattr(dates, "to_numpy"):
+            dates = dates.to_numpy(dtype="datetime64[ns]")
+        rows = np.asarray(dates, dtype="datetime64[ns]").astype(f"datetime64[{self.unit}]")
+        return (rows - self.origin).astype(np.int64)
+
+    def dates(self) -> np.ndarray:
+        """Get array with date (or time) of every written row."""
+        return self.origin + np.arange(self.last_day + 1)
+
+    def last_date(self, ticker: str | None = None) -> str | None:
+        """Get last date (or time) written in the matrix, in format YYYY-MM-DD[THH:MM].
+
+        Args:
+            ticker: Optional name of a ticker. If given, last date with a price of that ticker (None if it has none).
+        """
+        row = self.last_day
+        if ticker is not None:
+            col = self.columns.get(ticker)
+            valid = np.flatnonzero(~np.isnan(self._data[:self.last_day + 1, col])) if col is not None else []
+            row = int(valid[-1]) if len(valid) else -1
+        if row < 0:
+            return None
+        return str(self.origin + row)
+
+    def covered_from(self, ticker: str) -> str | None:
+        """Get first date fetched of a ticker (None if its history was never fetched)."""
+        return self.coverage.get(ticker)
+
+    def mark_covered(self, tickers, start: str):
+        """Record that prices of some tickers were fetched from a date on."""
+        for ticker in tickers:
+            if ticker not in self.coverage or start < self.coverage[ticker]:
+                self.coverage[ticker] = start
+
+    def add_tickers(self, tickers) -> np.ndarray:
+        """Get column of each ticker, appending a column of NaN for the ones not stored yet.
+
+        Args:
+            tickers: Iterable with name of tickers.
+
+        Returns:
+            Array with column index of each ticker.
+        """
+        tickers = list(tickers)
+        new_tickers = [ticker for ticker in dict.fromkeys(tickers) if ticker not in self.columns]
+        if new_tickers:
+            if self.readonly:
+                msg = f"Can not add {new_tickers} to read-only matrix {self.path}"
+                raise PermissionError(msg)
+            self._append_columns(len(new_tickers))
+            for ticker in new_tickers:
+                interned = sys.intern(ticker)
+                self.columns[interned] = len(self.tickers)
+                self.tickers.append(interned)
+        return np.array([self.columns[ticker] for ticker in tickers], dtype=np.intp)
+
+    def _append_columns(self, count: int):
+        """Append columns of NaN without copying existing data (except when in-memory capacity runs out)."""
+        n_cols = len(self.tickers)
+        if self.path is None:
+            if n_cols + count > self._buffer.shape[1]:
+                capacity = max(2 * self._buffer.shape[1], n_cols + count)
+                buffer = np.empty((self.n_days, capacity), dtype=self.dtype, order="F")
+                buffer[:, :n_cols] = self._buffer[:, :n_cols]
+                self._buffer = buffer
+            self._buffer[:, n_cols:n_cols + count] = np.nan
+            self._data = self._buffer[:, :n_cols + count]
+            return
+        # Column-major file: a new column is just a block of bytes at the end of the file
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        nan_column = np.full(self.n_days, np.nan, dtype=self.dtype)
+        with self.path.open("ab" if n_cols else "wb") as output_fh:
+            for _ in range(count):
+                nan_column.tofile(output_fh)
+        self._data = np.memmap(self.path, dtype=self.dtype, mode="r+", shape=(self.n_days, n_cols + count), order="F")
+
+    def _ensure_days(self, first_row: int, last_row: int):
+        """Relayout the matrix if rows are out of bounds. This is the only operation that copies all data."""
+        if first_row >= 0 and last_row < self.n_days:
+            return
+        shift = max(0, -first_row)
+        n_days = max(self.n_days + shift, last_row + shift + 1 + HEADROOM_ROWS[self.interval])
+        self.__class__.logger.info(f"Relayout of {self.interval} price matrix from {self.n_days} to {n_days} rows")
+        n_cols = len(self.tickers)
+        old_data = self._data
+        if self.path is None:
+            buffer = np.full((n_days, self._buffer.shape[1]), np.nan, dtype=self.dtype, order="F")
+            buffer[shift:shift + self.n_days, :n_cols] = old_data
+            self._buffer = buffer
+            self._data = buffer[:, :n_cols]
+        else:
+            del old_data
+            self._relayout_file(n_days, shift)
+        self.origin -= shift
+        self.last_day += shift
+        self.n_days = n_days
+        if self.path is not None:
+            self._map_file()
+            self._save_header()
+
+    def _relayout_file(self, n_days: int, shift: int):
+        """Write data into a new file and atomically replace the data file with it.
+
+        The new file has n_days rows, and rows are moved by shift (a negative shift drops the first rows). Processes that mapped the previous file keep reading it, consistent with the header they loaded, until they
+        refresh the matrix. The data file is never modified in place, so no reader sees rows half moved.
+        """
+        src_start, dst_start = max(0, -shift), max(0, shift)
+        count = min(self.n_days - src_start, n_days - dst_start)
+        tmp_path = self.path.with_suffix(".relayout")
+        with tmp_path.open("wb") as output_fh:
+            for col in range(len(self.tickers)):
+                column = np.full(n_days, np.nan, dtype=self.dtype)
+                if count > 0:
+                    column[dst_start:dst_start + count] = self._data[src_start:src_start + count, col]
+                column.tofile(output_fh)
+        self._data = np.empty((n_days, 0), dtype=self.dtype, order="F")
+        tmp_path.replace(self.path)
+
+    def trim(self, keep_from) -> int:
+        """Drop rows before a date (retention). Storage does not grow.
+
+        In-memory matrices move rows in place. File backed matrices are written to a new file that replaces the
+        previous one (like a relayout), since other processes could have the file mapped: they keep the previous
+        rows until they refresh the matrix.
+
+        Args:
+            keep_from: Date (or time) of the first row to keep.
+
+        Returns:
+            Number of rows dropped.
+        """
+        shift = int(self.day_index(keep_from))
+        if shift <= 0:
+            return 0
+        if self.readonly:
+            msg = f"Can not trim read-only matrix {self.path}"
+            raise PermissionError(msg)
+        if self.path is None:
+            moved = min(shift, self.n_days)
+            kept = self.n_days - moved
+            self._data[:kept] = self._data[moved:]
+            self._data[kept:] = np.nan
+        elif self.tickers:
+            self._relayout_file(self.n_days, -shift)
+        self.origin += shift
+        dropped = min(self.last_day + 1, shift)
+        self.last_day = max(self.last_day - shift, -1)
+        if self.path is not None:
+            self._map_file()
+            self._save_header()
+        return dropped
+
+    def scale(self, ticker: str, before, factor: float):
+        """Multiply prices of a ticker before a date in place (i.e. adjust older prices for a split).
+
+        Args:
+            ticker: String with name of the ticker. Nothing is done if it is not stored.
+            before: Date (or time) of the first row left unchanged.
+            factor: Multiplier of the prices.
+        """
+        col = self.columns.get(ticker)
+        end = min(int(self.day_index(before)), self.last_day + 1)
+        if col is not None and end > 0:
+            self._data[:end, col] *= factor
+
+    def write(self, prices_df: DataFrame, overwrite: bool = True):
+        """Write prices into the matrix. NaN values of the frame do not overwrite stored prices.
+
+        Args:
+            prices_df: Dataframe indexed by date, with one column per ticker.
+            overwrite: If False, only cells without a stored price are written.
+        """
+        if prices_df.empty:
+            return
+        rows = self.day_index(prices_df.index)
+        self._ensure_days(int(rows.min()), int(rows.max()))
+        rows = self.day_index(prices_df.index)
+        cols = self.add_tickers(prices_df.columns)
+        values = prices_df.to_numpy(dtype=self.dtype, na_value=np.nan)
+        block = np.ix_(rows, cols)
+        stored = self._data[block]
+        keep = np.isnan(values) if overwrite else np.isnan(values) | ~np.isnan(stored)
+        self._data[block] = np.where(keep, stored, values)
+        self.last_day = max(self.last_day, int(rows.max()))
+
+    def get(self, ticker: str, date: str, lookback: int = 0) -> float:
+        """Get price of a ticker at a date, or the last one available in the previous lookback days.
+
+        Args:
+            ticker: String with name of the ticker.
+            date: String with the date, in format YYYY-MM-DD.
+            lookback: Number of previous days to look at when there is no price at date (weekends, holidays).
+
+        Returns:
+            The price, or NaN if ticker or price are not available.
+        """
+        col = self.columns.get(ticker)
+        row = int(self.day_index(date))
+        if col is None or row < 0:
+            return np.nan
+        row = min(row, self.last_day)
+        window = self._data[max(0, row - lookback):row + 1, col]
+        valid = np.flatnonzero(~np.isnan(window))
+        if valid.size == 0:
+            return np.nan
+        return float(window[valid[-1]])
+
+    def last(self, ticker: str) -> float:
+        """Get last available price of a ticker (NaN if not available)."""
+        col = self.columns.get(ticker)
+        if col is None:
+            return np.nan
+        column = self._data[:self.last_day + 1, col]
+        valid = np.flatnonzero(~np.isnan(column))
+        return float(column[valid[-1]]) if valid.size else np.nan
+
+    def to_frame(self, tickers=None, start: str | None = None, end: str | None = None, dropna: bool = True) -> DataFrame:
+        """Get prices as a dataframe.
+
+        Args:
+            tickers: Optional list of tickers (missing ones are NaN columns). If None, all tickers (without copy).
+            start: Optional first date, in format YYYY-MM-DD.
+            end: Optional last date, in format YYYY-MM-DD.
+            dropna: If True, rows without any price (weekends, holidays) are dropped.
+
+        Returns:
+            A dataframe indexed by date with one column per ticker.
+        """
+        first_row = max(0, int(self.day_index(start))) if start else 0
+        last_row = min(self.last_day, int(self.day_index(end))) if end else self.last_day
+        rows = slice(first_row, max(first_row, last_row + 1))
+        if tickers is None:
+            tickers = self.tickers
+            values = self._data[rows]
+        else:
+            tickers = list(tickers)
+            cols = np.array([self.columns.get(ticker, -1) for ticker in tickers], dtype=np.intp)
+            values = self._data[rows][:, np.maximum(cols, 0)] if len(self.tickers) else np.full((rows.stop - rows.start, len(cols)), np.nan)
+            values[:, cols < 0] = np.nan
+        from pandas import DataFrame, DatetimeIndex  # Only loaded when a dataframe is actually needed
+
+        index = DatetimeIndex(self.origin + np.arange(rows.start, rows.stop), name="Date")
+        prices_df = DataFrame(values, index=index, columns=list(tickers), copy=False)
+        if dropna:
+            prices_df = prices_df.dropna(how="all")
+        return prices_df
@@ -0,0 +1,180 @@
+"""Prices at several intervals (minutes, hours, days), each one kept for a retention period."""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from hportfolio.price_store import HEADROOM_ROWS, INTERVAL_UNITS, PriceMatrix
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+# Default tiers, finest first: (interval, retention in days). None keeps prices forever.
+DEFAULT_TIERS = (("1m", 7), ("1h", 730), ("1d", None))
+# Maximum number of points returned by range queries (about the width of a chart in pixels)
+MAX_POINTS = 2000
+
+
+@dataclass
+class Tier:
+    """Prices of one interval."""
+
+    interval: str
+    retention: np.timedelta64 | None
+    prices: PriceMatrix
+
+    def first_kept(self, now: np.datetime64) -> np.datetime64 | None:
+        """First day kept by the retention policy (None if everything is kept)."""
+        if self.retention is None:
+            return None
+        return (now - self.retention).astype("datetime64[D]")
+
+
+def rollup(source: PriceMatrix, target: PriceMatrix, start, end, overwrite: bool = True):
+    """Write closes of the coarser target interval from the finer source one (vectorized over rows and tickers).
+
+    Close of each target row is the last valid price of the source rows it spans.
+
+    Args:
+        source: Finer price matrix.
+        target: Coarser price matrix.
+        start: First date (or time) of the range to roll up. It is extended to the start of its target row.
+        end: Last date (or time) of the range to roll up.
+        overwrite: If False, only target cells without price are written.
+    """
+    first_time = np.datetime64(start).astype(f"datetime64[{target.unit}]")
+    first = max(int(source.day_index(first_time)), 0)
+    last = min(int(source.day_index(end)), source.last_day)
+    if last < first or not source.tickers:
+        return
+    from pandas import DataFrame, DatetimeIndex
+    times = source.origin + np.arange(first, last + 1)
+    buckets = times.astype(f"datetime64[{target.unit}]")
+    window = source.data[first:last + 1]
+    rows = np.arange(len(times))[:, None]
+    last_valid = np.maximum.accumulate(np.where(np.isnan(window), -1, rows), axis=0)
+    ends = np.append(np.flatnonzero(buckets[1:] != buckets[:-1]), len(times) - 1)
+    starts = np.append(0, ends[:-1] + 1)
+    close_rows = last_valid[ends]
+    closes = np.take_along_axis(window, np.maximum(close_rows, 0), axis=0)
+    closes[close_rows < starts[:, None]] = np.nan
+    target.write(DataFrame(closes, index=DatetimeIndex(buckets[ends]), columns=list(source.tickers)), overwrite=overwrite)
+
+
+class TieredPriceStore:
+    """Price matrices at several intervals, with retention policies (i.e. 1m for 7 days, 1h for 2 years, 1d forever).
+
+    Prices written to a tier are rolled up into every coarser tier, so a fetch of minute bars also updates the
+    hourly and daily closes. Daily closes of the data provider are never overwritten by rollups. Old rows are dropped
+    in place once they exceed the retention, so storage of intraday tiers stays bounded.
+    """
+
+    # Set-up logger
+    logger = logging.getLogger("TieredPriceStore")
+
+    def __init__(self, daily: PriceMatrix, directory: str | Path | None = None, tiers=DEFAULT_TIERS, now: np.datetime64 | None = None):
+        """Constructor.
+
+        Args:
+            daily: Price matrix of the daily tier (i.e. the close cache).
+            directory: Optional directory of the files backing intraday tiers. If None, they live in memory.
+            tiers: Sequence of (interval, retention in days or None), finest first. Last one must be "1d".
+            now: Optional current time. Defaults to now (UTC).
+        """
+        now = np.datetime64("now", "m") if now is None else np.datetime64(now, "m")
+        self.tiers: list[Tier] = []
+        for interval, retention_days in tiers:
+            retention = None if retention_days is None else np.timedelta64(retention_days, "D")
+            if interval == "1d":
+                self.tiers.append(Tier(interval, retention, daily))
+                continue
+            origin = str((now - retention).astype("datetime64[D]"))
+            path = Path(directory) / f"prices_{interval}.bin" if directory else None
+            self.tiers.append(Tier(interval, retention, PriceMatrix(origin, dtype="float32", path=path, interval=interval)))
+        self.enforce_retention(now)
+
+    def tier(self, interval: str) -> Tier:
+        """Get tier of an interval."""
+        for tier in self.tiers:
+            if tier.interval == interval:
+                return tier
+        msg = f"No {interval} tier"
+        raise KeyError(msg)
+
+    @property
+    def intraday_tiers(self) -> list[Tier]:
+        """Tiers finer than a day, finest first."""
+        return [tier for tier in self.tiers if tier.interval != "1d"]
+
+    def write(self, interval: str, prices_df: DataFrame):
+        """Write prices of an interval and roll them up into the coarser tiers.
+
+        Args:
+            interval: Interval of the prices.
+            prices_df: Dataframe indexed by (timezone naive) time, with one column per ticker.
+        """
+        if prices_df.empty:
+            return
+        index = [tier.interval for tier in self.tiers].index(interval)
+        self.tiers[index].prices.write(prices_df)
+        start, end = prices_df.index.min().to_datetime64(), prices_df.index.max().to_datetime64()
+        for source, target in zip(self.tiers[index:-1], self.tiers[index + 1:], strict=True):
+            rollup(source.prices, target.prices, start, end, overwrite=target.interval != "1d")
+
+    def enforce_retention(self, now: np.datetime64 | None = None):
+        """Drop expired rows. Rows are only dropped in batches (headroom size), so trimming is amortized."""
+        now = np.datetime64("now", "m") if now is None else now
+        for tier in self.intraday_tiers:
+            first_kept = tier.first_kept(now)
+            if tier.prices.day_index(first_kept) >= HEADROOM_ROWS[tier.interval]:
+                dropped = tier.prices.trim(first_kept)
+                self.__class__.logger.info(f"Dropped {dropped} expired rows of {tier.interval} prices")
+
+    def select_tier(self, start, end, max_points: int = MAX_POINTS, now: np.datetime64 | None = None) -> Tier:
+        """Pick the finest tier that keeps prices since start and has at most max_points rows in the range.
+
+        Args:
+            start: First date (or time) of the range.
+            end: Last date (or time) of the range.
+            max_points: Maximum number of rows in the range.
+            now: Optional current time. Defaults to now (UTC).
+
+        Returns:
+            The tier to query. Daily tier if no finer tier fits.
+        """
+        now = np.datetime64("now", "m") if now is None else now
+        start, end = np.datetime64(start, "m"), np.datetime64(end, "m")
+        for tier in self.tiers:
+            first_kept = tier.first_kept(now)
+            if first_kept is not None and start < first_kept:
+                continue
+            unit = f"datetime64[{INTERVAL_UNITS[tier.interval]}]"
+            n_rows = int((end.astype(unit) - start.astype(unit)).astype(np.int64)) + 1
+            if n_rows <= max_points:
+                return tier
+        return self.tiers[-1]
+
+    def query(self, tickers: list[str], start, end, max_points: int = MAX_POINTS, now: np.datetime64 | None = None) -> tuple[str, DataFrame]:
+        """Get prices of a range from the best tier for it.
+
+        Args:
+            tickers: List with name of the tickers.
+            start: First date (or time) of the range.
+            end: Last date (or time) of the range.
+            max_points: Maximum number of rows returned.
+            now: Optional current time. Defaults to now (UTC).
+
+        Returns:
+            Interval of the prices, and a dataframe indexed by time with one column per ticker.
+        """
+        tier = self.select_tier(start, end, max_points, now)
+        return tier.interval, tier.prices.to_frame(tickers, start=str(np.datetime64(start, "m")), end=str(np.datetime64(end, "m")))
+
+    def flush(self):
+        """Write pending changes of file backed tiers to disk."""
+        for tier in self.intraday_tiers:
+            tier.prices.flush()
@@ -0,0 +1,214 @@
+"""Target-weight rebalancing with integer shares."""
+from dataclasses import dataclass
+
+import numpy as np
+
+from hportfolio.portfolio import TRANSACTION_FEE, PortfolioHistory
+from hportfolio.price_store import PriceMatrix
+
+
+@dataclass
+class RebalancePlan:
+    """Trades of one or many scenarios (candidate target allocations).
+
+    Attributes:
+        tickers: List with name of the tickers (columns).
+        trades: Array (scenarios x tickers) with shares to buy (> 0) or sell (< 0).
+        fees: Array with fees paid by each scenario.
+        turnover: Array with traded value (buys + sells) of each scenario.
+        realized_gains: Array with gains realized by the sells of each scenario (negative if losses).
+        cash_after: Array with cash left after trading.
+        weights_after: Array (scenarios x tickers) with weight of each ticker after trading.
+        drift_after: Array with largest distance (beyond tolerance) from a target weight after trading.
+    """
+
+    tickers: list[str]
+    trades: np.ndarray
+    fees: np.ndarray
+    turnover: np.ndarray
+    realized_gains: np.ndarray
+    cash_after: np.ndarray
+    weights_after: np.ndarray
+    drift_after: np.ndarray
+
+    def orders(self, scenario: int = 0) -> list[dict]:
+        """Get non-zero trades of a scenario, sells first (they fund the buys)."""
+        trades = self.trades[scenario]
+        columns = np.flatnonzero(trades)
+        columns = columns[np.argsort(trades[columns] > 0, kind="stable")]
+        return [{"ticker": self.tickers[col], "shares": int(trades[col])} for col in columns]
+
+
+class Rebalancer:
+    """Finds the integer-share trades that bring a portfolio within tolerance bands of target weights.
+
+    Only tickers out of their band trade, so the plan is the minimal set of trades. Overweight tickers are sold back
+    to target (or only to their upper band edge if they have gains and gains should be minimized, since that sells
+    fewer appreciated shares). Underweight tickers are bought up to target with the cash available, which is the
+    current cash plus proceeds of the sells, minus fees and the cash reserve of the targets. If cash is not enough,
+    buys are scaled down, then the remaining cash buys one more share of the most underweight tickers first.
+
+    Every step operates on (scenarios x tickers) arrays, so many candidate allocations are evaluated at once.
+    """
+
+    def __init__(self, tickers: list[str], qty, prices, cash: float, unit_cost=None, fee: float = TRANSACTION_FEE):
+        """Constructor.
+
+        Args:
+            tickers: List with name of the tickers (LIQUIDITY excluded).
+            qty: Shares held of each ticker.
+            prices: Last price of each ticker.
+            cash: Available cash (LIQUIDITY).
+            unit_cost: Optional cost basis per share of each ticker. Needed to compute realized gains.
+            fee: Fee charged per trade.
+        """
+        self.tickers = list(tickers)
+        self.columns = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.qty = np.asarray(qty, dtype=np.float64)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.cash = float(cash)
+        self.unit_cost = self.prices.copy() if unit_cost is None else np.nan_to_num(np.asarray(unit_cost, dtype=np.float64))
+        self.fee = fee
+        self.values = self.qty * self.prices
+        self.total = self.values.sum() + self.cash
+
+    @classmethod
+    def from_history(cls, history: PortfolioHistory, fee: float = TRANSACTION_FEE) -> "Rebalancer":
+        """Build a rebalancer from last day of a portfolio history (tickers without price are left out)."""
+        last_row = len(history.dates) - 1
+        qty = history.holdings[last_row]
+        prices = history.prices[last_row]
+        columns = [
+            col for ticker, col in history.columns.items()
+            if ticker != "LIQUIDITY" and not np.isnan(prices[col]) and prices[col] > 0
+        ]
+        cash = qty[history.columns["LIQUIDITY"]] if "LIQUIDITY" in history.columns else 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            unit_cost = np.where(qty[columns] > 0, history.cost[columns] / qty[columns], prices[columns])
+        return cls([history.tickers[col] for col in columns], qty[columns], prices[columns], cash, unit_cost, fee)
+
+    def target_matrix(self, targets: dict | list[dict], prices: PriceMatrix | None = None) -> np.ndarray:
+        """Convert target allocations to a (scenarios x tickers) weights array.
+
+        Args:
+            targets: Dictionary of ticker -> weight (0 to 1), or a list of them. Tickers left out get weight 0, and
+                the weight not assigned to tickers is the cash target.
+            prices: Optional price matrix (i.e. of the current prices snapshot). Target tickers not held yet are
+                added with zero shares at their last price in it.
+
+        Returns:
+            Array of weights.
+        """
+        if isinstance(targets, dict):
+            targets = [targets]
+        for ticker in dict.fromkeys(ticker for target in targets for ticker in target):
+            if ticker not in self.columns:
+                self.add_ticker(ticker, np.nan if prices is None else prices.last(ticker))
+        weights = np.zeros((len(targets), len(self.tickers)))
+        for row, target in enumerate(targets):
+            for ticker, weight in target.items():
+                weights[row, self.columns[ticker]] = weight
+        if (weights < 0).any() or (weights.sum(axis=1) > 1 + 1e-9).any():
+            msg = "Target weights must be positive and add up to 1 at most"
+            raise ValueError(msg)
+        return weights
+
+    def add_ticker(self, ticker: str, price: float):
+        """Add a ticker not held yet (zero shares), so that target allocations can buy it.
+
+        Args:
+            ticker: String with name of the ticker.
+            price: Last price of the ticker.
+        """
+        if not price > 0:
+            msg = f"No price of {ticker} in target allocation"
+            raise ValueError(msg)
+        self.columns[ticker] = len(self.tickers)
+        self.tickers.append(ticker)
+        self.qty = np.append(self.qty, 0.0)
+        self.prices = np.append(self.prices, price)
+        self.unit_cost = np.append(self.unit_cost, price)
+        self.values = np.append(self.values, 0.0)
+
+    def plan(self, weights, tolerance: float = 0.02, minimize_gains: bool = False) -> RebalancePlan:
+        """Compute trades of one or many target allocations.
+
+        Args:
+            weights: Target weights, (tickers) or (scenarios x tickers) array. See target_matrix.
+            tolerance: Band around each target weight (absolute, i.e. 0.02 is +/- 2 points) where no trade is needed.
+            minimize_gains: If True, overweight tickers with gains are only sold down to their upper band edge.
+
+        Returns:
+            Plan with the trades of each scenario.
+        """
+        weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+        # Tickers added after the weights were computed get weight 0
+        weights = np.pad(weights, ((0, 0), (0, len(self.tickers) - weights.shape[1])))
+        prices, values, total = self.prices, self.values, self.total
+        target = weights * total
+        lower = target - tolerance * total
+        upper = target + tolerance * total
+
+        # Sells: overweight tickers, back to target (or to band edge), never more than what is held
+        sell_goal = target
+        if minimize_gains:
+            sell_goal = np.where(prices > self.unit_cost, upper, target)
+        overweight = values > upper
+        to_edge = overweight & (sell_goal == upper)
+        excess = (values - sell_goal) / prices
+        sells = np.where(to_edge, np.ceil(excess - 1e-9), np.round(excess))
+        sells = np.where(overweight, np.clip(sells, 0, self.qty), 0)
+
+        # Buys: underweight tickers up to target, limited by cash left after sells, fees and cash reserve
+        underweight = values < lower
+        buys = np.where(underweight, np.maximum(np.round((target - values) / prices), 0), 0)
+        cash_reserve = np.maximum(1 - weights.sum(axis=1) - tolerance, 0) * total
+        n_trades = (sells > 0).sum(axis=1) + (buys > 0).sum(axis=1)
+        available = self.cash + sells @ prices - n_trades * self.fee - cash_reserve
+        buy_cost = buys @ prices
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.where(buy_cost > available, np.clip(available / buy_cost, 0, 1), 1)
+        scaled_buys = np.floor(buys * scale[:, None])
+        # Fees of buys dropped by the scaling are not paid
+        available += ((buys > 0) & (scaled_buys == 0)).sum(axis=1) * self.fee
+        buys = scaled_buys
+        buys += self._fill_leftover(buys, underweight, target - values - buys * prices, available - buys @ prices)
+
+        trades = (buys - sells).astype(np.int64)
+        traded = trades != 0
+        fees = traded.sum(axis=1) * self.fee
+        cash_after = self.cash - trades @ prices - fees
+        values_after = values + trades * prices
+        weights_after = values_after / total
+        drift = np.abs(weights_after - weights) - tolerance
+        return RebalancePlan(
+            tickers=self.tickers,
+            trades=trades,
+            fees=fees,
+            turnover=np.abs(trades) @ prices,
+            realized_gains=np.maximum(-trades, 0) @ (prices - self.unit_cost),
+            cash_after=cash_after,
+            weights_after=weights_after,
+            drift_after=np.maximum(drift.max(axis=1, initial=0), 0),
+        )
+
+    def _fill_leftover(self, buys: np.ndarray, underweight: np.ndarray, shortfall: np.ndarray, leftover: np.ndarray) -> np.ndarray:
+        """Buy one more share of the most underweight tickers (greedy), while leftover cash allows it.
+
+        Args:
+            buys: Array (scenarios x tickers) of shares already bought.
+            underweight: Array (scenarios x tickers) with True for tickers that should be bought.
+            shortfall: Array (scenarios x tickers) with value still missing to reach target.
+            leftover: Array with cash still available in each scenario.
+
+        Returns:
+            Array (scenarios x tickers) with extra shares.
+        """
+        # A ticker not bought yet costs a fee too, and a share is only worth buying if it does not overshoot target
+        cost = self.prices + self.fee * (buys == 0)
+        candidate = underweight & (shortfall >= self.prices / 2)
+        order = np.argsort(np.where(candidate, -shortfall, np.inf), axis=1, kind="stable")
+        cumulative = np.cumsum(np.take_along_axis(np.where(candidate, cost, np.inf), order, axis=1), axis=1)
+        extra = np.zeros_like(buys)
+        np.put_along_axis(extra, order, (cumulative <= leftover[:, None]).astype(buys.dtype), axis=1)
+        return extra
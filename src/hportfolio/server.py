@@ -0,0 +1,301 @@
+"""Local HTTP/JSON server exposing portfolio numbers without the GUI."""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+from pathlib import Path
+from typing import ClassVar
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from hportfolio.portfolio import PortfolioHistory
+from hportfolio.tickers_data import TickersData, data_tickers
+
+# Seconds between checks of the data file modification time
+WATCH_INTERVAL = 2
+# Maximum size of a request head (request line + headers)
+MAX_HEADER_SIZE = 16384
+# Seconds an idle keep-alive connection is kept open
+KEEP_ALIVE_TIMEOUT = 30
+RESOLUTIONS = ("D", "W", "M")
+
+
+def to_json(content) -> bytes:
+    """Serialize content to compact JSON. Floats are rounded to cents and NaN values become null."""
+
+    def default(value):
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        msg = f"{type(value)} is not JSON serializable"
+        raise TypeError(msg)
+
+    def clean(value):
+        if isinstance(value, dict):
+            return {key: clean(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [clean(item) for item in value]
+        if isinstance(value, float | np.floating):
+            return None if math.isnan(value) else round(float(value), 2)
+        return value
+
+    return json.dumps(clean(content), default=default, separators=(",", ":")).encode()
+
+
+class HttpError(Exception):
+    """Error answered to the client with an HTTP status code."""
+
+    def __init__(self, status: int, message: str):
+        """Constructor."""
+        super().__init__(message)
+        self.status = status
+
+
+class PortfolioServer:
+    """Asyncio HTTP/1.1 server answering JSON queries about the portfolio.
+
+    Endpoints:
+        /positions: current positions with value, cost basis and P&L.
+        /history?start=YYYY-MM-DD&end=YYYY-MM-DD&resolution=D|W|M: value and invested cash over time.
+        /pnl?ticker=XXX: P&L of every position (or only of the given tickers).
+
+    Valuation is computed once per version of the data (data file reloads and prices snapshot), and
+    each response body is rendered once per version too. Clients polling with If-None-Match get a 304 answer, so
+    repeated polling only costs a dictionary lookup.
+    """
+
+    STATUS_TEXT: ClassVar[dict[int, str]] = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+    # Set-up logger
+    logger = logging.getLogger("PortfolioServer")
+
+    def __init__(self, data_file: str, refresh_interval: float = 900, fetch_prices: bool = True):
+        """Constructor.
+
+        Args:
+            data_file: String with path of JSON data file.
+            refresh_interval: Seconds between price refreshes. 0 disables periodic refresh.
+            fetch_prices: If True, prices are fetched at startup (blocking). Otherwise only cached prices are served.
+        """
+        self.data_file = Path(data_file)
+        self.refresh_interval = refresh_interval
+        self.tickers_data = TickersData(data_file, fetch_prices=fetch_prices)
+        # Clients can query any date range, so whole history is loaded (not only the startup window)
+        if fetch_prices:
+            self.tickers_data.extend_window(self.tickers_data.start_date)
+        else:
+            self.tickers_data.window_start = self.tickers_data.start_date
+        self.routes = {"/positions": self.render_positions, "/history": self.render_history, "/pnl": self.render_pnl}
+        # Incremented whenever the data file is reloaded
+        self.data_version = 0
+        self.version: tuple | None = None
+        self.history: PortfolioHistory | None = None
+        # (path, sorted query) -> (etag, body) for current version
+        self.responses: dict[tuple, tuple[str, bytes]] = {}
+        # Serializes price fetches (run in executor threads) and data swaps, so a fetch never reads data being replaced
+        self.fetch_lock = asyncio.Lock()
+
+    def data_mtime(self) -> int:
+        """Modification time of the data file (nanoseconds)."""
+        return self.data_file.stat().st_mtime_ns
+
+    def requested_tickers(self) -> list[str]:
+        """Tickers whose prices are served: every ticker of the portfolio history plus the watchlist."""
+        return data_tickers(self.tickers_data.data_content)
+
+    def current_history(self) -> PortfolioHistory:
+        """Portfolio history of current data and prices. Recomputed only when any of them changed."""
+        with self.tickers_data.pinned_snapshot() as snapshot:
+            version = (self.data_version, snapshot.version)
+            if version != self.version:
+                self.history = self.tickers_data.get_portfolio_history()
+                self.responses = {}
+                self.version = version
+                self.__class__.logger.info(f"Portfolio recomputed (prices snapshot v{snapshot.version})")
+        return self.history
+
+    def get_response(self, path: str, query: dict) -> tuple[str, bytes]:
+        """Get ETag and body of a query, rendering it only if not cached for current version."""
+        if path not in self.routes:
+            raise HttpError(404, f"Unknown endpoint {path}")
+        history = self.current_history()
+        key = (path, tuple(sorted((name, tuple(values)) for name, values in query.items())))
+        response = self.responses.get(key)
+        if response is None:
+            body = to_json(self.routes[path](history, query))
+            etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+            response = self.responses[key] = (etag, body)
+        return response
+
+    def render_positions(self, history: PortfolioHistory, _query: dict) -> dict:
+        """Current positions."""
+        positions = history.positions()
+        return {
+            "date": str(history.dates[-1]),
+            "total": history.total[-1],
+            "invested": history.invested[-1],
+            "positions": positions,
+        }
+
+    def render_history(self, history: PortfolioHistory, query: dict) -> dict:
+        """Value and invested cash series."""
+        resolution = query.get("resolution", ["D"])[-1].upper()
+        if resolution not in RESOLUTIONS:
+            raise HttpError(400, f"Resolution must be one of {', '.join(RESOLUTIONS)}")
+        try:
+            rows = history.resample(query.get("start", [None])[-1], query.get("end", [None])[-1], resolution)
+        except ValueError as exc:
+            raise HttpError(400, "Dates must have format YYYY-MM-DD") from exc
+        return {
+            "resolution": resolution,
+            "dates": history.dates[rows].astype(str).tolist(),
+            "value": history.total[rows].tolist(),
+            "invested": history.invested[rows].tolist(),
+        }
+
+    def render_pnl(self, history: PortfolioHistory, query: dict) -> dict:
+        """P&L of each position (optionally filtered by ticker)."""
+        tickers = {ticker for value in query.get("ticker", []) for ticker in value.split(",")}
+        positions = [position for position in history.positions() if position["ticker"] != "LIQUIDITY"]
+        if tickers:
+            positions = [position for position in positions if position["ticker"] in tickers]
+        return {
+            "pnl": history.total[-1] - history.invested[-1],
+            "tickers": {position["ticker"]: {key: position[key] for key in ("value", "cost", "pnl", "pnl_percentage")} for position in positions},
+        }
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests of a connection until client closes it (HTTP/1.1 keep-alive)."""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, TimeoutError, ConnectionError):
+                    break
+                keep_alive = self.handle_request(head, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    def handle_request(self, head: bytes, writer: asyncio.StreamWriter) -> bool:
+        """Answer a request.
+
+        Returns:
+            True if connection can be kept open.
+        """
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            self.write_response(writer, 400, b'{"error":"Malformed request"}', keep_alive=False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+        if method not in ("GET", "HEAD"):
+            self.write_response(writer, 405, b'{"error":"Only GET is supported"}', keep_alive=keep_alive)
+            return keep_alive
+        url = urlsplit(target)
+        try:
+            etag, body = self.get_response(url.path.rstrip("/") or "/", parse_qs(url.query))
+        except HttpError as exc:
+            self.write_response(writer, exc.status, to_json({"error": str(exc)}), keep_alive=keep_alive)
+            return keep_alive
+        except Exception:
+            self.__class__.logger.exception(f"Error answering {target}")
+            self.write_response(writer, 500, b'{"error":"Internal error"}', keep_alive=keep_alive)
+            return keep_alive
+
+        if etag in (tag.strip() for tag in headers.get("if-none-match", "").split(",")):
+            self.write_response(writer, 304, b"", etag=etag, keep_alive=keep_alive)
+        else:
+            self.write_response(writer, 200, body, etag=etag, keep_alive=keep_alive, send_body=method == "GET")
+        return keep_alive
+
+    def write_response(self, writer: asyncio.StreamWriter, status: int, body: bytes, etag: str | None = None, keep_alive: bool = True, send_body: bool = True):  # noqa: PLR0913
+        """Write status line, headers and body of a response."""
+        headers = [
+            f"HTTP/1.1 {status} {self.STATUS_TEXT[status]}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            "Cache-Control: no-cache",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if etag:
+            headers.append(f"ETag: {etag}")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1"))
+        if send_body:
+            writer.write(body)
+
+    async def watch_data_file(self):
+        """Reload data file whenever it is modified (i.e. by the statement importer)."""
+        mtime = self.data_mtime()
+        while True:
+            await asyncio.sleep(WATCH_INTERVAL)
+            try:
+                new_mtime = self.data_mtime()
+            except OSError:
+                continue
+            if new_mtime == mtime:
+                continue
+            self.__class__.logger.info(f"{self.data_file} modified, reloading it")
+            loop = asyncio.get_running_loop()
+            try:
+                content = await loop.run_in_executor(None, self.tickers_data.read_data_file)
+            except (OSError, ValueError):
+                # File is retried on next check (i.e. it was read while still being written)
+                self.__class__.logger.exception(f"Could not reload {self.data_file}")
+                continue
+            mtime = new_mtime
+            async with self.fetch_lock:
+                # Prices of new tickers are fetched before the new data is swapped in. Until then, clients keep getting
+                # the responses cached for the previous data.
+                try:
+                    await loop.run_in_executor(None, self.tickers_data.get_tickers_value, data_tickers(content))
+                except Exception:
+                    self.__class__.logger.exception("Price fetch of reloaded data failed")
+                self.tickers_data.reload_data_file(content=content)
+            self.data_version += 1
+
+    async def refresh_prices(self):
+        """Periodically fetch new prices. Publishing a new snapshot invalidates cached responses."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                async with self.fetch_lock:
+                    await loop.run_in_executor(None, self.tickers_data.get_tickers_value, self.requested_tickers(), True)
+            except Exception:
+                self.__class__.logger.exception("Price refresh failed")
+
+    async def serve(self, host: str, port: int):
+        """Start listening and serve forever."""
+        server = await asyncio.start_server(self.handle_client, host, port, limit=MAX_HEADER_SIZE)
+        self.__class__.logger.info(f"Serving on http://{host}:{port}")
+        tasks = [asyncio.create_task(self.watch_data_file())]
+        if self.refresh_interval > 0:
+            tasks.append(asyncio.create_task(self.refresh_prices()))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def serve(data_file: str, host: str = "127.0.0.1", port: int = 8765, refresh_interval: float = 900):
+    """Run the server until interrupted."""
+    server = PortfolioServer(data_file, refresh_interval)
+    try:
+        asyncio.run(server.serve(host, port))
+    except KeyboardInterrupt:
+        logging.getLogger("PortfolioServer").info("Server stopped")
@@ -0,0 +1,93 @@
+"""Immutable, versioned snapshots of price data shared between threads."""
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from hportfolio.price_store import PriceMatrix
+
+
+@dataclass(frozen=True)
+class PriceSnapshot:
+    """Immutable view of prices at one point in time.
+
+    Attributes:
+        version: Increasing number of the snapshot. Version 0 is the empty snapshot.
+        prices: Frozen price matrix (base currency) of the tickers.
+        tickers: Tickers whose prices were requested up to this snapshot.
+        splits: Optional frozen matrix with the ratio of each split of the tickers at its ex-date.
+        dividends: Optional frozen matrix with the dividend per share (base currency) of the tickers at each ex-date.
+    """
+
+    version: int
+    prices: PriceMatrix
+    tickers: frozenset[str]
+    splits: PriceMatrix | None = None
+    dividends: PriceMatrix | None = None
+
+
+class SnapshotPublisher:
+    """Publishes price snapshots with an atomic swap of the current one.
+
+    Writers build the next snapshot off-thread (from a copy of the current prices) and publish it. Readers never
+    lock: they either take the current snapshot, or pin one for a whole pass so that every read in that pass is
+    consistent, even if a new snapshot is published in the middle of it.
+    """
+
+    def __init__(self, origin: str):
+        """Constructor.
+
+        Args:
+            origin: String with first date of the (empty) initial price matrix, in format YYYY-MM-DD.
+        """
+        self._current = PriceSnapshot(0, PriceMatrix(origin).freeze(), frozenset())
+        self._pinned = threading.local()
+        # Serializes writers only. Readers never take it.
+        self.writer_lock = threading.Lock()
+
+    @property
+    def current(self) -> PriceSnapshot:
+        """Snapshot pinned by the calling thread, or latest published one if none is pinned."""
+        pinned = getattr(self._pinned, "snapshot", None)
+        return pinned if pinned is not None else self._current
+
+    @property
+    def latest(self) -> PriceSnapshot:
+        """Latest published snapshot, regardless of pinning."""
+        return self._current
+
+    def publish(self, prices: PriceMatrix, tickers, splits: PriceMatrix | None = None, dividends: PriceMatrix | None = None) -> PriceSnapshot:
+        """Freeze prices and publish them as the next snapshot.
+
+        Args:
+            prices: Price matrix built by the writer. It must not be modified afterwards.
+            tickers: Tickers whose prices are contained in the matrix.
+            splits: Optional matrix of split ratios of the tickers. It must not be modified afterwards.
+            dividends: Optional matrix of dividends (base currency) of the tickers. It must not be modified afterwards.
+
+        Returns:
+            The published snapshot.
+        """
+        snapshot = PriceSnapshot(
+            self._current.version + 1,
+            prices.freeze(),
+            frozenset(tickers),
+            None if splits is None else splits.freeze(),
+            None if dividends is None else dividends.freeze(),
+        )
+        # Rebinding a reference is atomic, readers see either the previous snapshot or this one
+        self._current = snapshot
+        # A thread publishing inside its own pinned pass reads its own writes
+        if getattr(self._pinned, "snapshot", None) is not None:
+            self._pinned.snapshot = snapshot
+        return snapshot
+
+    @contextmanager
+    def pinned(self) -> Iterator[PriceSnapshot]:
+        """Pin latest snapshot for the calling thread during the context (i.e. a whole render pass)."""
+        previous = getattr(self._pinned, "snapshot", None)
+        self._pinned.snapshot = previous if previous is not None else self._current
+        try:
+            yield self._pinned.snapshot
+        finally:
+            self._pinned.snapshot = previous
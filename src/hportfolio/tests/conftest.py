@@ -0,0 +1,62 @@
+"""Fixtures shared by the tests."""
+
+import copy
+
+import numpy as np
+import pytest
+from pandas import DataFrame, date_range, to_datetime
+
+from hportfolio.portfolio import PortfolioHistory
+from hportfolio.price_store import PriceMatrix
+
+# 10 shares of A bought on 2024-01-01 and 10 more on 2024-01-05, funded by two deposits
+DATA = {
+    "operations": {"deposit": {"2024-01-01": 1000, "2024-01-05": 500}},
+    "status": {
+        "2024-01-01": {"stocks": {"A": 10, "LIQUIDITY": 500}},
+        "2024-01-05": {"stocks": {"A": 20, "LIQUIDITY": 500}},
+        "last": {"stocks": {"A": 20, "LIQUIDITY": 500}},
+    },
+}
+
+
+def actions_matrix(actions: dict[str, dict[str, float]]) -> PriceMatrix:
+    """Matrix of corporate actions given by ticker and ex-date (format of the corporate actions table)."""
+    matrix = PriceMatrix("2024-01-01")
+    actions_df = DataFrame(actions, dtype=float)
+    actions_df.index = to_datetime(actions_df.index)
+    matrix.write(actions_df.sort_index())
+    return matrix
+
+
+@pytest.fixture
+def portfolio_data() -> dict:
+    """Data file content of DATA (a copy, so tests can change it)."""
+    return copy.deepcopy(DATA)
+
+
+@pytest.fixture
+def prices() -> PriceMatrix:
+    """Prices of A rising 1 per day from 50 on 2024-01-01 until 2024-01-10 (no price on weekends)."""
+    prices = PriceMatrix("2024-01-01")
+    dates = date_range("2024-01-01", "2024-01-10", freq="B")
+    prices.write(DataFrame({"A": 50.0 + np.arange(len(dates))}, index=dates))
+    return prices
+
+
+@pytest.fixture
+def make_history(prices: PriceMatrix):
+    """Factory of portfolio histories from 2024-01-01 to 2024-01-14.
+
+    The factory takes the data file content, and optionally splits and dividends by ticker and ex-date, and the
+    prices (the prices fixture if not given).
+    """
+
+    def make(data: dict, splits: dict | None = None, dividends: dict | None = None, prices: PriceMatrix = prices) -> PortfolioHistory:
+        return PortfolioHistory(
+            data, prices, "2024-01-01", "2024-01-14",
+            None if splits is None else actions_matrix(splits),
+            None if dividends is None else actions_matrix(dividends),
+        )
+
+    return make
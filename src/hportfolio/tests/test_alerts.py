@@ -0,0 +1,36 @@
+"""Tests for alerts rule engine."""
+
+from hportfolio.alerts import AlertEngine
+
+RULES = [
+    {"ticker": "NVDA", "type": "price_above", "value": 100, "hysteresis": 5},
+    {"ticker": "NVDA", "type": "drawdown_from_cost", "value": 10},
+    {"ticker": "AMD", "type": "daily_move", "value": 3, "cooldown": 60},
+    {"ticker": "PORTFOLIO", "type": "pnl_below", "value": 0},
+    {"ticker": "KO", "type": "unknown", "value": 1},
+]
+
+
+def test_hysteresis():
+    """Rule fires once when crossing, and only fires again after moving back beyond hysteresis."""
+    engine = AlertEngine(RULES)
+    assert len(engine.rules) == 4
+    fired = []
+    engine.add_sink(fired.extend)
+    assert [event.rule for event in engine.on_prices(["NVDA"], [101], unit_cost=[80], now=0)] == [0]
+    assert engine.on_prices(["NVDA"], [97], unit_cost=[80], now=1) == []
+    assert engine.on_prices(["NVDA"], [102], unit_cost=[80], now=2) == []
+    assert engine.on_prices(["NVDA"], [94], unit_cost=[80], now=3) == []
+    assert [event.rule for event in engine.on_prices(["NVDA"], [101], unit_cost=[80], now=4)] == [0]
+    assert [event.rule for event in engine.on_prices(["NVDA"], [70], unit_cost=[80], now=5)] == [1]
+    assert len(fired) == 3
+
+
+def test_cooldown_and_portfolio():
+    """Rule does not fire again before its cooldown, and unchanged tickers are not evaluated."""
+    engine = AlertEngine(RULES)
+    assert len(engine.on_prices(["AMD", "KO"], [100, 50], daily_move=[-4, 9], pnl=-10, now=0)) == 2
+    engine.on_prices(["AMD"], [101], daily_move=[1], now=10)
+    assert engine.on_prices(["AMD"], [96], daily_move=[-4], now=20) == []
+    assert engine.on_prices(["AMD"], [95], daily_move=[-5], now=70)[0].ticker == "AMD"
+    assert engine.on_prices(["AMD"], [95], daily_move=[-5], pnl=-10, now=200) == []
@@ -0,0 +1,33 @@
+"""Tests for P&L attribution."""
+
+import numpy as np
+
+from hportfolio.attribution import OTHER, Attribution, breakdown_html, stack_bands
+
+
+def test_contributions_add_up_to_market_moves(make_history, portfolio_data: dict):
+    """Contributions add up to the change of the portfolio on days without trades or deposits."""
+    history = make_history(portfolio_data)
+    attribution = Attribution.from_history(history)
+    a = history.columns["A"]
+    # Held 10 shares of A on 2024-01-02 (price 50 -> 51), and 20 on 2024-01-08 (54 -> 55)
+    assert attribution.daily[history.row_of("2024-01-02"), a] == 10
+    assert attribution.daily[history.row_of("2024-01-08"), a] == 20
+    no_flows = np.ones(len(history.dates), dtype=bool)
+    no_flows[history.change_rows] = False
+    no_flows[0] = False
+    np.testing.assert_allclose(attribution.daily.sum(axis=1)[no_flows], np.diff(history.total, prepend=0)[no_flows])
+    assert attribution.breakdown(history.row_of("2024-01-08")) == [("A", 20.0, 10 * 4 + 20)]
+    assert breakdown_html(attribution, history.row_of("2024-01-08")).endswith("A: <span style='color: #0ec43e;'>$+20</span> (total $+60)")
+
+
+def test_top_groups_and_stacking():
+    """Smallest contributors are grouped as Other, and negative groups stack below zero."""
+    daily = np.array([[0.0, 0, 0], [5, -2, 1], [5, -2, 1]])
+    attribution = Attribution(np.arange("2024-01-01", "2024-01-04", dtype="datetime64[D]"), ["A", "B", "C"], daily, daily.cumsum(axis=0))
+    names, groups = attribution.top_groups(1)
+    assert names == ["A", OTHER]
+    np.testing.assert_array_equal(groups[:, -1], [10, -2])
+    lower, upper = stack_bands(np.array([[3.0], [-1.0], [2.0], [-4.0]]))
+    np.testing.assert_array_equal(lower[:, 0], [0, -1, 3, -5])
+    np.testing.assert_array_equal(upper[:, 0], [3, 0, 5, -1])
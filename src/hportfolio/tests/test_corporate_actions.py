@@ -0,0 +1,105 @@
+"""Tests for corporate actions (splits and dividends)."""
+
+import numpy as np
+import pytest
+from pandas import DataFrame, date_range, to_datetime
+
+from hportfolio.attribution import Attribution
+from hportfolio.corporate_actions import DIVIDENDS, SPLITS, CorporateActions, split_factors
+from hportfolio.portfolio import TRANSACTION_FEE
+from hportfolio.price_store import PriceMatrix
+
+# 4:1 split of A on 2024-01-08: 10 shares before it are 40 after it
+DATA = {
+    "operations": {"deposit": {"2024-01-01": 1000}},
+    "status": {
+        "2024-01-01": {"stocks": {"A": 10, "LIQUIDITY": 500}},
+        "2024-01-10": {"stocks": {"A": 40, "LIQUIDITY": 520}},
+        "last": {"stocks": {"A": 40, "LIQUIDITY": 520}},
+    },
+}
+SPLITS_A = {"A": {"2024-01-08": 4.0}}
+DIVIDENDS_A = {"A": {"2024-01-04": 0.5}}
+
+
+@pytest.fixture
+def flat_prices() -> PriceMatrix:
+    """Split adjusted prices of A: 12.5 every day (about 50 before the split)."""
+    prices = PriceMatrix("2024-01-01")
+    prices.write(DataFrame({"A": np.full(14, 12.5)}, index=date_range("2024-01-01", "2024-01-14")))
+    return prices
+
+
+def test_split_factors():
+    """Factor of a date is the product of the splits after it, the split of the ex-date itself is already applied."""
+    splits = PriceMatrix("2024-01-01")
+    splits.write(DataFrame({"A": [2.0, 3.0]}, index=to_datetime(["2024-01-05", "2024-01-10"])))
+    factors = split_factors(splits, ["A", "B"], ["2023-12-01", "2024-01-04", "2024-01-05", "2024-01-10", "2025-01-01"])
+    assert factors[:, 0].tolist() == [6, 6, 3, 1, 1]
+    assert factors[:, 1].tolist() == [1] * 5
+
+
+def test_split_is_not_a_trade(make_history, flat_prices: PriceMatrix):
+    """Quantities before a split are converted to split adjusted units, so the split neither trades nor moves value."""
+    history = make_history(DATA, SPLITS_A, DIVIDENDS_A, flat_prices)
+    a = history.columns["A"]
+    assert history.holdings[:, a].tolist() == [40] * 14
+    rows, deltas = history.trades("A")
+    assert rows.tolist() == [0]
+    assert deltas.tolist() == [40]
+    assert history.cost[a] == 40 * 12.5 + TRANSACTION_FEE
+
+
+def test_dividends_accrue_until_next_snapshot(make_history, flat_prices: PriceMatrix):
+    """Dividends are paid on the quantity held the day before the ex-date, and count as cash until next snapshot."""
+    history = make_history(DATA, SPLITS_A, DIVIDENDS_A, flat_prices)
+    a, liquidity = history.columns["A"], history.columns["LIQUIDITY"]
+    assert history.dividends[history.row_of("2024-01-04"), a] == 40 * 0.5
+    assert history.accrued_dividends[history.row_of("2024-01-03")] == 0
+    assert history.accrued_dividends[history.row_of("2024-01-09")] == 20
+    # Snapshot of 01-10 records the dividend in LIQUIDITY
+    assert history.accrued_dividends[history.row_of("2024-01-10")] == 0
+    assert history.total[history.row_of("2024-01-09")] == 40 * 12.5 + 520
+    state = history.at(["2024-01-09"])
+    assert state.pnl[0, liquidity] == 0
+    attribution = Attribution.from_history(history)
+    assert attribution.cumulative[-1, a] == 20
+
+
+def test_record_new_split_adjusts_older_dividends():
+    """A split after the previous downloads adjusts older dividends. Splits older than them were already applied."""
+    actions = CorporateActions()
+    index = to_datetime(["2024-01-04", "2024-01-08"])
+    actions.record(DataFrame({"A": [0.0, 0.0]}, index=index), DataFrame({"A": [2.0, 0.0]}, index=index), {"A": "2024-01-05"})
+    new_splits = actions.record(
+        DataFrame({"A": [4.0], "B": [2.0]}, index=index[1:]), DataFrame({"A": [0.0], "B": [0.0]}, index=index[1:]), {"A": "2024-01-08", "B": "2024-01-08"},
+    )
+    assert new_splits == [("A", "2024-01-08", 4.0), ("B", "2024-01-08", 2.0)]
+    assert actions.dividends["A"] == {"2024-01-04": 0.5}
+    # Same split downloaded again (i.e. a backfill) is not new
+    assert actions.record(DataFrame({"A": [4.0]}, index=index[1:]), DataFrame({"A": [0.0]}, index=index[1:]), {"A": "2024-01-08"}) == []
+    assert actions.to_frame(SPLITS, ["A", "C"]).columns.tolist() == ["A"]
+    assert actions.to_frame(DIVIDENDS, ["A"])["A"].tolist() == [0.5]
+
+
+def test_split_of_stale_ticker_is_new():
+    """A split is new if it is after the last cached price of its own ticker, even if other tickers are cached past it."""
+    prices = PriceMatrix("2024-01-01")
+    prices.write(DataFrame({"A": [10.0] * 10, "B": [20.0] * 5 + [np.nan] * 5}, index=date_range("2024-01-01", periods=10)))
+    assert prices.last_date("B") == "2024-01-05"
+    assert prices.last_date("C") is None
+    index = to_datetime(["2024-01-08"])
+    last_fetched = {symbol: prices.last_date(symbol) for symbol in ("A", "B", "C")}
+    new_splits = CorporateActions().record(DataFrame({"A": [2.0], "B": [2.0], "C": [2.0]}, index=index), DataFrame(index=index), last_fetched)
+    # A was cached after the split (already adjusted), and C was never cached
+    assert new_splits == [("B", "2024-01-08", 2.0)]
+
+
+def test_scale_prices_before_split():
+    """Prices of a ticker before a date are adjusted in place, the rest are left as they are."""
+    prices = PriceMatrix("2024-01-01")
+    prices.write(DataFrame({"A": [40.0, 40.0, 10.0], "B": [1.0, 1.0, 1.0]}, index=date_range("2024-01-01", periods=3)))
+    prices.scale("A", "2024-01-03", 0.25)
+    prices.scale("C", "2024-01-03", 0.25)
+    assert prices.to_frame()["A"].tolist() == [10.0, 10.0, 10.0]
+    assert prices.to_frame()["B"].tolist() == [1.0, 1.0, 1.0]
@@ -0,0 +1,41 @@
+"""Tests for FX rates store."""
+
+import numpy as np
+from pandas import DataFrame, date_range
+
+from hportfolio.fx_rates import FxRateStore
+
+
+def test_currency_metadata():
+    """Explicit metadata wins over suffix inference, unknown listings fall back to base currency."""
+    fx_rates = FxRateStore("USD", {"TSM": "USD", "2330.TW": "TWD"})
+    assert fx_rates.get_currency("ASML.AS") == "EUR"
+    assert fx_rates.get_currency("2330.TW") == "TWD"
+    assert fx_rates.get_currency("TSM") == "USD"
+    assert fx_rates.get_currency("LIQUIDITY") == "USD"
+    assert fx_rates.required_pairs(["ASML.AS", "TSM", "BARC.L"]) == {"EURUSD=X", "GBPUSD=X"}
+
+
+def test_convert_price_matrix():
+    """Whole matrix is converted, with gaps in FX history forward filled."""
+    dates = date_range("2024-01-01", periods=4)
+    prices = DataFrame({"ASML.AS": [100.0] * 4, "TSM": [10.0] * 4, "BARC.L": [200.0] * 4}, index=dates)
+    fx_rates = FxRateStore("USD")
+    fx_rates.update(DataFrame({"EURUSD=X": [1.1, np.nan, 1.2], "GBPUSD=X": [1.3, 1.3, 1.3]}, index=dates[[0, 1, 3]]))
+    converted = fx_rates.convert(prices)
+    assert np.allclose(converted["ASML.AS"], [110.0, 110.0, 110.0, 120.0])
+    assert list(converted["TSM"]) == [10.0] * 4
+    assert np.allclose(converted["BARC.L"], 2.6)
+
+
+def test_convert_without_rates():
+    """Prices in currencies without downloaded rates are left unconverted, the rest are converted as usual."""
+    dates = date_range("2024-01-01", periods=3)
+    prices = DataFrame({"ASML.AS": [100.0] * 3, "BARC.L": [200.0] * 3}, index=dates)
+    converted = FxRateStore("USD").convert(prices)
+    assert list(converted["ASML.AS"]) == [100.0] * 3
+    fx_rates = FxRateStore("USD")
+    fx_rates.update(DataFrame({"GBPUSD=X": [1.5] * 3}, index=dates))
+    converted = fx_rates.convert(prices)
+    assert list(converted["ASML.AS"]) == [100.0] * 3
+    assert np.allclose(converted["BARC.L"], 200 * 0.01 * 1.5)
@@ -0,0 +1,95 @@
+"""Tests for broker statements importers."""
+
+import json
+import shutil
+from pathlib import Path
+
+from hportfolio.importers import import_statements, ledger
+from hportfolio.tickers_data import first_changed_date
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+def test_import_and_dedupe(tmp_path):
+    """Statements are merged into snapshots from their first date on, and importing them again adds nothing."""
+    data_file = tmp_path / "data.json"
+    data = {
+        "operations": {"deposit": {"2024-06-01": 2000}, "withdrawal": {}},
+        "status": {
+            "last": {"stocks": {"TSLA": 10, "LIQUIDITY": 500}},
+            "2024-07-05": {"stocks": {"TSLA": 10, "LIQUIDITY": 500}},
+            "2024-06-01": {"stocks": {"TSLA": 0, "LIQUIDITY": 2000}},
+        },
+    }
+    data_file.write_text(json.dumps(data))
+    statements = [shutil.copy(DATA_DIR / name, tmp_path) for name in ("sample_statement.csv", "sample_statement.ofx")]
+
+    results, first_date = import_statements(data_file, statements)
+    assert first_date == "2024-07-01"
+    assert [result.new_rows for result in results] == [5, 3]
+    content = json.loads(data_file.read_text())
+    status = content["status"]
+    assert list(status)[:3] == ["last", "2024-07-15", "2024-07-10"]
+    assert status["2024-06-01"]["stocks"] == {"TSLA": 0, "LIQUIDITY": 2000, "AMD": 0, "NVDA": 0}
+    assert status["2024-07-05"]["stocks"]["AMD"] == 15
+    assert status["2024-07-05"]["stocks"]["NVDA"] == 2
+    assert status["last"]["stocks"] == {"TSLA": 6, "LIQUIDITY": 500 + 1000 - 2403 + 1001 - 251 + 129 + 500, "AMD": 15, "NVDA": 1}
+    assert content["operations"]["deposit"] == {"2024-06-01": 2000, "2024-07-01": 1000, "2024-07-15": 500}
+
+    results, first_date = import_statements(data_file, statements)
+    assert first_date is None
+    assert [result.duplicates for result in results] == [5, 3]
+
+
+def test_unsorted_statement_keeps_identical_trades(tmp_path):
+    """Identical trades of the same day are different trades, even if rows of another day are between them."""
+    data_file = tmp_path / "data.json"
+    data_file.write_text(json.dumps({"operations": {"deposit": {}}, "status": {"last": {"stocks": {"LIQUIDITY": 0}}}}))
+    statement = tmp_path / "unsorted.csv"
+    statement.write_text(
+        "date,action,ticker,quantity,price,fees,amount,id\n"
+        "2024-07-02,Buy,AMD,5,160.00,1.00,,\n"
+        "2024-07-03,Buy,NVDA,1,120.00,1.00,,\n"
+        "2024-07-02,Buy,AMD,5,160.00,1.00,,\n",
+    )
+
+    results, first_date = import_statements(data_file, [statement])
+    assert first_date == "2024-07-02"
+    assert results[0].new_rows == 3
+    status = json.loads(data_file.read_text())["status"]
+    assert status["2024-07-02"]["stocks"]["AMD"] == 10
+    assert status["last"]["stocks"]["AMD"] == 10
+
+    results, first_date = import_statements(data_file, [statement])
+    assert first_date is None
+    assert results[0].duplicates == 3
+
+
+
+def test_identical_rows_across_chunks(tmp_path, monkeypatch):
+    """Identical rows in different chunks are counted together, and a statement with one more copy imports only it."""
+    monkeypatch.setattr(ledger, "CHUNK_ROWS", 2)
+    data_file = tmp_path / "data.json"
+    data_file.write_text(json.dumps({"operations": {"deposit": {}}, "status": {"last": {"stocks": {"LIQUIDITY": 0}}}}))
+    header = "date,action,ticker,quantity,price,fees,amount,id\n"
+    row = "2024-07-02,Buy,AMD,5,160.00,1.00,,\n"
+    statement = tmp_path / "statement.csv"
+    statement.write_text(header + row + "2024-07-03,Buy,NVDA,1,120.00,1.00,,\n" + row * 2)
+    results, _ = import_statements(data_file, [statement])
+    assert results[0].new_rows == 4
+    longer = tmp_path / "longer.csv"
+    longer.write_text(header + row * 4)
+    results, _ = import_statements(data_file, [longer])
+    assert (results[0].new_rows, results[0].duplicates) == (1, 3)
+    assert json.loads(data_file.read_text())["status"]["last"]["stocks"]["AMD"] == 20
+
+def test_first_changed_date():
+    """Recompute after a data file reload starts at the first date whose snapshots or deposits changed."""
+    old = {"operations": {"deposit": {"2024-06-01": 2000}}, "status": {"2024-06-01": {"stocks": {"LIQUIDITY": 2000}}, "last": {"stocks": {"LIQUIDITY": 2000}}}}
+    imported = json.loads(json.dumps(old))
+    imported["status"]["2024-07-02"] = {"stocks": {"AMD": 5, "LIQUIDITY": 1199}}
+    imported["operations"]["deposit"]["2024-07-10"] = 500
+    assert first_changed_date(old, imported, "2024-08-01") == "2024-07-02"
+    assert first_changed_date(old, {**old, "watchlist": ["AMD"]}, "2024-08-01") is None
+    assert first_changed_date(old, {**old, "status": {**old["status"], "last": {"stocks": {"LIQUIDITY": 1}}}}, "2024-08-01") == "2024-08-01"
+    assert first_changed_date(old, {**old, "base_currency": "EUR"}, "2024-08-01") == "2024-06-01"
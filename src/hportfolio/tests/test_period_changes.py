@@ -0,0 +1,44 @@
+"""Tests for day, week, month and YTD changes."""
+
+import numpy as np
+from pandas import DataFrame, date_range
+
+from hportfolio.period_changes import compute_period_changes
+from hportfolio.price_store import PriceMatrix
+
+
+def make_prices() -> PriceMatrix:
+    """A closes on business days only (price is 100 plus days since 2023-12-01), B listed on 2024-03-04."""
+    prices = PriceMatrix("2023-12-01")
+    dates = date_range("2023-12-01", "2024-03-11", freq="B")
+    a = 100.0 + (dates - dates[0]).days.to_numpy()
+    b = np.where(dates >= "2024-03-04", 10.0, np.nan)
+    prices.write(DataFrame({"A": a, "B": b}, index=dates))
+    return prices
+
+
+def test_period_boundaries_and_lookback():
+    """References are previous trading day, 7 and 30 days before and last close of previous year (weekends look back)."""
+    last, changes = compute_period_changes(make_prices(), ["A"], "2024-03-11")
+    price = {date: 100.0 + (np.datetime64(date) - np.datetime64("2023-12-01")).astype(int) for date in ("2024-03-11", "2024-03-08", "2024-03-04", "2024-02-09", "2023-12-29")}
+    assert last[0] == price["2024-03-11"]
+    # Day: Friday before Monday. Week: Monday before. Month: 02-10 is a Saturday, so Friday 02-09. YTD: Friday 12-29.
+    expected = [(price["2024-03-11"] / price[date] - 1) * 100 for date in ("2024-03-08", "2024-03-04", "2024-02-09", "2023-12-29")]
+    np.testing.assert_allclose(changes[0], expected)
+
+
+def test_tickers_without_history_are_nan():
+    """Unknown tickers get NaN everywhere, and recently listed ones NaN for periods before their first close."""
+    last, changes = compute_period_changes(make_prices(), ["B", "C"], "2024-03-11")
+    assert last[0] == 10.0
+    assert changes[0, :2].tolist() == [0.0, 0.0]
+    assert np.isnan(changes[0, 2:]).all()
+    assert np.isnan(last[1])
+    assert np.isnan(changes[1]).all()
+
+
+def test_empty_matrix():
+    """A matrix without prices gives NaN for every ticker."""
+    last, changes = compute_period_changes(PriceMatrix("2024-01-01"), ["A"], "2024-03-11")
+    assert np.isnan(last).all()
+    assert np.isnan(changes).all()
@@ -0,0 +1,97 @@
+"""Tests for vectorized portfolio valuation."""
+
+import numpy as np
+from pandas import DataFrame, date_range
+
+from hportfolio.portfolio import DAILY_ATTRIBUTES, TRANSACTION_FEE, PortfolioHistory
+from hportfolio.price_store import PriceMatrix
+
+
+def test_history_values(make_history, portfolio_data: dict):
+    """Holdings change at snapshot dates, prices are carried over weekends, and invested cash accumulates."""
+    history = make_history(portfolio_data)
+    a = history.columns["A"]
+    assert history.holdings[history.row_of("2024-01-04"), a] == 10
+    assert history.holdings[history.row_of("2024-01-05"), a] == 20
+    # Saturday uses Friday close
+    assert history.prices[history.row_of("2024-01-06"), a] == 54
+    assert history.total[0] == 10 * 50 + 500
+    assert history.invested[history.row_of("2024-01-04")] == 1000
+    assert history.invested[-1] == 1500
+    assert history.cost[a] == 10 * 50 + 10 * 54 + 2 * TRANSACTION_FEE
+    assert history.cost_history[history.row_of("2024-01-04"), a] == 10 * 50 + TRANSACTION_FEE
+    rows, deltas = history.trades("A")
+    assert history.dates[rows].astype(str).tolist() == ["2024-01-01", "2024-01-05"]
+    assert deltas.tolist() == [10, 10]
+
+
+def test_resample(make_history, portfolio_data: dict):
+    """Week resolution keeps the last day (Sunday) of each week, plus the last day of the range."""
+    history = make_history(portfolio_data)
+    rows = history.resample("2024-01-02", None, "W")
+    assert history.dates[rows].astype(str).tolist() == ["2024-01-07", "2024-01-14"]
+
+
+def test_missing_prices_are_flagged(portfolio_data: dict):
+    """A position without recent price is valued at its last known price, and its days are flagged."""
+    prices = PriceMatrix("2024-01-01")
+    prices.write(DataFrame({"A": [50.0, 51.0]}, index=date_range("2024-01-01", "2024-01-02")))
+    history = PortfolioHistory(portfolio_data, prices, "2024-01-01", "2024-01-14")
+    a = history.columns["A"]
+    last_row = len(history.dates) - 1
+    assert history.values[last_row, a] == 20 * 51
+    assert history.dates[history.flagged_rows[0]] == np.datetime64("2024-01-07")
+    assert history.flagged_rows[-1] == last_row
+
+
+def test_value_at_intraday_times(make_history, portfolio_data: dict):
+    """Intraday bars value the holdings of their day, carrying the last bar and falling back to daily prices."""
+    history = make_history(portfolio_data)
+    times = np.array(["2024-01-04T15:00", "2024-01-05T15:00", "2024-01-05T16:00"], dtype="datetime64[m]")
+    bars = np.array([[60.0], [np.nan], [61.0]])
+    values = history.value_at(times, bars, ["A"])
+    assert values.tolist() == [10 * 60 + 500, 20 * 60 + 500, 20 * 61 + 500]
+    assert history.value_at(times[:1], np.full((1, 1), np.nan), ["A"]).tolist() == [10 * 53 + 500]
+
+
+def test_window_keeps_cost_of_earlier_trades(make_history, portfolio_data: dict, prices: PriceMatrix):
+    """A history starting after some trades values only its window, but keeps the cost basis of those trades."""
+    full = make_history(portfolio_data)
+    window = PortfolioHistory(portfolio_data, prices, "2024-01-08", "2024-01-14")
+    assert len(window.dates) == 7
+    assert window.opening.tolist() == [20, 500]
+    assert window.cost_history[-1].tolist() == full.cost_history[-1].tolist()
+    assert window.total[-1] == full.total[-1]
+    assert window.trades("A")[0].size == 0
+
+
+def test_state_at_many_dates(make_history, portfolio_data: dict):
+    """Batch query returns one row per date (clipped to the history), with P&L from cost basis at each date."""
+    history = make_history(portfolio_data)
+    a = history.columns["A"]
+    state = history.at(["2024-01-04", "2024-01-06", "2030-01-01"])
+    assert state.dates.astype(str).tolist() == ["2024-01-04", "2024-01-06", "2024-01-14"]
+    assert state.holdings[:, a].tolist() == [10, 20, 20]
+    assert state.total.tolist() == [10 * 53 + 500, 20 * 54 + 500, 20 * 57 + 500]
+    assert state.invested.tolist() == [1000, 1500, 1500]
+    assert state.pnl[0, a] == 10 * 53 - (10 * 50 + TRANSACTION_FEE)
+    assert state.pnl[:, history.columns["LIQUIDITY"]].tolist() == [0, 0, 0]
+    assert state.total_pnl[0] == 10 * 53 + 500 - 1000
+    assert history.at("2024-01-04").total.tolist() == [10 * 53 + 500]
+
+
+def test_recompute_from_changed_date(make_history, portfolio_data: dict, prices: PriceMatrix):
+    """Recomputing from the first changed date gives the same history as computing everything again."""
+    history = make_history(portfolio_data)
+    changed = {
+        "operations": {"deposit": {**portfolio_data["operations"]["deposit"], "2024-01-12": 300}},
+        "status": {**portfolio_data["status"], "2024-01-12": {"stocks": {"A": 25, "LIQUIDITY": 500}}, "last": {"stocks": {"A": 25, "LIQUIDITY": 500}}},
+    }
+    recomputed = history.recompute_from(changed, prices, "2024-01-12")
+    full = make_history(changed)
+    for name in DAILY_ATTRIBUTES:
+        np.testing.assert_array_equal(getattr(recomputed, name), getattr(full, name), err_msg=name)
+    np.testing.assert_array_equal(recomputed.change_rows, full.change_rows)
+    np.testing.assert_array_equal(recomputed.trade_deltas, full.trade_deltas)
+    np.testing.assert_array_equal(recomputed.cost, full.cost)
+    assert recomputed.dates[0] == history.dates[0]
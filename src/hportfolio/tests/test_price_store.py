@@ -0,0 +1,85 @@
+"""Tests for columnar price matrix."""
+
+import json
+
+import numpy as np
+from pandas import DataFrame, to_datetime
+
+from hportfolio.price_store import PriceMatrix
+
+DATES = to_datetime(["2024-01-02", "2024-01-03", "2024-01-05"])
+
+
+def test_append_tickers_to_file(tmp_path):
+    """New tickers only grow the file, and another (read-only) instance sees them after refresh."""
+    path = tmp_path / "close.bin"
+    writer = PriceMatrix("2024-01-01", path=path)
+    writer.write(DataFrame({"A": [1.0, 2.0, 3.0], "B": [4.0, np.nan, 6.0]}, index=DATES))
+    writer.flush()
+    reader = PriceMatrix("2024-01-01", path=path, readonly=True)
+    size = path.stat().st_size
+    writer.write(DataFrame({"C": [7.0]}, index=DATES[:1]))
+    writer.flush()
+    assert path.stat().st_size - size == writer.n_days * writer.dtype.itemsize
+    assert reader.refresh()
+    assert reader.tickers == ["A", "B", "C"]
+    assert reader.get("C", "2024-01-02") == 7.0
+    assert np.isnan(reader.get("B", "2024-01-03"))
+    assert reader.get("B", "2024-01-04", lookback=4) == 4.0
+    assert reader.last("A") == 3.0
+
+
+def test_relayout_keeps_prices():
+    """Dates out of the reserved days move the origin or extend the matrix without losing prices."""
+    matrix = PriceMatrix("2024-01-01", dtype="float32")
+    matrix.write(DataFrame({"A": [1.0, 2.0, 3.0]}, index=DATES))
+    matrix.write(DataFrame({"A": [0.5]}, index=to_datetime(["2023-12-25"])))
+    matrix.write(DataFrame({"A": [9.0]}, index=to_datetime(["2026-06-01"])))
+    assert matrix.last_date() == "2026-06-01"
+    assert matrix.get("A", "2023-12-25") == 0.5
+    assert list(matrix.to_frame(end="2024-01-31")["A"]) == [0.5, 1.0, 2.0, 3.0]
+
+
+def test_hourly_matrix_trim_and_reopen(tmp_path):
+    """Intraday matrices index rows by their interval, and trimming moves the origin (also in the file header)."""
+    path = tmp_path / "prices_1h.bin"
+    matrix = PriceMatrix("2024-01-01", dtype="float32", path=path, interval="1h")
+    times = to_datetime(["2024-01-01 10:00", "2024-01-02 15:00", "2024-01-03 09:00"])
+    matrix.write(DataFrame({"A": [1.0, 2.0, 3.0]}, index=times))
+    assert matrix.last_date() == "2024-01-03T09"
+    assert matrix.trim("2024-01-02") == 24
+    reopened = PriceMatrix("2024-01-01", dtype="float32", path=path, interval="1h")
+    assert str(reopened.origin) == "2024-01-02T00"
+    assert list(reopened.to_frame()["A"]) == [2.0, 3.0]
+
+
+def test_trim_keeps_mapped_readers_consistent(tmp_path):
+    """Trimming a file backed matrix replaces the file, so a reader that mapped it keeps the previous rows until refresh."""
+    path = tmp_path / "prices_1h.bin"
+    matrix = PriceMatrix("2024-01-01", path=path, interval="1h")
+    times = to_datetime(["2024-01-01 10:00", "2024-01-02 15:00"])
+    matrix.write(DataFrame({"A": [1.0, 2.0]}, index=times))
+    matrix.flush()
+    reader = PriceMatrix("2024-01-01", path=path, readonly=True)
+    assert matrix.trim("2024-01-02") == 24
+    assert list(reader.to_frame()["A"]) == [1.0, 2.0]
+    assert reader.refresh()
+    assert list(reader.to_frame()["A"]) == [2.0]
+    assert path.stat().st_size == matrix.n_days * matrix.dtype.itemsize
+
+
+def test_coverage_survives_reopen(tmp_path):
+    """First fetched date of each ticker is kept in the header. Caches without it are covered since origin."""
+    path = tmp_path / "close.bin"
+    matrix = PriceMatrix("2024-01-01", path=path)
+    matrix.write(DataFrame({"A": [1.0], "B": [2.0]}, index=DATES[:1]))
+    matrix.mark_covered(["A"], "2024-01-02")
+    matrix.mark_covered(["A"], "2024-01-05")
+    matrix.flush()
+    reopened = PriceMatrix("2024-01-01", path=path)
+    assert reopened.covered_from("A") == "2024-01-02"
+    assert reopened.covered_from("B") is None
+    header = json.loads(reopened.header_path.read_text())
+    del header["coverage"]
+    reopened.header_path.write_text(json.dumps(header))
+    assert PriceMatrix("2024-01-01", path=path).covered_from("B") == "2024-01-01"
@@ -0,0 +1,48 @@
+"""Tests for multi-interval price store."""
+
+import numpy as np
+from pandas import DataFrame, date_range, to_datetime
+
+from hportfolio.price_store import PriceMatrix
+from hportfolio.price_tiers import TieredPriceStore
+
+NOW = np.datetime64("2024-03-10T12:00")
+
+
+def make_store() -> TieredPriceStore:
+    """Store with the default tiers and an in-memory daily tier."""
+    return TieredPriceStore(PriceMatrix("2023-01-01"), now=NOW)
+
+
+def test_minutes_roll_up_into_hours_and_days():
+    """Close of each hour and day is the last minute with price, and provider daily closes are kept."""
+    store = make_store()
+    store.tier("1d").prices.write(DataFrame({"A": [50.0]}, index=to_datetime(["2024-03-08"])))
+    minutes = date_range("2024-03-08 14:58", periods=4, freq="min").append(to_datetime(["2024-03-09 10:00"]))
+    store.write("1m", DataFrame({"A": [1.0, 2.0, np.nan, 4.0, 5.0], "B": [1.0, np.nan, np.nan, np.nan, np.nan]}, index=minutes))
+    hours = store.tier("1h").prices.to_frame()
+    assert list(hours["A"]) == [2.0, 4.0, 5.0]
+    assert np.isnan(hours["B"].iloc[1])
+    days = store.tier("1d").prices.to_frame(start="2024-03-08")
+    assert list(days["A"]) == [50.0, 5.0]
+    assert list(days["B"].iloc[:1]) == [1.0]
+
+
+def test_select_tier_by_range():
+    """Finest tier whose retention covers the range and with few enough points is picked."""
+    store = make_store()
+    assert store.select_tier("2024-03-09T12:00", "2024-03-10T12:00", now=NOW).interval == "1m"
+    assert store.select_tier("2024-03-01", "2024-03-10", now=NOW).interval == "1h"
+    assert store.select_tier("2023-06-01", "2024-03-10", now=NOW).interval == "1d"
+    assert store.select_tier("2024-03-01", "2024-03-10", max_points=100, now=NOW).interval == "1d"
+
+
+def test_retention_drops_expired_rows():
+    """Rows older than the retention are dropped once they exceed the headroom."""
+    store = make_store()
+    store.write("1m", DataFrame({"A": [1.0, 2.0]}, index=to_datetime(["2024-03-04 10:00", "2024-03-10 10:00"])))
+    store.enforce_retention(np.datetime64("2024-03-20T00:00"))
+    minutes = store.tier("1m").prices
+    assert str(minutes.origin) == "2024-03-13T00:00"
+    assert minutes.to_frame().empty
+    assert store.tier("1d").prices.get("A", "2024-03-10") == 2.0
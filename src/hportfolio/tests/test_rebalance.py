@@ -0,0 +1,58 @@
+"""Tests for target-weight rebalancing."""
+
+import numpy as np
+import pytest
+from pandas import DataFrame, date_range
+
+from hportfolio.price_store import PriceMatrix
+from hportfolio.rebalance import Rebalancer
+
+
+def make_rebalancer() -> Rebalancer:
+    """Portfolio of 3500: A (1000, in gains), B (none yet), C (2000, in gains) and 500 of cash."""
+    return Rebalancer(["A", "B", "C"], [100, 0, 10], [10, 50, 200], 500, unit_cost=[5, 50, 100])
+
+
+def test_plan_trades_out_of_band_tickers_only():
+    """A is within its band and does not trade. C is sold back to target and funds the buys of B."""
+    rebalancer = make_rebalancer()
+    plan = rebalancer.plan(rebalancer.target_matrix({"A": 0.3, "B": 0.3, "C": 0.35}), tolerance=0.02)
+    assert plan.orders() == [{"ticker": "C", "shares": -4}, {"ticker": "B", "shares": 21}]
+    assert plan.fees[0] == 2
+    assert plan.cash_after[0] == 500 + 4 * 200 - 21 * 50 - 2
+    assert plan.realized_gains[0] == 4 * (200 - 100)
+    assert plan.drift_after[0] == 0
+
+
+def test_minimize_gains_and_scenarios():
+    """Appreciated shares are only sold to the band edge, and each scenario is solved independently."""
+    rebalancer = make_rebalancer()
+    targets = rebalancer.target_matrix([{"A": 0.3, "B": 0.3, "C": 0.3}, {"A": 0.3, "C": 0.7}])
+    plan = rebalancer.plan(targets, tolerance=0.05)
+    plan_min_gains = rebalancer.plan(targets, tolerance=0.05, minimize_gains=True)
+    np.testing.assert_array_equal(plan.trades, [[0, 21, -5], [0, 0, 2]])
+    np.testing.assert_array_equal(plan_min_gains.trades[0], [0, 21, -4])
+    assert plan_min_gains.realized_gains[0] < plan.realized_gains[0]
+    assert (plan.cash_after >= 0).all()
+
+
+def test_target_tickers_not_held():
+    """Target tickers not held yet are added with zero shares at their last price, and fail if there is no price."""
+    prices = PriceMatrix("2024-01-01")
+    prices.write(DataFrame({"D": [20.0, 25.0, np.nan]}, index=date_range("2024-01-01", periods=3)))
+    rebalancer = make_rebalancer()
+    plan = rebalancer.plan(rebalancer.target_matrix({"A": 0.3, "C": 0.5, "D": 0.15}, prices), tolerance=0.02)
+    assert rebalancer.tickers == ["A", "B", "C", "D"]
+    assert plan.orders() == [{"ticker": "C", "shares": -1}, {"ticker": "D", "shares": 21}]
+    with pytest.raises(ValueError, match="No price of E"):
+        rebalancer.target_matrix({"E": 0.1}, prices)
+
+
+def test_malformed_target_is_a_usage_error(capsys: pytest.CaptureFixture):
+    """A --target without weight is reported by the parser instead of raising."""
+    from hportfolio.__main__ import main
+
+    with pytest.raises(SystemExit) as exit_info:
+        main(["rebalance", "--target", "AAPL"])
+    assert exit_info.value.code == 2
+    assert "expected TICKER=WEIGHT, got 'AAPL'" in capsys.readouterr().err
@@ -0,0 +1,149 @@
+"""Tests for the local HTTP/JSON server."""
+
+import asyncio
+import json
+import socket
+from pathlib import Path
+
+import numpy as np
+import pytest
+from pandas import DataFrame, date_range
+
+from hportfolio import server
+from hportfolio.price_store import PriceMatrix
+from hportfolio.server import PortfolioServer
+from hportfolio.tickers_data import CLOSE_CACHE_FILE
+
+
+@pytest.fixture
+def portfolio_server(tmp_path: Path, portfolio_data: dict) -> PortfolioServer:
+    """Server of portfolio_data with cached prices of A (50 plus 1 per business day until 2024-01-31), without network access."""
+    data_file = tmp_path / "data.json"
+    data_file.write_text(json.dumps(portfolio_data), encoding="utf8")
+    prices = PriceMatrix("2024-01-01", path=tmp_path / CLOSE_CACHE_FILE)
+    dates = date_range("2024-01-01", "2024-01-31", freq="B")
+    prices.write(DataFrame({"A": 50.0 + np.arange(len(dates))}, index=dates))
+    prices.mark_covered(["A"], "2024-01-01")
+    prices.flush()
+    return PortfolioServer(str(data_file), refresh_interval=0, fetch_prices=False)
+
+
+def request(portfolio_server: PortfolioServer, *targets: str, headers: str = "") -> list[tuple[int, dict, bytes]]:
+    """Send GET requests of targets over one keep-alive connection (in-memory socket pair).
+
+    Returns:
+        List with status, headers and body of each response.
+    """
+
+    async def exchange():
+        server_sock, client_sock = socket.socketpair()
+        server_reader, server_writer = await asyncio.open_connection(sock=server_sock)
+        reader, writer = await asyncio.open_connection(sock=client_sock)
+        serving = asyncio.create_task(portfolio_server.handle_client(server_reader, server_writer))
+        responses = []
+        for target in targets:
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: test\r\n{headers}\r\n".encode("latin-1"))
+            await writer.drain()
+            status_line, *header_lines = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").strip().split("\r\n")
+            response_headers = {name.lower(): value.strip() for name, _, value in (line.partition(":") for line in header_lines)}
+            body = await reader.readexactly(int(response_headers["content-length"]))
+            responses.append((int(status_line.split(" ")[1]), response_headers, body))
+        writer.close()
+        await serving
+        return responses
+
+    return asyncio.run(exchange())
+
+
+def test_routes(portfolio_server: PortfolioServer):
+    """Positions and P&L come from the portfolio history, unknown endpoints are 404."""
+    (status, _, body), (pnl_status, _, pnl_body), (missing, _, _) = request(portfolio_server, "/positions", "/pnl?ticker=A", "/orders")
+    assert status == 200
+    positions = json.loads(body)
+    assert positions["invested"] == 1500
+    assert {position["ticker"]: position["qty"] for position in positions["positions"]} == {"A": 20, "LIQUIDITY": 500}
+    assert pnl_status == 200
+    assert list(json.loads(pnl_body)["tickers"]) == ["A"]
+    assert missing == 404
+
+
+def test_history_parameters(portfolio_server: PortfolioServer):
+    """Start, end and resolution select the rows. Invalid resolution or dates are 400."""
+    (status, _, body), (weekly, _, weekly_body), (bad_resolution, _, _), (bad_date, _, _) = request(
+        portfolio_server,
+        "/history?start=2024-01-03&end=2024-01-06",
+        "/history?start=2024-01-01&end=2024-01-31&resolution=w",
+        "/history?resolution=Y",
+        "/history?start=01/03/2024",
+    )
+    assert status == 200
+    history = json.loads(body)
+    assert history["dates"] == ["2024-01-03", "2024-01-04", "2024-01-05", "2024-01-06"]
+    assert history["invested"] == [1000, 1000, 1500, 1500]
+    # Saturday uses Friday close
+    assert history["value"][-1] == 20 * 54 + 500
+    assert weekly == 200
+    assert json.loads(weekly_body)["resolution"] == "W"
+    assert bad_resolution == 400
+    assert bad_date == 400
+
+
+def test_etag_not_modified(portfolio_server: PortfolioServer):
+    """A request with the ETag of the current response gets a 304 answer without body."""
+    ((status, headers, _),) = request(portfolio_server, "/positions")
+    assert status == 200
+    ((status, not_modified_headers, body),) = request(portfolio_server, "/positions", headers=f"If-None-Match: {headers['etag']}\r\n")
+    assert status == 304
+    assert not_modified_headers["etag"] == headers["etag"]
+    assert body == b""
+
+
+def test_cache_invalidation(portfolio_server: PortfolioServer, portfolio_data: dict):
+    """Responses are cached until the data file is reloaded or a new prices snapshot is published."""
+    ((_, headers, _),) = request(portfolio_server, "/history?start=2024-01-10&end=2024-01-10")
+    history = portfolio_server.history
+    request(portfolio_server, "/history?start=2024-01-10&end=2024-01-10")
+    assert portfolio_server.history is history
+
+    portfolio_data["operations"]["deposit"]["2024-01-08"] = 250
+    portfolio_server.data_file.write_text(json.dumps(portfolio_data), encoding="utf8")
+    portfolio_server.tickers_data.reload_data_file()
+    portfolio_server.data_version += 1
+    ((_, reloaded_headers, body),) = request(portfolio_server, "/history?start=2024-01-10&end=2024-01-10")
+    assert json.loads(body)["invested"] == [1750]
+    assert reloaded_headers["etag"] != headers["etag"]
+
+    tickers_data = portfolio_server.tickers_data
+    snapshot = tickers_data.snapshots.latest
+    tickers_data.snapshots.publish(snapshot.prices.copy(), snapshot.tickers)
+    request(portfolio_server, "/history?start=2024-01-10&end=2024-01-10")
+    assert portfolio_server.version == (1, snapshot.version + 1)
+
+
+def test_watcher_survives_fetch_errors(portfolio_server: PortfolioServer, portfolio_data: dict, monkeypatch: pytest.MonkeyPatch):
+    """Reloaded data is swapped in once the price fetch is over, even if it failed (the error is only logged)."""
+    monkeypatch.setattr(server, "WATCH_INTERVAL", 0.01)
+    calls = []
+
+    def fail(tickers):
+        # New data is only swapped in after the fetch
+        calls.append((tickers, portfolio_server.tickers_data.data_content["operations"]["deposit"].get("2024-01-08")))
+        msg = "network down"
+        raise ConnectionError(msg)
+
+    monkeypatch.setattr(portfolio_server.tickers_data, "get_tickers_value", fail)
+
+    async def watch():
+        watcher = asyncio.create_task(portfolio_server.watch_data_file())
+        for deposit in (250, 300):
+            portfolio_data["operations"]["deposit"]["2024-01-08"] = deposit
+            version = portfolio_server.data_version
+            await asyncio.sleep(0.05)
+            portfolio_server.data_file.write_text(json.dumps(portfolio_data), encoding="utf8")
+            while portfolio_server.data_version == version:
+                await asyncio.sleep(0.01)
+        watcher.cancel()
+
+    asyncio.run(asyncio.wait_for(watch(), 5))
+    assert calls == [(["A"], None), (["A"], 250)]
+    assert portfolio_server.tickers_data.data_content["operations"]["deposit"]["2024-01-08"] == 300
@@ -0,0 +1,33 @@
+"""Tests for price snapshots."""
+
+import threading
+
+import pytest
+from pandas import DataFrame, to_datetime
+
+from hportfolio.snapshots import SnapshotPublisher
+
+DATES = to_datetime(["2024-01-02"])
+
+
+def publish_price(publisher: SnapshotPublisher, price: float):
+    """Publish next snapshot with a new price of ticker A."""
+    prices = publisher.latest.prices.copy()
+    prices.write(DataFrame({"A": [price]}, index=DATES))
+    publisher.publish(prices, {"A"})
+
+
+def test_pinned_snapshot_is_stable():
+    """A pinned reader keeps its snapshot while another thread publishes, and published data is immutable."""
+    publisher = SnapshotPublisher("2024-01-01")
+    publish_price(publisher, 1.0)
+    with publisher.pinned() as snapshot:
+        writer = threading.Thread(target=publish_price, args=(publisher, 2.0))
+        writer.start()
+        writer.join()
+        assert publisher.current is snapshot
+        assert publisher.current.prices.get("A", "2024-01-02") == 1.0
+        assert publisher.latest.version == snapshot.version + 1
+    assert publisher.current.prices.get("A", "2024-01-02") == 2.0
+    with pytest.raises(ValueError, match="read-only"):
+        publisher.current.prices.write(DataFrame({"A": [3.0]}, index=DATES))
@@ -0,0 +1,21 @@
+"""Tests for startup cost of the data modules."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_PATH = str(Path(__file__).resolve().parents[2])
+
+
+def test_data_modules_do_not_import_heavy_dependencies():
+    """Pandas and yfinance are only loaded once prices are converted or downloaded, not at import time."""
+    code = "import sys, hportfolio.tickers_data, hportfolio.server; print(sorted({'pandas', 'yfinance'} & set(sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=SRC_PATH, capture_output=True, text=True, check=True).stdout  # noqa: S603
+    assert output.strip() == "[]"
+
+
+def test_breakdown_does_not_import_charts():
+    """Breakdown of the crosshair comes from the attribution module, which loads no Qt (charts load with their tab)."""
+    code = "import sys, hportfolio.attribution; print(sorted(module for module in sys.modules if module.startswith('PyQt5') or module == 'hportfolio.attribution_chart'))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=SRC_PATH, capture_output=True, text=True, check=True).stdout  # noqa: S603
+    assert output.strip() == "[]"
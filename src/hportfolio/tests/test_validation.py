@@ -0,0 +1,33 @@
+"""Tests for price validation."""
+
+import numpy as np
+from pandas import DataFrame, bdate_range
+
+from hportfolio.price_store import PriceMatrix
+from hportfolio.validation import EMPTY, GAP, JUMP, STALE, BackfillRequest, backfill_requests, validate_prices
+
+
+def test_validate_prices():
+    """Gaps, stale runs, jumps and empty tickers are found, and only gaps, stale runs and empty tickers are backfilled."""
+    dates = bdate_range("2024-01-01", "2024-03-01")
+    prices_df = DataFrame({ticker: np.linspace(10, 20, len(dates)) + i for i, ticker in enumerate("ABCD")}, index=dates)
+    prices_df.loc["2024-01-10":"2024-01-15", "A"] = np.nan
+    prices_df.loc["2024-02-01":"2024-02-08", "B"] = 15.0
+    prices_df.loc["2024-02-20", "C"] = 50
+    prices_df.loc["2024-02-29", "D"] = np.nan  # Single missing day (holiday) is not a gap
+    prices = PriceMatrix("2024-01-01")
+    prices.write(prices_df)
+    prices.add_tickers(["E"])
+
+    issues = validate_prices(prices)
+    assert [(issue.ticker, issue.kind, issue.start, issue.end) for issue in issues] == [
+        ("A", GAP, "2024-01-10", "2024-01-15"),
+        ("B", STALE, "2024-02-01", "2024-02-08"),
+        ("C", JUMP, "2024-02-20", "2024-02-21"),
+        ("E", EMPTY, "2024-01-01", "2024-03-01"),
+    ]
+    assert backfill_requests(issues) == [
+        BackfillRequest(("E",), "2024-01-01", "2024-03-01"),
+        BackfillRequest(("A",), "2024-01-10", "2024-01-15"),
+        BackfillRequest(("B",), "2024-02-01", "2024-02-08"),
+    ]
@@ -0,0 +1,94 @@
+"""Tests for background task scheduler."""
+
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from PyQt5.QtCore import QCoreApplication, QThread  # noqa: E402
+
+from hportfolio.workers import TaskScheduler  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app() -> QCoreApplication:
+    """Qt application, needed to deliver queued signals."""
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def wait_until(app: QCoreApplication, condition, timeout: float = 5) -> bool:
+    """Process events until condition is True (False on timeout)."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        app.processEvents()
+        time.sleep(0.001)
+    return True
+
+
+def test_duplicate_key_runs_once(app: QCoreApplication):
+    """Submitting a key already in flight joins that task, and each callback gets the result."""
+    scheduler = TaskScheduler(max_threads=1)
+    release = threading.Event()
+    calls = []
+
+    def fetch() -> str:
+        calls.append(1)
+        release.wait(5)
+        return "prices"
+
+    results_a, results_b = [], []
+    scheduler.submit("prices", fetch, callback=results_a.append)
+    scheduler.submit("prices", fetch, callback=results_b.append)
+    assert scheduler.is_running("prices")
+    release.set()
+    assert wait_until(app, lambda: not scheduler.is_running("prices"))
+    assert calls == [1]
+    assert results_a == results_b == ["prices"]
+    scheduler.shutdown()
+
+
+def test_group_cancel_drops_queued_task(app: QCoreApplication):
+    """A new key in a group cancels the previous task of the group. If it is still queued, it never runs."""
+    scheduler = TaskScheduler(max_threads=1)
+    release = threading.Event()
+    ran = []
+    scheduler.submit("busy", release.wait, 5)
+    scheduler.submit("history:2022", ran.append, "2022", group="history")
+    scheduler.submit("history:2021", ran.append, "2021", group="history")
+    assert not scheduler.is_running("history:2022")
+    release.set()
+    assert wait_until(app, lambda: not scheduler.is_running("history:2021"))
+    assert ran == ["2021"]
+    scheduler.shutdown()
+
+
+def test_failure_is_signalled(app: QCoreApplication):
+    """Exceptions of a task are reported through task_failed, and its callback is not called."""
+    scheduler = TaskScheduler()
+    failures, results = [], []
+    scheduler.task_failed.connect(lambda key, message: failures.append((key, message)))
+
+    def fail():
+        msg = "network down"
+        raise RuntimeError(msg)
+
+    scheduler.submit("prices", fail, callback=results.append)
+    assert wait_until(app, lambda: failures)
+    assert failures == [("prices", "network down")]
+    assert results == []
+    scheduler.shutdown()
+
+
+def test_callback_runs_on_owner_thread(app: QCoreApplication):
+    """Task runs in a pool thread, and its callback in the thread owning the scheduler."""
+    scheduler = TaskScheduler()
+    threads = {}
+    scheduler.submit("thread", QThread.currentThread, callback=lambda task_thread: threads.update(task=task_thread, callback=QThread.currentThread()))
+    assert wait_until(app, lambda: threads)
+    assert threads["callback"] is app.thread()
+    assert threads["task"] is not app.thread()
+    scheduler.shutdown()
@@ -0,0 +1,139 @@
+"""Drill-down chart of a single ticker."""
+import numpy as np
+from PyQt5 import QtCore, QtGui
+from PyQt5.QtChart import QChart, QChartView, QDateTimeAxis, QLineSeries, QScatterSeries, QValueAxis
+from PyQt5.QtCore import QPointF, Qt
+from PyQt5.QtGui import QKeyEvent, QPainter
+
+from hportfolio.portfolio import PortfolioHistory
+
+# Margin added above and below the visible values when rescaling the Y axes
+Y_MARGIN = 0.05
+
+
+def to_points(x: np.ndarray, y: np.ndarray) -> list[QPointF]:
+    """Convert arrays to chart points, skipping NaN values."""
+    valid = ~np.isnan(y)
+    return [QPointF(x_, y_) for x_, y_ in zip(x[valid].tolist(), y[valid].tolist(), strict=True)]
+
+
+class TickerChartView(QChartView):
+    """Price, position value, cost basis per share and trades of one ticker.
+
+    Whole history of the ticker is kept as arrays sliced from the portfolio history (no network access). Zooming
+    (rubber band) only re-slices those arrays and rescales the Y axes to the visible range. Press F to reset zoom.
+    """
+
+    def __init__(self, ticker: str, parent: QtCore.QObject | None = None):
+        """Constructor.
+
+        Args:
+            ticker: String with name of the ticker.
+            parent: Optional Qt parent.
+        """
+        self.ticker = ticker
+        chart = QChart()
+        chart.setTitle(ticker)
+        super().__init__(chart, parent)
+        self.setRenderHint(QPainter.Antialiasing)
+        self.setRubberBand(QChartView.HorizontalRubberBand)
+
+        self.series_price = QLineSeries()
+        self.series_price.setName("Price")
+        self.series_unit_cost = QLineSeries()
+        self.series_unit_cost.setName("Cost basis")
+        self.series_unit_cost.setPen(QtGui.QPen(QtGui.QColor("#888888"), 1, Qt.DashLine))
+        self.series_value = QLineSeries()
+        self.series_value.setName("Position value")
+        self.series_buys = QScatterSeries()
+        self.series_buys.setName("Buy")
+        self.series_buys.setColor(QtGui.QColor("#0ec43e"))
+        self.series_buys.setMarkerSize(9)
+        self.series_sells = QScatterSeries()
+        self.series_sells.setName("Sell")
+        self.series_sells.setColor(QtGui.QColor("#de0700"))
+        self.series_sells.setMarkerSize(9)
+
+        self.axis_x = QDateTimeAxis()
+        self.axis_x.setTickCount(12)
+        self.axis_x.setFormat("MM-dd-yyyy")
+        self.axis_x.setLabelsAngle(-90)
+        self.axis_price = QValueAxis()
+        self.axis_price.setTitleText("Price")
+        self.axis_price.setLabelFormat("%.2f")
+        self.axis_value = QValueAxis()
+        self.axis_value.setTitleText("Position value")
+        self.axis_value.setLabelFormat("%d")
+        chart.addAxis(self.axis_x, Qt.AlignBottom)
+        chart.addAxis(self.axis_price, Qt.AlignLeft)
+        chart.addAxis(self.axis_value, Qt.AlignRight)
+        for series, axis_y in (
+            (self.series_value, self.axis_value),
+            (self.series_price, self.axis_price),
+            (self.series_unit_cost, self.axis_price),
+            (self.series_buys, self.axis_price),
+            (self.series_sells, self.axis_price),
+        ):
+            chart.addSeries(series)
+            series.attachAxis(self.axis_x)
+            series.attachAxis(axis_y)
+
+        self.msecs = np.empty(0)
+        self.price = self.value = self.unit_cost = np.empty(0)
+        self.trade_rows = self.trade_deltas = np.empty(0, dtype=np.int64)
+        self.axis_x.rangeChanged.connect(self.on_range_changed)
+
+    def set_history(self, history: PortfolioHistory):
+        """Take the series of the ticker from a portfolio history and show the whole range."""
+        col = history.columns[self.ticker]
+        # Local midnight of each date. Days are not all 24 hours long across DST changes, so they are not evenly spaced.
+        self.msecs = np.array([QtCore.QDateTime(QtCore.QDate.fromString(date, "yyyy-MM-dd")).toMSecsSinceEpoch() for date in history.dates.astype(str).tolist()], dtype=np.float64)
+        qty = history.holdings[:, col]
+        self.price = history.prices[:, col]
+        self.value = np.where(qty > 0, history.values[:, col], np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.unit_cost = np.where(qty > 0, history.cost_history[:, col] / qty, np.nan)
+        self.trade_rows, self.trade_deltas = history.trades(self.ticker)
+        self.show_rows(0, len(self.msecs) - 1)
+
+    def show_rows(self, first: int, last: int):
+        """Show a range of rows (days), adjusting the X axis to it."""
+        if last < first:
+            return
+        self.axis_x.setRange(QtCore.QDateTime.fromMSecsSinceEpoch(int(self.msecs[first])), QtCore.QDateTime.fromMSecsSinceEpoch(int(self.msecs[last])))
+
+    def on_range_changed(self, min_date: QtCore.QDateTime, max_date: QtCore.QDateTime):
+        """Re-slice the series to the visible range (zoom) and rescale Y axes to the visible values."""
+        first = int(np.searchsorted(self.msecs, min_date.toMSecsSinceEpoch(), side="left"))
+        last = int(np.searchsorted(self.msecs, max_date.toMSecsSinceEpoch(), side="right"))
+        # One extra point at each side, so lines reach the borders of the plot
+        visible = slice(max(first - 1, 0), min(last + 1, len(self.msecs)))
+        msecs = self.msecs[visible]
+        price, unit_cost, value = self.price[visible], self.unit_cost[visible], self.value[visible]
+        self.series_price.replace(to_points(msecs, price))
+        self.series_unit_cost.replace(to_points(msecs, unit_cost))
+        self.series_value.replace(to_points(msecs, value))
+
+        in_range = (self.trade_rows >= visible.start) & (self.trade_rows < visible.stop)
+        rows, deltas = self.trade_rows[in_range], self.trade_deltas[in_range]
+        self.series_buys.replace(to_points(self.msecs[rows[deltas > 0]], self.price[rows[deltas > 0]]))
+        self.series_sells.replace(to_points(self.msecs[rows[deltas < 0]], self.price[rows[deltas < 0]]))
+
+        self.fit_axis(self.axis_price, np.concatenate([price, unit_cost]))
+        self.fit_axis(self.axis_value, value)
+
+    @staticmethod
+    def fit_axis(axis: QValueAxis, values: np.ndarray):
+        """Set range of a Y axis to the values shown (if any)."""
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return
+        low, high = float(values.min()), float(values.max())
+        margin = (high - low) * Y_MARGIN or abs(high) * Y_MARGIN or 1
+        axis.setRange(low - margin, high + margin)
+
+    def keyPressEvent(self, event: QKeyEvent) -> None:  # noqa: N802
+        """Hotkeys implementation."""
+        if event.key() == ord("F"):
+            self.show_rows(0, len(self.msecs) - 1)
+        return super().keyPressEvent(event)
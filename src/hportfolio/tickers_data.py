@@ -3,40 +3,123 @@ import json
 import logging
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Callable, ClassVar
-
-import yfinance
-from pandas import DataFrame
-from PyQt5.QtCore import QThread
-
-from hportfolio.workers import FinanceLoadWorker
+from typing import TYPE_CHECKING, Callable, ClassVar
+
+import numpy as np
+
+from hportfolio.corporate_actions import DIVIDENDS, SPLITS, CorporateActions
+from hportfolio.fx_rates import FxRateStore
+from hportfolio.portfolio import TRANSACTION_FEE, PortfolioHistory
+from hportfolio.price_store import PRICE_LOOKBACK_DAYS, PriceMatrix
+from hportfolio.price_tiers import TieredPriceStore
+from hportfolio.snapshots import PriceSnapshot, SnapshotPublisher
+from hportfolio.validation import BackfillRequest, PriceIssue, backfill_requests, validate_prices
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+    from hportfolio.workers import TaskScheduler
+
+# Name of the file (next to the data file) caching close prices and FX rates. Closes are adjusted for splits only
+# (dividends are cash flows), so caches of dividend adjusted closes (in "cache/") are not reused.
+CLOSE_CACHE_FILE = "cache/v2/close_prices.bin"
+# Name of the file (next to the close prices) caching splits and dividends
+CORPORATE_ACTIONS_FILE = "corporate_actions.json"
+# Days of history loaded at startup. Older history is loaded on demand (extend_window)
+INITIAL_WINDOW_DAYS = 365
+# Keys of the data file that do not change the portfolio history
+NON_HISTORY_KEYS = ("watchlist", "alerts")
+
+
+def first_changed_date(old_content: dict, new_content: dict, today: str) -> str | None:
+    """Get first date where portfolio history of two versions of the data file differs.
+
+    Args:
+        old_content: Previous portfolio data.
+        new_content: New portfolio data.
+        today: String with current date, in format YYYY-MM-DD. Changes of current positions affect only it.
+
+    Returns:
+        String with the date (format YYYY-MM-DD), or None if history did not change. Changes that are not tied to a
+        date (i.e. currencies) return the first date of the data.
+    """
+    old_rest = {key: value for key, value in old_content.items() if key not in ("status", "operations", *NON_HISTORY_KEYS)}
+    new_rest = {key: value for key, value in new_content.items() if key not in ("status", "operations", *NON_HISTORY_KEYS)}
+    by_date = [(old_content.get("status", {}), new_content.get("status", {}))]
+    by_date += [(old_content.get("operations", {}).get(name, {}), new_content.get("operations", {}).get(name, {})) for name in ("deposit", "withdrawal")]
+    changed = [date for old, new in by_date for date in old.keys() | new.keys() if date != "last" and old.get(date) != new.get(date)]
+    if old_rest != new_rest:
+        all_dates = [date for old, new in by_date for date in old.keys() | new.keys() if date != "last"]
+        return min(all_dates, default=today)
+    if changed:
+        return min(changed)
+    if old_content.get("status", {}).get("last") != new_content.get("status", {}).get("last"):
+        return today
+    return None
+
+
+def data_tickers(data_content: dict) -> list[str]:
+    """Get every ticker of portfolio data: the ones held at some point plus the watchlist (excludes liquidity)."""
+    status = data_content["status"]
+    tickers = [ticker for date in status for ticker in status[date]["stocks"]] + data_content.get("watchlist", [])
+    return [ticker for ticker in dict.fromkeys(tickers) if ticker != "LIQUIDITY"]
 
 
 class TickersData:
     """Class for handling ticker data."""
 
     data_content: ClassVar[dict] = {}
-    historical_price_df: ClassVar[dict] = {}
-    used_tickers: ClassVar[Any] = set()
     loaded_data_path:str = ""
     total_invested:int = 0
     current_portfolio: ClassVar[dict] = {}
     current_portfolio_value:int = 0
     pandl:int = 0
     start_date:str = "2023-03-14"
+    window_start: str = ""
     refresh_callback = None
+    # Last portfolio history, with the version of the prices and the range it was computed for
+    portfolio_history: PortfolioHistory | None = None
+    history_key: tuple | None = None
+    # First date whose history changed since last portfolio history (None if nothing changed)
+    changed_from: str | None = None
+    close_store: PriceMatrix | None = None
+    price_tiers: TieredPriceStore | None = None
+    snapshots: SnapshotPublisher | None = None
+    fx_rates: FxRateStore | None = None
+    corporate_actions: CorporateActions | None = None
 
     # Set-up logger
     logger = logging.getLogger("TickersData")
 
-    def __init__(self, data_file: str, refresh_callback:Callable):
-        """Constructor."""
+    def __init__(self, data_file: str, refresh_callback: Callable | None = None, fetch_prices: bool = True):
+        """Constructor.
+
+        Args:
+            data_file: String with path of JSON data file.
+            refresh_callback: Function called once prices are reloaded in background.
+            fetch_prices: If True, prices are fetched from Yahoo Finance (blocking). Otherwise only cached prices are
+                loaded (no network access) and fetching is left to the caller (i.e. load_current_portfolio in background).
+        """
+        # Issues found in cached prices by the last validation
+        self.price_issues: list[PriceIssue] = []
+        # (ticker, start, end) ranges already backfilled, and (symbol, date) trade prices already fetched, this session
+        self.backfilled: set[tuple] = set()
+        self.fetched_trade_prices: set[tuple] = set()
+        # Tickers whose cached prices were adjusted for a new split, and need to be converted again
+        self.resplit_tickers: set[str] = set()
         load_status = self.load_data_file(data_file)
         if load_status:
             self.loaded_data_path = data_file
             self.__class__.logger.info(f"Successfully loaded {self.loaded_data_path} file.")
+            self.load_start_date()
+            self.load_fx_metadata()
+            self.load_close_cache()
             self.load_total_investment()
-            self.load_current_portfolio(blocking=True,callback=refresh_callback)
+            if fetch_prices:
+                self.load_current_portfolio(blocking=True,callback=refresh_callback)
+            else:
+                self.load_cached_prices()
+                self.reload_current_portfolio_data()
             self.refresh_callback = refresh_callback
             self.__class__.logger.info(f"Total invested: {self.total_invested}")
             self.__class__.logger.info(f"Portfolio value: {self.current_portfolio_value}")
@@ -66,6 +149,15 @@ class TickersData:
         """Get tickers as today (excludes liquidity)."""
         return [x for x in self.data_content["status"]["last"]["stocks"] if x != "LIQUIDITY"]
 
+    def get_watchlist_tickers(self):
+        """Get tickers of the market overview: current tickers plus the ones of the optional "watchlist" list."""
+        return list(dict.fromkeys(self.get_current_tickers() + self.data_content.get("watchlist", [])))
+
+    def get_portfolio_tickers(self):
+        """Get every ticker held at some point (excludes liquidity), needed to value the portfolio history."""
+        status = self.data_content["status"]
+        return [ticker for ticker in dict.fromkeys(ticker for date in status for ticker in status[date]["stocks"]) if ticker != "LIQUIDITY"]
+
     def get_current_tickers_and_liq(self):
         """Get current position (tickers + liquidity)."""
         return self.data_content["status"]["last"]["stocks"]
@@ -88,12 +180,124 @@ class TickersData:
             accum += val
         return accum
 
-    def reload_data_file(self):
-        """Re-loads data from JSON file and updates internal class dictionary."""
+    def read_data_file(self) -> dict:
+        """Read JSON data file, without applying it (see reload_data_file)."""
         with Path(self.loaded_data_path).open(encoding="utf8") as input_fh:
-            self.data_content = json.load(input_fh)
-            return True
-        return False
+            return json.load(input_fh)
+
+    def reload_data_file(self, from_date: str | None = None, content: dict | None = None):
+        """Re-loads data from JSON file and updates internal class dictionary.
+
+        Next portfolio history is only recomputed from the first date that changed.
+
+        Args:
+            from_date: Optional first date changed (i.e. first date affected by a statement import), in format
+                YYYY-MM-DD. If None, it is found by comparing the previous data with the new one.
+            content: Optional data already read with read_data_file (i.e. in another thread). If None, the file is read.
+        """
+        previous_content = self.data_content
+        self.data_content = self.read_data_file() if content is None else content
+        if from_date is None:
+            from_date = first_changed_date(previous_content, self.data_content, self.today())
+        if from_date is not None:
+            self.changed_from = min(from_date, self.changed_from or from_date)
+            self.__class__.logger.info(f"Data file changed from {from_date}")
+        self.load_start_date()
+        self.load_fx_metadata()
+        return True
+
+    def load_start_date(self):
+        """Take start date from the first deposit. Only the last INITIAL_WINDOW_DAYS are loaded until more is requested."""
+        deposits = self.data_content["operations"]["deposit"]
+        if deposits:
+            self.start_date = min(deposits)
+        first_window_date = (datetime.now(timezone.utc).astimezone() - timedelta(days=INITIAL_WINDOW_DAYS)).strftime("%Y-%m-%d")
+        self.window_start = max(self.start_date, self.window_start or first_window_date)
+
+    def extend_window(self, start: str) -> bool:
+        """Load history back to a date (i.e. when the chart shows dates before the loaded window).
+
+        Only the missing range is fetched. Publishes a new prices snapshot, so it should run in background.
+
+        Args:
+            start: String with first date to load, in format YYYY-MM-DD. Clipped to start date.
+
+        Returns:
+            True if the window was extended. False if the date was already loaded.
+        """
+        start = max(start, self.start_date)
+        if start >= self.window_start:
+            return False
+        self.__class__.logger.info(f"Extending loaded history from {self.window_start} to {start}")
+        self.window_start = start
+        self.publish_prices(set())
+        return True
+
+    def load_fx_metadata(self):
+        """Load base currency and per-ticker currencies from data file.
+
+        Optional keys of the data file are "base_currency" (defaults to USD) and "currencies", a dictionary
+        of ticker -> currency for listings that can not be inferred from the ticker suffix (i.e. "ASML.AS").
+        """
+        base_currency = self.data_content.get("base_currency", "USD")
+        currencies = self.data_content.get("currencies", {})
+        if self.fx_rates is None or base_currency != self.fx_rates.base_currency:
+            self.fx_rates = FxRateStore(base_currency, currencies)
+        else:
+            self.fx_rates.currencies = dict(currencies)
+
+    def get_close_cache_path(self) -> Path:
+        """Get path of the file caching close prices and FX rates."""
+        return Path(self.loaded_data_path).parent / CLOSE_CACHE_FILE
+
+    def load_close_cache(self):
+        """Map close prices and FX rates cached by previous fetches (if any).
+
+        Cache is a memory-mapped price matrix, so only the columns of the tickers actually used are read from disk.
+        """
+        cache_path = self.get_close_cache_path()
+        self.close_store = PriceMatrix(self.start_date, path=cache_path)
+        self.price_tiers = TieredPriceStore(self.close_store, cache_path.parent)
+        self.corporate_actions = CorporateActions(cache_path.parent / CORPORATE_ACTIONS_FILE)
+        self.snapshots = SnapshotPublisher(self.start_date)
+        if not self.close_store.tickers:
+            return False
+        self.__class__.logger.info(f"Loaded cached history of {len(self.close_store.tickers)} symbols from {cache_path}")
+        return True
+
+    def save_close_cache(self):
+        """Save close prices, intraday prices, FX rates and corporate actions so next fetches are incremental."""
+        self.close_store.flush()
+        self.price_tiers.flush()
+        self.corporate_actions.flush()
+
+    @property
+    def snapshot(self) -> PriceSnapshot:
+        """Price snapshot pinned by the calling thread, or the latest one if none is pinned."""
+        return self.snapshots.current
+
+    def pinned_snapshot(self):
+        """Context manager that pins the latest price snapshot for a whole pass (i.e. a GUI redraw).
+
+        All price reads of the calling thread inside the context see the same data, even if a background refresh
+        publishes new prices meanwhile.
+        """
+        return self.snapshots.pinned()
+
+    @property
+    def price_matrix(self) -> PriceMatrix:
+        """Immutable price matrix (base currency) of the current snapshot."""
+        return self.snapshot.prices
+
+    @property
+    def used_tickers(self) -> frozenset[str]:
+        """Tickers whose prices were requested so far."""
+        return self.snapshot.tickers
+
+    @property
+    def historical_price_df(self) -> "DataFrame":
+        """Dataframe with historical price (in base currency) of each used ticker."""
+        return self.price_matrix.to_frame()
 
     def load_data_file(self, data_file: str):
         """Loads data from JSON file.
@@ -119,45 +323,50 @@ class TickersData:
         self.total_invested = accum
         return self.total_invested
 
-    def load_current_portfolio(self, blocking = True, callback = None):
+    def load_current_portfolio(self, blocking = True, callback = None, scheduler: "TaskScheduler | None" = None):
         """Get total value of current portfolio.
 
         Args:
-            data_file: String with path of JSON file.
+            blocking: If True, prices are fetched in the calling thread. Otherwise they are fetched by the scheduler.
+            callback: Optional function called once the portfolio data is reloaded (non blocking mode only).
+            scheduler: Task scheduler used in non blocking mode. Repeated calls for the same tickers join the
+                fetch already in flight instead of starting a new one.
 
         Returns:
-            True if file loaded correctly. False otherwise.
+            True if portfolio was loaded or its loading was scheduled.
         """
-        self.current_portfolio = {}
-        tickers = self.get_current_tickers()
+        tickers = list(dict.fromkeys(self.get_watchlist_tickers() + self.get_portfolio_tickers()))
         if blocking:
+            self.current_portfolio = {}
             self.get_tickers_value(tickers, force_load=True) #This function queries yFinance and takes some time
             self.reload_current_portfolio_data()
         else:
-            self.gen_thread = QThread()
-            self.gen_worker = FinanceLoadWorker(self,tickers)
-            self.gen_worker.moveToThread(self.gen_thread)
-            self.gen_thread.started.connect(self.gen_worker.get_tickers_value)
-            self.gen_worker.finished.connect(self.reload_current_portfolio_data)
             if callback:
-                self.gen_worker.finished.connect(callback)
-            self.gen_worker.finished.connect(self.gen_worker.deleteLater)
-            self.gen_worker.finished.connect(self.gen_thread.quit)
-            self.gen_thread.start()
+                self.refresh_callback = callback
+            key = "prices:" + ",".join(sorted(tickers))
+            scheduler.submit(key, self.get_tickers_value, tickers, True, group="portfolio", callback=self.on_portfolio_loaded)  # noqa: FBT003
         return True
 
+    def on_portfolio_loaded(self, _prices: PriceMatrix | None = None):
+        """Reload portfolio data and notify refresh callback once prices were fetched in background."""
+        self.current_portfolio = {}
+        self.reload_current_portfolio_data()
+        if self.refresh_callback:
+            self.refresh_callback()
+
     def reload_current_portfolio_data(self):
         """Update portfolio chart and data."""
         accum = 0
         current_positions_dict = self.data_content["status"]["last"]["stocks"]
-        for stock, qty in current_positions_dict.items():
-            stock_value = self.get_last_price(stock)
-            stock_value_total = stock_value * qty
-            self.current_portfolio[stock] = {
-                "qty": qty,
-                "total": stock_value_total,
-            }
-            accum += stock_value_total
+        with self.pinned_snapshot():
+            for stock, qty in current_positions_dict.items():
+                stock_value = self.get_last_price(stock)
+                stock_value_total = stock_value * qty
+                self.current_portfolio[stock] = {
+                    "qty": qty,
+                    "total": stock_value_total,
+                }
+                accum += stock_value_total
         self.current_portfolio_value = accum
         return True
 
@@ -169,7 +378,7 @@ class TickersData:
         """Get current position in each ticker."""
         return self.current_portfolio
 
-    def get_tickers_value(self, tickers: list, force_load: bool = False) -> DataFrame:
+    def get_tickers_value(self, tickers: list, force_load: bool = False) -> PriceMatrix:
         """Get the value of the tickers on memory (if loaded) or from Yahoo Finance.
 
         Args:
@@ -177,17 +386,287 @@ class TickersData:
             force_load: If True, it will always fetch data from Yahoo Finance. If False, data is reused from a previous fetch (if available).
 
         Returns:
-            A dataframe with historical price for each ticker.
+            Immutable price matrix (base currency) with historical price of each ticker.
         """
-        force_load_ = force_load
-        for ticker in tickers:
-            if ticker not in self.historical_price_df and ticker != "LIQUIDITY":
-                self.used_tickers.add(ticker)
-                force_load_ = True
-        if force_load_:
-            ticker_historic_info = yfinance.Tickers(" ".join(self.used_tickers)).history(interval="1d", start=self.start_date, end=self.tomorrow())
-            self.historical_price_df = ticker_historic_info.iloc[:]["Close"]
-        return self.historical_price_df
+        requested = {ticker for ticker in tickers if ticker != "LIQUIDITY"}
+        if force_load or requested.difference(self.used_tickers):
+            self.publish_prices(requested)
+        return self.price_matrix
+
+    def load_cached_prices(self):
+        """Publish a snapshot with the cached prices of every ticker of the data file, without network access.
+
+        Tickers that are not cached yet are marked as used anyway (without price), so drawing them does not block on a
+        fetch. Next publish_prices call fetches them.
+        """
+        tickers = set(self.get_portfolio_tickers()) | set(self.get_watchlist_tickers())
+        tickers.discard("LIQUIDITY")
+        cached = frozenset(tickers.intersection(self.close_store.columns))
+        with self.snapshots.writer_lock:
+            prices = self.snapshots.latest.prices.copy()
+            if cached:
+                self.fx_rates.update(self.close_store.to_frame(sorted(self.fx_rates.required_pairs(cached))))
+                self.load_base_currency_prices(prices, cached)
+            snapshot = self.snapshots.publish(prices, frozenset(tickers), *self.load_corporate_actions(cached))
+        self.__class__.logger.info(f"Published cached prices snapshot v{snapshot.version} ({len(cached)} of {len(tickers)} tickers cached)")
+
+    def publish_prices(self, tickers: set):
+        """Fetch prices and publish them as a new snapshot. Safe to call from any thread.
+
+        Next snapshot is built from a copy of the latest one, so readers of previous snapshots are never affected.
+
+        Args:
+            tickers: Set of tickers to add to the ones already used.
+        """
+        with self.snapshots.writer_lock:
+            latest = self.snapshots.latest
+            used_tickers = latest.tickers | tickers
+            first_fetched_date = self.fetch_close_history(used_tickers)
+            for first_date in (self.fetch_trade_prices(), self.backfill_close_history(used_tickers)):
+                if first_date:
+                    first_fetched_date = min(first_fetched_date, first_date)
+            prices = latest.prices.copy()
+            # Tickers never converted before need their whole history, otherwise only what was fetched again
+            missing = used_tickers.difference(prices.columns)
+            self.load_base_currency_prices(prices, used_tickers, None if missing else first_fetched_date)
+            # Prices before a new split were adjusted in place, so those tickers are converted again
+            resplit = used_tickers.intersection(self.resplit_tickers)
+            if resplit and not missing:
+                self.load_base_currency_prices(prices, resplit)
+            self.resplit_tickers.difference_update(resplit)
+            snapshot = self.snapshots.publish(prices, used_tickers, *self.load_corporate_actions(used_tickers))
+        self.__class__.logger.info(f"Published prices snapshot v{snapshot.version} ({len(used_tickers)} tickers)")
+        return snapshot
+
+    def fetch_close_history(self, used_tickers: frozenset):
+        """Incrementally update cached close history of used tickers and the FX pairs they need.
+
+        Symbols already cached are only fetched from their last cached date. History before that is fetched only
+        back to the loaded window: symbols never seen, or fetched from a later date, get just the missing range. FX
+        pairs travel in the same request as tickers, so mixed currencies do not add requests.
+
+        Args:
+            used_tickers: Set with name of the tickers.
+
+        Returns:
+            String with first date that was fetched, in format YYYY-MM-DD.
+        """
+        symbols = set(used_tickers) | self.fx_rates.required_pairs(used_tickers)
+        cached = self.close_store
+        known_symbols = sorted(symbols.intersection(cached.columns))
+        # Missing ranges (window start until first fetched date, None if never fetched), grouped by end
+        missing: dict[str | None, list[str]] = {}
+        for symbol in sorted(symbols):
+            covered_from = cached.covered_from(symbol)
+            if covered_from is None or covered_from > self.window_start:
+                missing.setdefault(covered_from, []).append(symbol)
+        # Last cached day is fetched again, since it could have been a live (not yet closed) price
+        first_fetched_date = self.window_start if missing or not known_symbols else cached.last_date()
+        if known_symbols:
+            cached.write(self.download_close(known_symbols, cached.last_date()))
+        for end, missing_symbols in missing.items():
+            cached.write(self.download_close(missing_symbols, self.window_start, end))
+            cached.mark_covered(missing_symbols, self.window_start)
+        self.save_close_cache()
+        self.fx_rates.update(cached.to_frame(sorted(self.fx_rates.required_pairs(used_tickers))))
+        return first_fetched_date
+
+    def fetch_trade_prices(self) -> str | None:
+        """Fetch prices of the days before the loaded window where positions changed (needed for cost basis).
+
+        Only a few days around each trade are downloaded, and each one once per session.
+
+        Returns:
+            String with first date that was fetched (format YYYY-MM-DD), or None if nothing was.
+        """
+        status = self.data_content["status"]
+        previous: dict = {}
+        requests = []
+        for date in sorted(date for date in status if date != "last" and date < self.window_start):
+            stocks = status[date]["stocks"]
+            changed = {ticker for ticker in stocks.keys() | previous.keys() if stocks.get(ticker, 0) != previous.get(ticker, 0)}
+            previous = stocks
+            changed.discard("LIQUIDITY")
+            symbols = changed | self.fx_rates.required_pairs(changed)
+            symbols = sorted(
+                symbol for symbol in symbols
+                if (symbol, date) not in self.fetched_trade_prices and np.isnan(self.close_store.get(symbol, date, lookback=PRICE_LOOKBACK_DAYS))
+            )
+            if symbols:
+                requests.append((date, symbols))
+                self.fetched_trade_prices.update((symbol, date) for symbol in symbols)
+        for date, symbols in requests:
+            first = (datetime.strptime(date, "%Y-%m-%d") - timedelta(days=PRICE_LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+            end = (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+            self.__class__.logger.info(f"Fetching trade prices of {', '.join(symbols)} on {date}")
+            self.close_store.write(self.download_close(symbols, first, end))
+        if not requests:
+            return None
+        self.save_close_cache()
+        fetched = {symbol for _date, symbols in requests for symbol in symbols}
+        self.fx_rates.update(self.close_store.to_frame(sorted(self.fx_rates.required_pairs(fetched))))
+        return (datetime.strptime(requests[0][0], "%Y-%m-%d") - timedelta(days=PRICE_LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+
+    def backfill_close_history(self, used_tickers: frozenset) -> str | None:
+        """Validate cached close history and download again only the (ticker, date range) cells with issues.
+
+        Each range is requested once per session, so issues that can not be fixed (i.e. a delisted ticker) do not
+        trigger a download on every refresh.
+
+        Args:
+            used_tickers: Set with name of the tickers.
+
+        Returns:
+            String with first date that was downloaded again (format YYYY-MM-DD), or None if nothing was.
+        """
+        symbols = sorted(set(used_tickers) | self.fx_rates.required_pairs(used_tickers))
+        self.price_issues = validate_prices(self.close_store, symbols, self.window_start)
+        if self.price_issues:
+            self.__class__.logger.warning(f"Found {len(self.price_issues)} issues in cached prices: {', '.join(map(str, self.price_issues[:5]))}")
+        requests = []
+        for request in backfill_requests(self.price_issues):
+            tickers = tuple(ticker for ticker in request.tickers if (ticker, request.start, request.end) not in self.backfilled)
+            if tickers:
+                requests.append(BackfillRequest(tickers, request.start, request.end))
+                self.backfilled.update((ticker, request.start, request.end) for ticker in tickers)
+        if not requests:
+            return None
+        for request in requests:
+            self.__class__.logger.info(f"Backfilling {', '.join(request.tickers)} from {request.start} to {request.end}")
+            end = (datetime.strptime(request.end, "%Y-%m-%d").astimezone() + timedelta(days=1)).strftime("%Y-%m-%d")
+            self.close_store.write(self.download_close(list(request.tickers), request.start, end))
+        self.save_close_cache()
+        self.fx_rates.update(self.close_store.to_frame(sorted(self.fx_rates.required_pairs(used_tickers))))
+        return min(request.start for request in requests)
+
+    def download_close(self, symbols: list, start: str, end: str | None = None, interval: str = "1d") -> "DataFrame":
+        """Download close prices from Yahoo Finance.
+
+        Args:
+            symbols: List of Yahoo Finance symbols (tickers or FX pairs).
+            start: String with first date to download, in format YYYY-MM-DD.
+            end: Optional string with day after the last one to download, in format YYYY-MM-DD. Defaults to tomorrow.
+            interval: Interval of the bars ("1d", "1h" or "1m").
+
+        Returns:
+            A dataframe of close prices (adjusted for splits, not for dividends) indexed by (timezone naive) date, one
+            column per symbol. Intraday bars are indexed by UTC time.
+        """
+        import yfinance  # Slow to import, so only loaded once prices are actually downloaded
+
+        ticker_historic_info = yfinance.Tickers(" ".join(symbols)).history(interval=interval, start=start, end=end or self.tomorrow(), auto_adjust=False)
+        if interval != "1d":
+            if ticker_historic_info.index.tz is not None:
+                ticker_historic_info.index = ticker_historic_info.index.tz_convert("UTC").tz_localize(None)
+        else:
+            if ticker_historic_info.index.tz is not None:
+                ticker_historic_info.index = ticker_historic_info.index.tz_localize(None)
+            ticker_historic_info.index = ticker_historic_info.index.normalize()
+        ticker_historic_info = ticker_historic_info[~ticker_historic_info.index.duplicated(keep="last")]
+        if interval == "1d" and "Stock Splits" in ticker_historic_info:
+            self.record_corporate_actions(ticker_historic_info["Stock Splits"], ticker_historic_info["Dividends"])
+        return ticker_historic_info.iloc[:]["Close"]
+
+    def record_corporate_actions(self, splits_df: "DataFrame", dividends_df: "DataFrame"):
+        """Record splits and dividends of a download, adjusting cached prices before each split newer than them.
+
+        Older prices are adjusted in place (no download again), and only the tickers with a new split are converted
+        again in the next snapshot. Quantities are converted by PortfolioHistory, from the split ratios.
+
+        Args:
+            splits_df: Dataframe indexed by date with the split ratio of each symbol (0 if no split).
+            dividends_df: Dataframe indexed by date with the dividend per share of each symbol (0 if no dividend).
+        """
+        # Each symbol is compared with its own last price, since symbols are not all fetched up to the same date
+        last_fetched = {symbol: self.close_store.last_date(symbol) for symbol in splits_df.columns}
+        for symbol, ex_date, ratio in self.corporate_actions.record(splits_df, dividends_df, last_fetched):
+            self.__class__.logger.info(f"Adjusting cached prices of {symbol} before {ex_date} for a {ratio:g}:1 split")
+            self.close_store.scale(symbol, ex_date, 1 / ratio)
+            for tier in self.price_tiers.intraday_tiers:
+                tier.prices.scale(symbol, ex_date, 1 / ratio)
+            self.resplit_tickers.add(symbol)
+
+    def fetch_intraday(self, tickers) -> None:
+        """Incrementally update the intraday tiers (minutes, hours) with prices of some tickers and their FX pairs.
+
+        Symbols already cached are only fetched from their last cached time, the rest from the first day kept by the
+        retention of each tier. Daily closes are filled by the rollup only where the daily fetch left no price.
+
+        Args:
+            tickers: Iterable with name of the tickers.
+        """
+        tickers = set(tickers) - {"LIQUIDITY"}
+        symbols = sorted(tickers | self.fx_rates.required_pairs(tickers))
+        if not symbols:
+            return
+        now = np.datetime64("now", "m")
+        with self.snapshots.writer_lock:
+            self.price_tiers.enforce_retention(now)
+            for tier in self.price_tiers.intraday_tiers:
+                # One day inside the retention, since Yahoo Finance rejects ranges starting right at its limit
+                first_kept = str(tier.first_kept(now) + 1)
+                last_date = tier.prices.last_date()
+                cached = [symbol for symbol in symbols if symbol in tier.prices.columns]
+                new = [symbol for symbol in symbols if symbol not in tier.prices.columns]
+                requests = [(new, first_kept)]
+                if cached and last_date:
+                    requests.append((cached, max(last_date[:10], first_kept)))
+                for request_symbols, start in requests:
+                    if not request_symbols:
+                        continue
+                    self.__class__.logger.info(f"Fetching {tier.interval} prices of {request_symbols} from {start}")
+                    try:
+                        self.price_tiers.write(tier.interval, self.download_close(request_symbols, start, interval=tier.interval))
+                    except Exception as e:  # noqa: BLE001
+                        self.__class__.logger.error(f"Cannot fetch {tier.interval} prices: {e}")
+            self.save_close_cache()
+
+    def get_intraday_prices(self, tickers: list[str], start: str, end: str) -> tuple[str, "DataFrame"]:
+        """Get prices (in base currency) of a range at the finest interval that fits it.
+
+        Intraday tiers are fetched (incrementally) only when the range is short enough to use them.
+
+        Args:
+            tickers: List with name of the tickers.
+            start: First date (or time) of the range.
+            end: Last date (or time) of the range.
+
+        Returns:
+            Interval of the prices, and a dataframe indexed by (UTC) time with one column per ticker.
+        """
+        tickers = [ticker for ticker in tickers if ticker != "LIQUIDITY"]
+        if self.price_tiers.select_tier(start, end).interval != "1d":
+            self.fetch_intraday(tickers)
+        interval, prices_df = self.price_tiers.query(tickers, start, end)
+        return interval, self.fx_rates.convert(prices_df)
+
+    def load_base_currency_prices(self, prices: PriceMatrix, used_tickers: frozenset, start: str | None = None):
+        """Load close prices of used tickers, converted to base currency, into an in-memory price matrix.
+
+        Args:
+            prices: Writable price matrix to update.
+            used_tickers: Set with name of the tickers.
+            start: Optional string with first date to load, in format YYYY-MM-DD. If None, whole history is loaded.
+        """
+        prices_df = self.close_store.to_frame(sorted(used_tickers), start=start)
+        prices.write(self.fx_rates.convert(prices_df))
+
+    def load_corporate_actions(self, used_tickers: frozenset) -> tuple[PriceMatrix, PriceMatrix]:
+        """Load splits and dividends (converted to base currency) of used tickers into in-memory matrices.
+
+        Args:
+            used_tickers: Set with name of the tickers.
+
+        Returns:
+            Matrix with the ratio of each split, and matrix with the dividend per share, both at ex-dates.
+        """
+        splits = PriceMatrix(self.start_date)
+        splits.write(self.corporate_actions.to_frame(SPLITS, used_tickers))
+        dividends = PriceMatrix(self.start_date)
+        dividends_df = self.corporate_actions.to_frame(DIVIDENDS, used_tickers)
+        if not dividends_df.empty:
+            dividends.write(self.fx_rates.convert(dividends_df))
+        return splits, dividends
 
     def get_price(self, ticker: str, date: str):
         """Get close price of a ticker on an specific date.
@@ -201,15 +680,14 @@ class TickersData:
         """
         if ticker == "LIQUIDITY":
             return 1
-        if ticker in self.historical_price_df:
-            if date in self.historical_price_df[ticker]:
-                price = self.historical_price_df[ticker][date]
-                return price
-            for i in range(1, 5):  # Go up to 5 days before (to avoid weekends and holidays)
-                date_ = (datetime.strptime(date, "%Y-%m-%d") - timedelta(days=i)).strftime("%Y-%m-%d")
-                if date_ in self.historical_price_df[ticker]:
-                    price = self.historical_price_df[ticker][date_]
-                    return price
+        price = self.price_matrix.get(ticker, date, lookback=PRICE_LOOKBACK_DAYS)  # Go up to PRICE_LOOKBACK_DAYS days before (to avoid weekends and holidays)
+        if not np.isnan(price):
+            return price
+        # Gap in the data: last known price is a better estimate than 0 (affected chart points are flagged)
+        price = self.price_matrix.get(ticker, date, lookback=int(self.price_matrix.day_index(date)))
+        if not np.isnan(price):
+            self.__class__.logger.debug(f"No recent {date} price of {ticker}, using last known one")
+            return price
         self.__class__.logger.error(f"Cannot get {date} price of {ticker}")
         return 0
 
@@ -224,11 +702,29 @@ class TickersData:
         """
         if ticker == "LIQUIDITY":
             return 1
-        if ticker in self.historical_price_df:
-            return self.historical_price_df[ticker][-1]
+        price = self.price_matrix.last(ticker)
+        if not np.isnan(price):
+            return price
         self.__class__.logger.error(f"Cannot get last price of {ticker}")
         return 0
 
+    def get_portfolio_history(self) -> PortfolioHistory:
+        """Get holdings, prices and value of every ticker for every day, from start date until today.
+
+        With the same prices and range as the previous call, the previous history is reused, and only recomputed from
+        the first date changed in the data file (if any).
+        """
+        snapshot = self.snapshot
+        key = (snapshot.version, self.window_start, self.today())
+        if self.portfolio_history is not None and key == self.history_key:
+            if self.changed_from is None:
+                return self.portfolio_history
+            history = self.portfolio_history.recompute_from(self.data_content, snapshot.prices, self.changed_from, snapshot.splits, snapshot.dividends)
+        else:
+            history = PortfolioHistory(self.data_content, snapshot.prices, self.window_start, self.today(), snapshot.splits, snapshot.dividends)
+        self.portfolio_history, self.history_key, self.changed_from = history, key, None
+        return history
+
     @property
     def pandl(self):
         """Get P&L."""
@@ -281,7 +777,7 @@ class TickerObject:
         delta_qty = new_qty - self.qty
         if delta_qty != 0:
             self.cost += delta_qty * price
-            self.cost += 1  # Most brokers charge $1 per transaction
+            self.cost += TRANSACTION_FEE
         self.qty += delta_qty
         self.value = self.qty * price
         return delta_qty != 0
@@ -0,0 +1,158 @@
+"""Validation of stored prices: gaps, stale runs, suspicious jumps and tickers without data."""
+from dataclasses import dataclass
+
+import numpy as np
+
+from hportfolio.price_store import PriceMatrix
+
+# Kinds of issues
+GAP = "gap"
+STALE = "stale"
+JUMP = "jump"
+EMPTY = "empty"
+
+# Fraction of tickers with a price needed to consider a day a trading day
+TRADING_DAY_QUORUM = 0.5
+# Missing trading days in a row reported as a gap (single days are usually local holidays)
+MIN_GAP_DAYS = 2
+# Trading days in a row with exactly the same price reported as stale data
+MIN_STALE_DAYS = 5
+# Relative change between consecutive trading days reported as a suspicious jump (splits, bad ticks)
+JUMP_THRESHOLD = 0.4
+
+
+@dataclass(frozen=True)
+class PriceIssue:
+    """Problem found in the prices of a ticker, over a range of dates (both inclusive)."""
+
+    ticker: str
+    kind: str
+    start: str
+    end: str
+    days: int
+
+    def __str__(self) -> str:
+        """Human readable description."""
+        return f"{self.ticker}: {self.kind} from {self.start} to {self.end} ({self.days} days)"
+
+
+@dataclass(frozen=True)
+class BackfillRequest:
+    """Range of dates (both inclusive) to download again for some tickers."""
+
+    tickers: tuple[str, ...]
+    start: str
+    end: str
+
+
+def find_runs(mask: np.ndarray, min_length: int = 1) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find runs of True values along the first axis of a 2D mask, for all columns at once.
+
+    Args:
+        mask: Boolean array (rows x columns).
+        min_length: Minimum length of the runs returned.
+
+    Returns:
+        Arrays with column, first row and last row (inclusive) of each run, sorted by column and row.
+    """
+    padded = np.zeros((mask.shape[0] + 2, mask.shape[1]), dtype=np.int8)
+    padded[1:-1] = mask
+    edges = np.diff(padded, axis=0)
+    # Transposed, so nonzero() walks column by column and starts and ends of a column pair up in order
+    start_cols, starts = np.nonzero(edges.T == 1)
+    _end_cols, ends = np.nonzero(edges.T == -1)
+    ends -= 1
+    keep = ends - starts + 1 >= min_length
+    return start_cols[keep], starts[keep], ends[keep]
+
+
+def validate_prices(  # noqa: PLR0913
+    prices: PriceMatrix,
+    tickers: list[str] | None = None,
+    start: str | None = None,
+    min_gap_days: int = MIN_GAP_DAYS,
+    min_stale_days: int = MIN_STALE_DAYS,
+    jump_threshold: float = JUMP_THRESHOLD,
+) -> list[PriceIssue]:
+    """Scan the price matrix for issues in a single vectorized pass over all tickers.
+
+    Trading days are the days where most tickers have a price. A gap is a run of trading days without price,
+    after the first price of the ticker (so recently listed tickers are not reported). Missing days at the end of
+    the matrix are reported too, since they mean the ticker stopped updating.
+
+    Args:
+        prices: Price matrix to validate.
+        tickers: Optional list of tickers to validate. Defaults to every ticker of the matrix.
+        start: Optional first date to validate, in format YYYY-MM-DD.
+        min_gap_days: Minimum missing trading days in a row reported as a gap.
+        min_stale_days: Minimum trading days in a row with the same price reported as stale.
+        jump_threshold: Relative change between consecutive trading days reported as a jump.
+
+    Returns:
+        List of issues, sorted by ticker and date.
+    """
+    tickers = list(prices.tickers if tickers is None else tickers)
+    first_row = max(int(prices.day_index(start)), 0) if start else 0
+    if prices.last_day < first_row or not tickers:
+        return []
+    cols = np.array([prices.columns.get(ticker, -1) for ticker in tickers], dtype=np.intp)
+    window = prices.data[first_row:prices.last_day + 1, np.maximum(cols, 0)]
+    window[:, cols < 0] = np.nan
+    valid = ~np.isnan(window)
+    dates = prices.dates()[first_row:prices.last_day + 1]
+
+    issues = []
+    empty = ~valid.any(axis=0)
+    issues += [PriceIssue(tickers[col], EMPTY, str(dates[0]), str(dates[-1]), len(dates)) for col in np.flatnonzero(empty)]
+
+    # Only trading days matter from here on
+    trading = valid[:, ~empty].mean(axis=1) >= TRADING_DAY_QUORUM if (~empty).any() else np.zeros(len(dates), dtype=bool)
+    trading_rows = np.flatnonzero(trading)
+    if trading_rows.size == 0:
+        return issues
+    valid = valid[trading_rows]
+    window = window[trading_rows]
+    dates = dates[trading_rows]
+    listed = np.maximum.accumulate(valid, axis=0)
+
+    def add_runs(kind: str, mask: np.ndarray, min_length: int, first_offset: int = 0, last_offset: int = 0):
+        run_cols, run_starts, run_ends = find_runs(mask, min_length)
+        issues.extend(
+            PriceIssue(tickers[col], kind, str(dates[first + first_offset]), str(dates[last + last_offset]), int(last - first + 1 + last_offset - first_offset))
+            for col, first, last in zip(run_cols.tolist(), run_starts.tolist(), run_ends.tolist(), strict=True)
+        )
+
+    add_runs(GAP, listed & ~valid & ~empty, min_gap_days)
+
+    # Consecutive observations of each ticker (carried over gaps, which are already reported)
+    rows = np.arange(len(trading_rows))[:, None]
+    last_valid = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+    filled = np.take_along_axis(window, np.maximum(last_valid, 0), axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        unchanged = valid[1:] & (filled[1:] == filled[:-1])
+        change = np.abs(filled[1:] / filled[:-1] - 1)
+    # Step i goes from day i to day i + 1, so a run of unchanged steps a..b means days a..b + 1 have the same price
+    add_runs(STALE, unchanged, min_stale_days - 1, last_offset=1)
+    add_runs(JUMP, valid[1:] & (change > jump_threshold), 1, first_offset=1, last_offset=1)
+
+    order = {ticker: i for i, ticker in enumerate(tickers)}
+    return sorted(issues, key=lambda issue: (order[issue.ticker], issue.start, issue.kind))
+
+
+def backfill_requests(issues: list[PriceIssue], kinds: tuple[str, ...] = (GAP, EMPTY, STALE)) -> list[BackfillRequest]:
+    """Turn issues into download requests for just the affected dates.
+
+    Tickers with exactly the same range to download travel in the same request.
+
+    Args:
+        issues: Issues found by validate_prices.
+        kinds: Kinds of issues that can be fixed by downloading again. Jumps usually are real (i.e. splits).
+
+    Returns:
+        List of requests.
+    """
+    ranges: dict[tuple[str, str], list[str]] = {}
+    for issue in issues:
+        if issue.kind in kinds:
+            ranges.setdefault((issue.start, issue.end), []).append(issue.ticker)
+    return [BackfillRequest(tuple(dict.fromkeys(tickers)), start, end) for (start, end), tickers in sorted(ranges.items())]
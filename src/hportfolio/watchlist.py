@@ -0,0 +1,76 @@
+"""Market overview of many tickers at once."""
+import numpy as np
+from PyQt5 import QtCore, QtGui
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from hportfolio.period_changes import PERIODS
+from hportfolio.tickers_data import TickersData
+
+
+class WatchlistModel(QAbstractTableModel):
+    """Table model of the market overview. Views only paint visible rows, and only changed cells are repainted."""
+
+    HEADERS = ("Ticker", "Qty", "Price", *PERIODS)
+
+    def __init__(self, parent: QtCore.QObject | None = None):
+        """Constructor."""
+        super().__init__(parent)
+        self.tickers: list[str] = []
+        # Columns: qty, price and one per period
+        self.values = np.empty((0, len(self.HEADERS) - 1))
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:  # noqa: N802, B008
+        """Number of tickers."""
+        return 0 if parent.isValid() else len(self.tickers)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:  # noqa: N802, B008
+        """Number of columns."""
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole):  # noqa: N802
+        """Column titles."""
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        """Formatted value (DisplayRole), color (ForegroundRole) or raw value used for sorting (UserRole)."""
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if col == 0:
+            return self.tickers[row] if role in (Qt.DisplayRole, Qt.UserRole) else None
+        value = self.values[row, col - 1]
+        if role == Qt.UserRole:
+            return float(value)
+        if role == Qt.DisplayRole:
+            if np.isnan(value):
+                return "-"
+            if col == 1:
+                return f"{value:g}"
+            if col == 2:  # noqa: PLR2004
+                return f"${value:.2f}"
+            return f"{value:+.2f}%"
+        if role == Qt.ForegroundRole and col > 2 and not np.isnan(value):  # noqa: PLR2004
+            return QtGui.QBrush(QtGui.QColor(TickersData.get_price_color(round(value, 2))))
+        return None
+
+    def update(self, tickers: list[str], values: np.ndarray):
+        """Set new values and notify views of the cells that changed.
+
+        Args:
+            tickers: List with name of the tickers (one per row).
+            values: Array (tickers x columns) with qty, price and change of each period.
+        """
+        if tickers != self.tickers or values.shape != self.values.shape:
+            self.beginResetModel()
+            self.tickers = list(tickers)
+            self.values = values
+            self.endResetModel()
+            return
+        same = (values == self.values) | (np.isnan(values) & np.isnan(self.values))
+        self.values = values
+        changed_rows, changed_cols = np.nonzero(~same)
+        for row in np.unique(changed_rows):
+            row_cols = changed_cols[changed_rows == row] + 1
+            self.dataChanged.emit(self.index(row, row_cols.min()), self.index(row, row_cols.max()))
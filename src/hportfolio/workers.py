@@ -1,54 +1,218 @@
 """Module for running asynchronous tasks."""
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import itertools
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
 
-import yfinance
-from pandas import DataFrame
-from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
 
 if TYPE_CHECKING:
-    from hportfolio.tickers_data import TickersData
+    from collections.abc import Callable
 
 
-class FinanceLoadWorker(QObject):
-    """Class to implement working threads for PyQt GUI."""
+class CancelToken:
+    """Cooperative cancellation flag shared between the scheduler and a task."""
 
-    # Signals to communicate at different stages of process life
-    finished = pyqtSignal(DataFrame)
-    progress = pyqtSignal(int)
-    progress_message = pyqtSignal(str)
+    def __init__(self):
+        """Constructor."""
+        self._event = threading.Event()
 
-    def __init__(self, tickers_data:TickersData, tickers:list[str]):
-        """Worker constructor.
+    def cancel(self):
+        """Request cancellation. Task is dropped if not started yet, and its result is discarded otherwise."""
+        self._event.set()
+
+    def revive(self):
+        """Withdraw a cancellation request (task is wanted again before it finished)."""
+        self._event.clear()
+
+    @property
+    def cancelled(self) -> bool:
+        """True if cancellation was requested."""
+        return self._event.is_set()
+
+
+class TaskSignals(QObject):
+    """Signals to communicate at different stages of task life. Emitted from pool threads, received in GUI thread."""
+
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+    cancelled = pyqtSignal(int)
+
+
+class TaskRunnable(QRunnable):
+    """Runnable executing one task on the thread pool."""
+
+    def __init__(self, task_id: int, function: Callable, args: tuple, kwargs: dict, token: CancelToken, signals: TaskSignals):
+        """Runnable constructor.
 
         Args:
-            tickers_data (TickersData): Object containing the data of portfolio.
-            tickers (list): A list with tickers names.
+            task_id (int): Identifier of the task in the scheduler.
+            function (Callable): Function to run.
+            args (tuple): Positional arguments of the function.
+            kwargs (dict): Keyword arguments of the function.
+            token (CancelToken): Cancellation flag of the task.
+            signals (TaskSignals): Object used to report back to the scheduler.
         """
-        QObject.__init__(self)
-        self.tickers_data = tickers_data
-        self.tickers = tickers
+        QRunnable.__init__(self)
+        # Scheduler keeps a reference until the task is done (needed by QThreadPool.tryTake)
+        self.setAutoDelete(False)
+        self.task_id = task_id
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.token = token
+        self.signals = signals
+
+    def run(self):
+        """Run the task, unless it was cancelled while queued."""
+        if self.token.cancelled:
+            self.signals.cancelled.emit(self.task_id)
+            return
+        try:
+            result = self.function(*self.args, **self.kwargs)
+        except Exception as exc:  # noqa: BLE001
+            logging.getLogger("TaskScheduler").exception(f"Task {self.task_id} failed")
+            self.signals.failed.emit(self.task_id, str(exc))
+            return
+        self.signals.finished.emit(self.task_id, result)
+
+
+@dataclass
+class Task:
+    """Bookkeeping of a submitted task."""
+
+    task_id: int
+    key: str
+    group: str | None
+    token: CancelToken
+    runnable: TaskRunnable
+    callbacks: list = field(default_factory=list)
+
 
-    def get_tickers_value(self) -> DataFrame:
-        """Get the value of the tickers on memory (if loaded) or from Yahoo Finance.
+class TaskScheduler(QObject):
+    """Runs background tasks on a bounded thread pool.
+
+    - Single-flight: submitting a key that is already queued or running joins that task instead of starting another.
+    - Tasks submitted in the same group replace each other: a new key cancels the previous (stale) one.
+    - Results are delivered in the thread owning the scheduler (GUI thread) through callbacks and signals.
+    """
+
+    # Signals with the key of the task
+    task_finished = pyqtSignal(str, object)
+    task_failed = pyqtSignal(str, str)
+
+    # Set-up logger
+    logger = logging.getLogger("TaskScheduler")
+
+    def __init__(self, max_threads: int = 2, parent: QObject | None = None):
+        """Scheduler constructor.
+
+        Args:
+            max_threads (int): Maximum number of tasks running at the same time.
+            parent (QObject): Optional Qt parent.
+        """
+        QObject.__init__(self, parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._signals = TaskSignals()
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+        self._signals.cancelled.connect(self._on_cancelled)
+        self._ids = itertools.count(1)
+        self._tasks: dict[int, Task] = {}
+        self._in_flight: dict[str, Task] = {}
+        self._groups: dict[str, Task] = {}
+
+    def submit(self, key: str, function: Callable, *args: Any, group: str | None = None, callback: Callable | None = None, **kwargs: Any) -> CancelToken:
+        """Submit a task, or join the in-flight one with the same key.
 
         Args:
-            None
+            key: Identity of the task. Two submissions with the same key never run at the same time.
+            function: Function to run in the thread pool.
+            *args: Positional arguments of the function.
+            group: Optional group. Submitting a different key in a group cancels the previous task of the group.
+            callback: Optional function called (in GUI thread) with the result. Same callback is only called once.
+            **kwargs: Keyword arguments of the function.
 
         Returns:
-            A dataframe containing historical price of tickers.
+            Cancellation token of the task.
         """
-        force_load_ = True
-        tickers = self.tickers
-        for ticker in tickers:
-            if ticker not in self.tickers_data.historical_price_df and ticker != "LIQUIDITY":
-                self.tickers_data.used_tickers.add(ticker)
-                force_load_ = True
-        if force_load_:
-            ticker_historic_info = yfinance.Tickers(" ".join(self.tickers_data.used_tickers)).history(interval="1d", start=self.tickers_data.start_date, end=self.tickers_data.tomorrow())
-            self.tickers_data.historical_price_df = ticker_historic_info.iloc[:]["Close"]
-        self.finished.emit(self.tickers_data.historical_price_df)
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.__class__.logger.debug(f"Joining in-flight task {key}")
+            task.token.revive()
+        else:
+            token = CancelToken()
+            task_id = next(self._ids)
+            runnable = TaskRunnable(task_id, function, args, kwargs, token, self._signals)
+            task = Task(task_id, key, group, token, runnable)
+            self._tasks[task_id] = task
+            self._in_flight[key] = task
+            self.pool.start(runnable)
+        if callback and callback not in task.callbacks:
+            task.callbacks.append(callback)
+        if group:
+            previous = self._groups.get(group)
+            if previous is not None and previous.key != key:
+                self.cancel(previous.key)
+            self._groups[group] = task
+        return task.token
+
+    def cancel(self, key: str):
+        """Cancel a task. If still queued it never runs, if running its result is discarded."""
+        task = self._in_flight.get(key)
+        if task is None:
+            return
+        self.__class__.logger.info(f"Cancelling task {key}")
+        task.token.cancel()
+        if self.pool.tryTake(task.runnable):
+            self._forget(task)
+
+    def is_running(self, key: str) -> bool:
+        """True if a task with that key is queued or running."""
+        return key in self._in_flight
+
+    def shutdown(self, msecs: int = -1):
+        """Cancel every task and wait for running ones to finish."""
+        for key in list(self._in_flight):
+            self.cancel(key)
+        self.pool.waitForDone(msecs)
+
+    def _forget(self, task: Task):
+        """Remove bookkeeping of a task that will not run anymore."""
+        self._tasks.pop(task.task_id, None)
+        if self._in_flight.get(task.key) is task:
+            del self._in_flight[task.key]
+        if task.group and self._groups.get(task.group) is task:
+            del self._groups[task.group]
 
+    @pyqtSlot(int, object)
+    def _on_finished(self, task_id: int, result: object):
+        task = self._tasks.get(task_id)
+        if task is None:
+            return
+        self._forget(task)
+        if task.token.cancelled:
+            self.__class__.logger.info(f"Discarding result of cancelled task {task.key}")
+            return
+        for callback in task.callbacks:
+            callback(result)
+        self.task_finished.emit(task.key, result)
 
+    @pyqtSlot(int, str)
+    def _on_failed(self, task_id: int, message: str):
+        task = self._tasks.get(task_id)
+        if task is None:
+            return
+        self._forget(task)
+        if not task.token.cancelled:
+            self.task_failed.emit(task.key, message)
 
+    @pyqtSlot(int)
+    def _on_cancelled(self, task_id: int):
+        task = self._tasks.get(task_id)
+        if task is not None:
+            self._forget(task)